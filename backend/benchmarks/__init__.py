@@ -0,0 +1,46 @@
+"""
+Benchmarks, run from the backend directory as modules, e.g.
+`python -m benchmarks.db_writes`. Each one works on a throwaway test
+database and never touches the configured one.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    # Benchmarks run in one process, so they need no shared cache. Keep
+    # metrics apart from the development server's.
+    os.environ.setdefault('CACHE_BACKEND', 'locmem')
+    os.environ.setdefault('REQUEST_METRICS_DIR', tempfile.mkdtemp())
+    import django
+    django.setup()
+    from django.conf import settings
+    # Do not keep every executed query in memory
+    settings.DEBUG = False
+
+
+@contextmanager
+def test_database():
+    from django.db import connection
+    if connection.vendor == 'sqlite':
+        # A file rather than the default in-memory test database, so
+        # journal mode and locking behave as in production
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tempfile.mkdtemp(), 'bench.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile_ms(seconds, p):
+    """The p-th quantile (0 to 1) of durations in seconds, in milliseconds."""
+    if not seconds:
+        return 0.0
+    ordered = sorted(seconds)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
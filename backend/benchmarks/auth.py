@@ -0,0 +1,79 @@
+"""
+Authenticated requests per second with simplejwt's JWTAuthentication
+(one user query per request) against CachedJWTAuthentication, with and
+without the signed role claim.
+
+    python -m benchmarks.auth
+    python -m benchmarks.auth --requests 5000
+"""
+import argparse
+import time
+from benchmarks import percentile_ms, setup_django, test_database
+
+ENDPOINTS = ['/api/users/me/', '/api/stores/']
+VARIANTS = [
+    ('JWTAuthentication',
+     'rest_framework_simplejwt.authentication.JWTAuthentication', False),
+    ('CachedJWTAuthentication',
+     'users.authentication.CachedJWTAuthentication', False),
+    ('Cached + role claim',
+     'users.authentication.CachedJWTAuthentication', True),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='Requests per endpoint and variant')
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        run(args.requests)
+
+
+def run(requests):
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.utils.module_loading import import_string
+    from rest_framework.views import APIView
+    from users.models import User
+
+    User.objects.create_user(username='bench', email='bench@example.com',
+                             password='bench', role=User.Role.SUPER_ADMIN)
+    print(f'{"variant":<26}{"endpoint":<16}{"req/s":>8}{"queries":>9}'
+          f'{"p50 ms":>9}{"p99 ms":>9}')
+    for name, auth_class, role_claim in VARIANTS:
+        # ViewSets inherit authentication_classes from APIView
+        APIView.authentication_classes = [import_string(auth_class)]
+        settings.JWT_ROLE_CLAIM = role_claim
+        cache.clear()
+        client = Client()
+        access = client.post('/api/token/', {
+            'username': 'bench', 'password': 'bench'}).json()['access']
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+        for url in ENDPOINTS:
+            # Queries per request once any cache is warm
+            client.get(url, **headers)
+            with CaptureQueriesContext(connection) as ctx:
+                client.get(url, **headers)
+            queries = len(ctx.captured_queries)
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(requests):
+                begin = time.perf_counter()
+                response = client.get(url, **headers)
+                latencies.append(time.perf_counter() - begin)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.content
+            print(f'{name:<26}{url:<16}{requests / elapsed:>8.0f}{queries:>9}'
+                  f'{percentile_ms(latencies, 0.5):>9.2f}'
+                  f'{percentile_ms(latencies, 0.99):>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Concurrent write throughput per database configuration.
+
+Each configuration runs in its own process against a throwaway test
+database. Every thread checks out one-line sales through
+SaleCreateSerializer, the busiest write path (inventory, stock ledger,
+product totals and sales rollups in one transaction).
+
+    python -m benchmarks.db_writes
+    python -m benchmarks.db_writes --threads 16 --seconds 10 --config sqlite-tuned
+
+The postgresql configuration uses the DB_* variables and runs by default
+when DB_NAME is set.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from benchmarks import percentile_ms, setup_django, test_database
+
+CONFIGS = {
+    'sqlite': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNED': '0'},
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNED': '1'},
+    'postgresql': {'DB_ENGINE': 'postgresql'},
+}
+PRODUCTS = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--config', action='append', choices=sorted(CONFIGS))
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.threads, args.seconds)))
+        return
+
+    configs = args.config or ['sqlite', 'sqlite-tuned'] + (
+        ['postgresql'] if os.getenv('DB_NAME') else [])
+    print(f'{"config":<14}{"commits/s":>10}{"errors":>8}'
+          f'{"p50 ms":>9}{"p99 ms":>9}')
+    for name in configs:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_writes', '--worker',
+             '--threads', str(args.threads), '--seconds', str(args.seconds)],
+            env={**os.environ, **CONFIGS[name]}, capture_output=True, text=True)
+        if completed.returncode:
+            print(f'{name:<14}failed: {completed.stderr.strip().splitlines()[-1]}')
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f'{name:<14}{result["per_second"]:>10.1f}{result["errors"]:>8}'
+              f'{result["p50_ms"]:>9.1f}{result["p99_ms"]:>9.1f}')
+
+
+def run_worker(threads, seconds):
+    setup_django()
+    from django.db import connection
+
+    with test_database():
+        store_id, product_ids = seed()
+        connection.close()
+        return measure(threads, seconds, store_id, product_ids)
+
+
+def seed():
+    from inventory.models import Category, Product
+    from stores.models import Store, StoreInventory
+
+    store = Store.objects.create(name='Bench', address='-', phone='-',
+                                 email='bench@example.com')
+    category = Category.objects.create(name='Bench')
+    products = Product.objects.bulk_create([
+        Product(name=f'Bench {i}', sku=f'BENCH-{i}', category=category,
+                price='1.00')
+        for i in range(PRODUCTS)
+    ])
+    StoreInventory.objects.bulk_create([
+        StoreInventory(store=store, product=product, quantity=10**9)
+        for product in products
+    ])
+    return store.id, [product.id for product in products]
+
+
+def measure(threads, seconds, store_id, product_ids):
+    from django.db import DatabaseError, connection
+    from sales.serializers import SaleCreateSerializer
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+
+    def work(seed):
+        rng = random.Random(seed)
+        try:
+            while time.monotonic() < deadline:
+                serializer = SaleCreateSerializer(data={
+                    'store': store_id, 'payment_method': 'cash',
+                    'items': [{'product': rng.choice(product_ids),
+                               'quantity': 1}],
+                })
+                serializer.is_valid(raise_exception=True)
+                started = time.perf_counter()
+                try:
+                    serializer.save()
+                except DatabaseError:
+                    errors.append(1)
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        'threads': threads,
+        'commits': len(latencies),
+        'errors': len(errors),
+        'per_second': len(latencies) / elapsed,
+        'p50_ms': percentile_ms(latencies, 0.5),
+        'p99_ms': percentile_ms(latencies, 0.99),
+    }
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+"""
+Query count, latency and memory of every API endpoint.
+
+Generates a synthetic dataset with the generate_dataset command in a
+throwaway database, then calls each list, detail, create, update, delete
+and custom action endpoint in-process through the full middleware and
+JWT authentication stack. Each case starts with an empty cache and a few
+unrecorded warm-up requests. One more request after the timed ones
+counts queries and peak traced memory (tracemalloc slows every
+allocation, so it is kept out of the timings).
+
+    python -m benchmarks.endpoints
+    python -m benchmarks.endpoints --products 5000 --sales 50000 --output results.json
+    python -m benchmarks.endpoints --baseline benchmarks/endpoints_baseline.json
+
+Results are written as sorted JSON, so two runs diff cleanly. With
+--baseline the run fails if any endpoint makes more queries than the
+baseline, or is slower (p95) or uses more memory beyond the tolerances.
+Timings only compare on the machine that recorded the baseline; use
+--queries-only elsewhere, e.g. in CI. The async endpoints under
+/api/async/ need an ASGI server and are covered by benchmarks.load.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import timedelta
+from urllib.parse import quote
+from benchmarks import percentile_ms, setup_django, test_database
+
+PASSWORD = 'Bench-pass-2024!'
+# Latency changes below this are noise, whatever the tolerance
+LATENCY_FLOOR_MS = 1.0
+
+# `path` is formatted with the context ids plus `i`, the request's index
+# within its case. `data` is a dict or a function of the same values.
+# `setup` runs before each request, untimed, and returns extra values.
+Case = namedtuple('Case', 'name method path data status user setup format',
+                  defaults=(None, 200, 'admin', None, 'json'))
+# Unique suffixes for rows created by setup functions
+serial = itertools.count()
+
+
+def new_user(values):
+    from users.models import User
+    n = next(serial)
+    user = User.objects.create(username=f'bench-delete-{n}',
+                               email=f'bench-delete-{n}@example.com')
+    return {'target': user.id}
+
+
+def new_category(values):
+    from inventory.models import Category
+    return {'target': Category.objects.create(
+        name=f'Bench delete {next(serial)}').id}
+
+
+def new_product(values):
+    from inventory.models import Product
+    n = next(serial)
+    product = Product.objects.create(
+        name=f'Bench product {n}', sku=f'BENCH-NEW-{n}',
+        category_id=values['category'], price='1.00')
+    return {'target': product.id}
+
+
+def new_stock(values):
+    from inventory.models import Stock
+    return {'target': Stock.objects.create(
+        product_id=new_product(values)['target']).id}
+
+
+def new_store(values):
+    from stores.models import Store
+    return {'target': Store.objects.create(
+        name=f'Bench store {next(serial)}', address='-', phone='-',
+        email='bench-store@example.com').id}
+
+
+def new_store_inventory(values):
+    from stores.serializers import StoreInventorySerializer
+    serializer = StoreInventorySerializer(data={
+        'store': values['store'], 'product': new_product(values)['target'],
+        'quantity': 5})
+    serializer.is_valid(raise_exception=True)
+    return {'target': serializer.save().id}
+
+
+def new_sale(values):
+    from sales.serializers import SaleCreateSerializer
+    serializer = SaleCreateSerializer(data=sale_data(values))
+    serializer.is_valid(raise_exception=True)
+    return {'target': serializer.save().id}
+
+
+def new_refresh_token(values):
+    from users.models import User
+    from users.tokens import FilteredRefreshToken
+    return {'refresh': str(FilteredRefreshToken.for_user(
+        User.objects.get(pk=values['admin'])))}
+
+
+def sale_data(values):
+    return {'store': values['store'], 'payment_method': 'cash',
+            'items': [{'product': values['product'], 'quantity': 1}]}
+
+
+def import_data(values):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    lines = ['name,description,category,sku,barcode,price'] + [
+        f'Imported {n},Revision {values["i"]},{values["category_name"]},'
+        f'SKU-{n:07d},{n:013d},{1 + values["i"] % 2}.00'
+        for n in range(20)
+    ]
+    return {'file': SimpleUploadedFile(
+        'products.csv', '\n'.join(lines).encode(), content_type='text/csv')}
+
+
+CASES = [
+    # users
+    Case('users list', 'GET', '/api/users/'),
+    Case('users retrieve', 'GET', '/api/users/{staff}/'),
+    Case('users create', 'POST', '/api/users/', lambda v: {
+        'username': f'bench-new-{v["i"]}', 'email': f'bench-new-{v["i"]}@example.com',
+        'password': PASSWORD, 'password2': PASSWORD}, 201, user=None),
+    Case('users update', 'PATCH', '/api/users/{staff}/',
+         lambda v: {'first_name': f'Staff {v["i"]}'}),
+    Case('users destroy', 'DELETE', '/api/users/{target}/', status=204,
+         setup=new_user),
+    Case('users me', 'GET', '/api/users/me/'),
+    Case('users change_password', 'POST', '/api/users/change_password/',
+         lambda v: {'old_password': f'{PASSWORD}{v["i"]}',
+                    'new_password': f'{PASSWORD}{v["i"] + 1}'},
+         user='password'),
+    Case('users activities', 'GET', '/api/users/activities/'),
+    Case('users user_activities', 'GET', '/api/users/{admin}/user_activities/'),
+    Case('activities list', 'GET', '/api/activities/'),
+    Case('activities list by user', 'GET', '/api/activities/?user={admin}'),
+    Case('activities retrieve', 'GET', '/api/activities/{activity}/'),
+    Case('activities export', 'GET', '/api/activities/export/'),
+    Case('activities audit_metrics', 'GET', '/api/activities/audit_metrics/'),
+    Case('token obtain', 'POST', '/api/token/',
+         {'username': 'bench-user-0', 'password': 'bench-password'}, user=None),
+    Case('token refresh', 'POST', '/api/token/refresh/',
+         lambda v: {'refresh': v['refresh']}, user=None,
+         setup=new_refresh_token),
+    Case('token blacklist', 'POST', '/api/token/blacklist/',
+         lambda v: {'refresh': v['refresh']}, user=None,
+         setup=new_refresh_token),
+    # inventory
+    Case('categories list', 'GET', '/api/inventory/categories/'),
+    Case('categories retrieve', 'GET', '/api/inventory/categories/{category}/'),
+    Case('categories create', 'POST', '/api/inventory/categories/',
+         lambda v: {'name': f'Bench category {v["i"]}'}, 201),
+    Case('categories update', 'PATCH', '/api/inventory/categories/{category}/',
+         lambda v: {'description': f'Revision {v["i"]}'}),
+    Case('categories destroy', 'DELETE', '/api/inventory/categories/{target}/',
+         status=204, setup=new_category),
+    Case('products list', 'GET', '/api/inventory/products/'),
+    Case('products list by category', 'GET',
+         '/api/inventory/products/?category={category}'),
+    Case('products list search', 'GET', '/api/inventory/products/?search=coffee'),
+    Case('products retrieve', 'GET', '/api/inventory/products/{product}/'),
+    Case('products create', 'POST', '/api/inventory/products/', lambda v: {
+        'name': f'Bench created {v["i"]}', 'category': v['category'],
+        'sku': f'BENCH-CREATED-{v["i"]}', 'price': '2.50'}, 201),
+    Case('products update', 'PATCH', '/api/inventory/products/{product}/',
+         lambda v: {'description': f'Revision {v["i"]}'}),
+    Case('products destroy', 'DELETE', '/api/inventory/products/{target}/',
+         status=204, setup=new_product),
+    Case('products export', 'GET', '/api/inventory/products/export/'),
+    Case('products search', 'GET', '/api/inventory/products/search/?q=organic+coffee'),
+    Case('products lookup', 'GET', '/api/inventory/products/lookup/?barcode={barcode}'),
+    Case('products lookup batch', 'POST', '/api/inventory/products/lookup/',
+         lambda v: {'barcodes': v['barcodes']}),
+    Case('products import', 'POST', '/api/inventory/products/import/',
+         import_data, format='multipart'),
+    Case('products bulk_price_update', 'POST',
+         '/api/inventory/products/bulk_price_update/',
+         lambda v: {'updates': [
+             {'product_id': product_id, 'new_price': f'{10 + v["i"] % 2}.00'}
+             for product_id in v['product_ids']]}),
+    Case('stock list', 'GET', '/api/inventory/stock/'),
+    Case('stock list by quantity', 'GET', '/api/inventory/stock/?ordering=quantity'),
+    Case('stock retrieve', 'GET', '/api/inventory/stock/{stock}/'),
+    Case('stock create', 'POST', '/api/inventory/stock/',
+         lambda v: {'product': v['target'], 'quantity': 5}, 201,
+         setup=new_product),
+    Case('stock update', 'PATCH', '/api/inventory/stock/{stock}/',
+         lambda v: {'quantity': 50 + v['i'] % 2}),
+    Case('stock destroy', 'DELETE', '/api/inventory/stock/{target}/',
+         status=204, setup=new_stock),
+    Case('stock export', 'GET', '/api/inventory/stock/export/'),
+    Case('stock low_stock', 'GET', '/api/inventory/stock/low_stock/'),
+    # stores
+    Case('stores list', 'GET', '/api/stores/'),
+    Case('stores retrieve', 'GET', '/api/stores/{store}/'),
+    Case('stores create', 'POST', '/api/stores/', lambda v: {
+        'name': f'Bench created {v["i"]}', 'address': '-', 'phone': '-',
+        'email': 'bench-created@example.com'}, 201),
+    Case('stores update', 'PATCH', '/api/stores/{store}/',
+         lambda v: {'phone': f'555-{v["i"]:04d}'}),
+    Case('stores destroy', 'DELETE', '/api/stores/{target}/', status=204,
+         setup=new_store),
+    Case('store-inventory list', 'GET', '/api/store-inventory/'),
+    Case('store-inventory list by store', 'GET', '/api/store-inventory/?store={store}'),
+    Case('store-inventory retrieve', 'GET', '/api/store-inventory/{store_inventory}/'),
+    Case('store-inventory create', 'POST', '/api/store-inventory/',
+         lambda v: {'store': v['store'], 'product': v['target'], 'quantity': 5},
+         201, setup=new_product),
+    Case('store-inventory update', 'PATCH', '/api/store-inventory/{store_inventory}/',
+         lambda v: {'quantity': 50 + v['i'] % 2}),
+    Case('store-inventory destroy', 'DELETE', '/api/store-inventory/{target}/',
+         status=204, setup=new_store_inventory),
+    Case('store-inventory adjust', 'POST', '/api/store-inventory/adjust/',
+         lambda v: {'kind': 'receipt', 'adjustments': [
+             {'store': v['store'], 'product': product_id, 'delta': 1}
+             for product_id in v['product_ids']]}),
+    Case('store-inventory as_of', 'GET',
+         '/api/store-inventory/as_of/?store={store}&at={now}'),
+    Case('store-inventory low_stock', 'GET',
+         '/api/store-inventory/low_stock/?store={store}'),
+    Case('stock-transfers list', 'GET', '/api/stock-transfers/'),
+    Case('stock-transfers retrieve', 'GET', '/api/stock-transfers/{transfer}/'),
+    Case('stock-transfers create', 'POST', '/api/stock-transfers/', lambda v: {
+        'source_store': (v['store'], v['store2'])[v['i'] % 2],
+        'destination_store': (v['store2'], v['store'])[v['i'] % 2],
+        'items': [{'product': v['product'], 'quantity': 1}]}, 201),
+    Case('stock-movements list', 'GET', '/api/stock-movements/'),
+    Case('stock-movements list by store', 'GET', '/api/stock-movements/?store={store}'),
+    Case('stock-movements retrieve', 'GET', '/api/stock-movements/{movement}/'),
+    # sales
+    Case('sales list', 'GET', '/api/sales/'),
+    Case('sales list by store and date', 'GET',
+         '/api/sales/?store={store}&date_from={week_ago}&date_to={today}'),
+    Case('sales retrieve', 'GET', '/api/sales/{sale}/'),
+    Case('sales create', 'POST', '/api/sales/', sale_data, 201),
+    Case('sales destroy', 'DELETE', '/api/sales/{target}/', status=204,
+         setup=new_sale),
+    Case('sales export', 'GET', '/api/sales/export/'),
+    Case('reports daily', 'GET',
+         '/api/reports/sales/daily/?date_from={week_ago}&date_to={today}'),
+    Case('reports products', 'GET',
+         '/api/reports/sales/products/?store={store}&date_from={week_ago}'),
+    # sync
+    Case('sync list', 'GET', '/api/sync/?store={store}'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--stores', type=int, default=5)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--sales', type=int, default=10000)
+    parser.add_argument('--activity', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='Timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--case', action='append',
+                        help='Run only cases whose name contains this')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with this results file')
+    parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                        help='Allowed relative p95 increase (default 0.25)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help='Allowed relative peak memory increase')
+    parser.add_argument('--queries-only', action='store_true',
+                        help='Compare only query counts with the baseline')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES
+             if not args.case or any(part in case.name for part in args.case)]
+    if not cases:
+        sys.exit('No case matches --case')
+    dataset = {'stores': args.stores, 'products': args.products,
+               'sales': args.sales, 'activity': args.activity,
+               'seed': args.seed}
+    results = run(dataset, cases, args.warmup, args.iterations)
+
+    print(f'{"endpoint":<36}{"queries":>8}{"p50 ms":>9}{"p95 ms":>9}'
+          f'{"p99 ms":>9}{"peak KiB":>10}')
+    for name, result in results['endpoints'].items():
+        print(f'{name:<36}{result["queries"]:>8}{result["p50_ms"]:>9.1f}'
+              f'{result["p95_ms"]:>9.1f}{result["p99_ms"]:>9.1f}'
+              f'{result["peak_kib"]:>10}')
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.latency_tolerance,
+                              args.memory_tolerance, args.queries_only)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline}')
+
+
+def run(dataset, cases, warmup, iterations):
+    # Audit rows are written in the request, not by a background thread
+    os.environ.setdefault('AUDIT_SINK_BACKEND', 'users.audit.SyncAuditSink')
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    with test_database():
+        call_command('generate_dataset', stores=dataset['stores'],
+                     products=dataset['products'], sales=dataset['sales'],
+                     activity=dataset['activity'], seed=dataset['seed'],
+                     verbosity=0, stdout=open(os.devnull, 'w'))
+        values, clients = context()
+        endpoints = {}
+        for case in cases:
+            endpoints[case.name] = measure(case, values, clients[case.user],
+                                           warmup, iterations)
+        return {'dataset': dataset, 'database': connection.vendor,
+                'iterations': iterations, 'endpoints': endpoints}
+
+
+def context():
+    """Ids and URL values the cases refer to, and a client per user."""
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+    from inventory.models import Product, Stock
+    from sales.models import Sale
+    from stores.adjustments import apply_adjustments
+    from stores.models import StockMovement, Store, StoreInventory
+    from stores.serializers import StockTransferCreateSerializer
+    from users.models import User, UserActivity
+
+    admin = User.objects.filter(role=User.Role.SUPER_ADMIN).order_by('id').first()
+    staff = User.objects.filter(role=User.Role.ADMIN).order_by('id').first()
+    password_user = User.objects.create_user(
+        username='bench-password', email='bench-password@example.com',
+        password=f'{PASSWORD}0')
+    store, store2 = Store.objects.order_by('id')[:2]
+    products = list(Product.objects.order_by('id')[:20])
+    product = products[0]
+    # Enough stock at both stores for every sale and transfer case
+    apply_adjustments({(store.id, product.id): 10**6,
+                       (store2.id, product.id): 10**6},
+                      StockMovement.Kind.RECEIPT, 'benchmark')
+    transfer = StockTransferCreateSerializer(data={
+        'source_store': store.id, 'destination_store': store2.id,
+        'items': [{'product': product.id, 'quantity': 1}]})
+    transfer.is_valid(raise_exception=True)
+    today = timezone.localdate()
+
+    values = {
+        'admin': admin.id, 'staff': staff.id, 'store': store.id,
+        'store2': store2.id, 'product': product.id,
+        'product_ids': [p.id for p in products[10:]],
+        'barcode': product.barcode,
+        'barcodes': list(Product.objects.order_by('id').values_list(
+            'barcode', flat=True)[:50]),
+        'category': product.category_id,
+        'category_name': product.category.name,
+        'stock': Stock.objects.order_by('id').first().id,
+        'store_inventory': StoreInventory.objects.get(
+            store=store, product=products[1]).id,
+        'sale': Sale.objects.order_by('-id').first().id,
+        'activity': UserActivity.objects.order_by('id').first().id,
+        'movement': StockMovement.objects.order_by('id').first().id,
+        'transfer': transfer.save(created_by=admin).id,
+        'now': quote(timezone.now().isoformat()),
+        'today': today.isoformat(),
+        'week_ago': (today - timedelta(days=7)).isoformat(),
+    }
+    clients = {None: APIClient()}
+    for name, user in [('admin', admin), ('password', password_user)]:
+        clients[name] = APIClient()
+        clients[name].credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return values, clients
+
+
+def measure(case, values, client, warmup, iterations):
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for cache in caches.all():
+        cache.clear()
+    count = iter(range(warmup + iterations + 1))
+    for _ in range(warmup):
+        call(case, values, client, next(count))
+    latencies = [call(case, values, client, next(count))
+                 for _ in range(iterations)]
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            call(case, values, client, next(count), traced=True)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'method': case.method,
+        'path': case.path,
+        'queries': len(queries),
+        'p50_ms': round(percentile_ms(latencies, 0.5), 2),
+        'p95_ms': round(percentile_ms(latencies, 0.95), 2),
+        'p99_ms': round(percentile_ms(latencies, 0.99), 2),
+        'peak_kib': peak // 1024,
+    }
+
+
+def call(case, values, client, i, traced=False):
+    """Make one request of `case`; return its duration in seconds."""
+    values = {**values, 'i': i}
+    if case.setup:
+        values.update(case.setup(values))
+    data = case.data(values) if callable(case.data) else case.data
+    path = case.path.format(**values)
+    if traced:
+        # Count only the request's own allocations
+        tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    response = getattr(client, case.method.lower())(
+        path, data, format=case.format)
+    content = (b''.join(response.streaming_content) if response.streaming
+               else response.content)
+    elapsed = time.perf_counter() - started
+
+    if response.status_code != case.status:
+        sys.exit(f'{case.name}: {case.method} {path} returned '
+                 f'{response.status_code}, expected {case.status}: '
+                 f'{content[:500]!r}')
+    return elapsed
+
+
+def compare(results, baseline, latency_tolerance, memory_tolerance,
+            queries_only=False):
+    """Return a description of each regression against `baseline`."""
+    if results['dataset'] != baseline['dataset']:
+        sys.exit(f'The baseline was recorded with dataset {baseline["dataset"]}; '
+                 'rerun with the same sizes')
+    regressions = []
+    for name, before in sorted(baseline['endpoints'].items()):
+        after = results['endpoints'].get(name)
+        if after is None:
+            continue
+        if after['queries'] > before['queries']:
+            regressions.append(
+                f'{name}: {after["queries"]} queries, was {before["queries"]}')
+        if queries_only:
+            continue
+        if after['p95_ms'] > (before['p95_ms'] * (1 + latency_tolerance)
+                              + LATENCY_FLOOR_MS):
+            regressions.append(
+                f'{name}: p95 {after["p95_ms"]} ms, was {before["p95_ms"]} ms')
+        if after['peak_kib'] > before['peak_kib'] * (1 + memory_tolerance):
+            regressions.append(
+                f'{name}: peak {after["peak_kib"]} KiB, '
+                f'was {before["peak_kib"]} KiB')
+    return regressions
+
+
+if __name__ == '__main__':
+    main()
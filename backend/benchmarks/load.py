@@ -0,0 +1,258 @@
+"""
+Load test of the sync (WSGI) and async (ASGI) read endpoints.
+
+Seeds a throwaway database, then for each target starts a server on it
+and drives keep-alive connections from several client processes. Each
+client cycles through product list, product lookup, stock list and
+store inventory requests. Reports throughput and latency per number of
+concurrent clients. The servers need the shared cache of CACHE_BACKEND,
+a local Redis by default.
+
+    python -m benchmarks.load
+    python -m benchmarks.load --clients 100,500,1000 --seconds 10 --workers 4
+
+Targets:
+- sync: the DRF endpoints under /api/, run by gunicorn with gthread
+  workers.
+- async: the same reads under /api/async/, run by uvicorn.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+from benchmarks import percentile_ms, setup_django, test_database
+
+PRODUCTS = 500
+STORES = 5
+
+
+def target_commands(workers, threads, port):
+    return {
+        'sync': ('/api', [
+            'gunicorn', 'core.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', str(threads),
+            '--worker-class', 'gthread', '--keep-alive', '30',
+            '--log-level', 'warning']),
+        'async': ('/api/async', [
+            'uvicorn', 'core.asgi:application', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers),
+            '--log-level', 'warning', '--no-access-log']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', action='append', choices=['sync', 'async'])
+    parser.add_argument('--clients', default='100,500,1000',
+                        help='Comma-separated concurrency levels')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Server worker processes')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Threads per gunicorn worker')
+    parser.add_argument('--client-processes', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.clients.split(',')]
+
+    # The servers run several workers, so they keep the shared cache of
+    # the environment (redis by default) rather than the benchmark's own
+    server_cache = os.environ.get('CACHE_BACKEND')
+    setup_django()
+    from django.db import connection
+    with test_database():
+        token, codes, store_ids = seed()
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'core.settings',
+               'AUDIT_SINK_BACKEND': 'users.audit.SyncAuditSink',
+               'WEB_CONCURRENCY': str(args.workers),
+               # Entries of earlier runs describe another database
+               'CACHE_KEY_PREFIX': f'load-{os.getpid()}-{time.time_ns()}'}
+        if server_cache is None:
+            del env['CACHE_BACKEND']
+        else:
+            env['CACHE_BACKEND'] = server_cache
+        env['SQLITE_PATH' if connection.vendor == 'sqlite' else 'DB_NAME'] = str(
+            connection.settings_dict['NAME'])
+        connection.close()
+
+        print(f'{"target":<8}{"clients":>8}{"req/s":>9}{"errors":>8}'
+              f'{"p50 ms":>9}{"p99 ms":>10}')
+        commands = target_commands(args.workers, args.threads, args.port)
+        for name in args.target or ['sync', 'async']:
+            prefix, command = commands[name]
+            paths = request_paths(prefix, codes, store_ids)
+            with serve(command, env, args.port):
+                for clients in levels:
+                    result = run_level(args.port, paths, token, clients,
+                                       args.seconds, args.client_processes)
+                    print(f'{name:<8}{clients:>8}{result["per_second"]:>9.0f}'
+                          f'{result["errors"]:>8}{result["p50_ms"]:>9.1f}'
+                          f'{result["p99_ms"]:>10.1f}', flush=True)
+
+
+def seed():
+    from inventory.models import Category, Product, Stock
+    from rest_framework_simplejwt.tokens import AccessToken
+    from stores.models import Store, StoreInventory
+    from users.models import User
+
+    rng = random.Random(0)
+    user = User.objects.create_user(username='load', email='load@example.com',
+                                    password='load')
+    categories = Category.objects.bulk_create(
+        [Category(name=f'Category {i}') for i in range(10)])
+    products = Product.objects.bulk_create([
+        Product(name=f'Product {i}', sku=f'SKU-{i:05d}', barcode=f'{i:013d}',
+                category=rng.choice(categories), price='9.99')
+        for i in range(PRODUCTS)
+    ])
+    Stock.objects.bulk_create([
+        Stock(product=product, quantity=rng.randint(0, 100))
+        for product in products
+    ])
+    stores = Store.objects.bulk_create([
+        Store(name=f'Store {i}', address='-', phone='-',
+              email=f'store{i}@example.com')
+        for i in range(STORES)
+    ])
+    StoreInventory.objects.bulk_create([
+        StoreInventory(store=store, product=product,
+                       quantity=rng.randint(0, 100))
+        for store in stores for product in products
+    ])
+    return (str(AccessToken.for_user(user)),
+            [product.barcode for product in products],
+            [store.id for store in stores])
+
+
+def request_paths(prefix, codes, store_ids):
+    rng = random.Random(1)
+    paths = []
+    for i in range(200):
+        paths += [
+            f'{prefix}/inventory/products/?page={i % 20 + 1}',
+            f'{prefix}/inventory/products/lookup/?barcode={rng.choice(codes)}',
+            f'{prefix}/inventory/stock/?page={i % 20 + 1}',
+            f'{prefix}/store-inventory/?store={rng.choice(store_ids)}'
+            f'&page={i % 20 + 1}',
+        ]
+    return paths
+
+
+class serve:
+    def __init__(self, command, env, port):
+        self.command, self.env, self.port = command, env, port
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env,
+                                        start_new_session=True)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), 1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        sys.exit(f'{self.command[0]} did not start')
+
+    def __exit__(self, *exc_info):
+        os.killpg(self.process.pid, signal.SIGTERM)
+        self.process.wait()
+
+
+def run_level(port, paths, token, clients, seconds, processes):
+    processes = min(processes, clients)
+    shares = [clients // processes + (i < clients % processes)
+              for i in range(processes)]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(drive, [
+            (port, paths, token, share, seconds, i)
+            for i, share in enumerate(shares)])
+    latencies = [latency for result in results for latency in result[0]]
+    return {
+        'per_second': len(latencies) / seconds,
+        'errors': sum(result[1] for result in results),
+        'p50_ms': percentile_ms(latencies, 0.5),
+        'p99_ms': percentile_ms(latencies, 0.99),
+    }
+
+
+def drive(port, paths, token, clients, seconds, seed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return asyncio.run(drive_clients(port, paths, token, clients, seconds, seed))
+
+
+async def drive_clients(port, paths, token, clients, seconds, seed):
+    latencies, errors = [], [0]
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*[
+        client(port, paths, token, deadline, random.Random(seed * 100000 + i),
+               latencies, errors)
+        for i in range(clients)])
+    return latencies, errors[0]
+
+
+async def client(port, paths, token, deadline, rng, latencies, errors):
+    offset = rng.randrange(len(paths))
+    writer = None
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[(offset + i) % len(paths)]
+        i += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write((f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                          f'Authorization: Bearer {token}\r\n\r\n').encode())
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[0] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return (status, keep-alive)."""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') != 'close'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+from django.urls import path
+from inventory.asyncviews import ProductListView, ProductLookupView, StockListView
+from stores.asyncviews import StoreInventoryListView
+
+# Async read endpoints mirroring their sync counterparts under /api/
+urlpatterns = [
+    path('inventory/products/', ProductListView.as_view(),
+         name='async-product-list'),
+    path('inventory/products/lookup/', ProductLookupView.as_view(),
+         name='async-product-lookup'),
+    path('inventory/stock/', StockListView.as_view(),
+         name='async-stock-list'),
+    path('store-inventory/', StoreInventoryListView.as_view(),
+         name='async-store-inventory-list'),
+]
@@ -0,0 +1,155 @@
+"""
+Async-native read endpoints, served next to the synchronous DRF API.
+
+DRF views are synchronous, so under ASGI Django runs each one in a
+worker thread. The views here run on the event loop instead. They
+authenticate with CachedJWTAuthentication.aauthenticate and query
+through the async ORM. They reuse the DRF ViewSet's queryset, filter
+backends and serializer, so a response matches the sync endpoint for
+the same query.
+
+Django 4.2's async ORM still runs each query in a thread. What stays on
+the loop is everything else: token checks, cache hits and rendering.
+"""
+import math
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import exception_handler
+from users.authentication import CachedJWTAuthentication
+from .cache import (
+    amodel_versions, not_modified, response_fingerprint, validator_headers)
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type='application/json', headers=headers)
+
+
+class AsyncAPIView(View):
+    """Authenticated async view. Subclasses define async handlers."""
+    authentication = CachedJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Bearer tokens only, so exempt from CSRF like DRF's APIView. Set
+        # the flag rather than wrapping: Django 4.2's csrf_exempt would hide
+        # that the view is async.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+            if auth is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = auth
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            if isinstance(exc, (exceptions.NotAuthenticated,
+                                exceptions.AuthenticationFailed)):
+                exc.auth_header = self.authentication.authenticate_header(request)
+            response = exception_handler(exc, {})
+            headers = {name: value for name, value in response.items()
+                       if name != 'Content-Type'}
+            return json_response(response.data, response.status_code, headers)
+
+
+class AsyncListView(AsyncAPIView):
+    """
+    Page-number list of a DRF ViewSet's filtered queryset. Set
+    `cache_models` to cache pages like `versioned_response` does.
+    """
+    viewset_class = None
+    cache_prefix = None
+    cache_models = None
+    cache_timeout = None
+    # Versioned in the ETag only and updated in cached pages by `refresh`,
+    # like versioned_response's `live`
+    live_models = ()
+    # Query parameters that never hit the database while filtering; any
+    # other (e.g. a foreign key filter) is validated in a worker thread
+    local_params = {'page', 'ordering'}
+
+    async def get(self, request):
+        cache_models = self.get_cache_models(request)
+        if not cache_models:
+            return json_response(await self.build(request))
+
+        versions = await amodel_versions([*cache_models, *self.live_models])
+        fingerprint = response_fingerprint(
+            request, 'json', versions[:len(cache_models)])
+        headers = validator_headers(
+            response_fingerprint(request, 'json', versions) if self.live_models
+            else fingerprint)
+        if not_modified(request, headers):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED,
+                                headers=headers)
+        key = f'{self.cache_prefix}:{fingerprint}'
+        data = await cache.aget(key)
+        if data is None:
+            data = await self.build(request)
+            await cache.aset(key, data, self.cache_timeout)
+        elif self.live_models:
+            data = await self.refresh(data)
+        return json_response(data, headers=headers)
+
+    def get_cache_models(self, request):
+        return self.cache_models
+
+    async def refresh(self, data):
+        return data
+
+    def get_view(self, request):
+        view = self.viewset_class()
+        view.action = 'list'
+        view.format_kwarg = None
+        view.args = ()
+        view.kwargs = {}
+        view.request = Request(request)
+        view.request.user, view.request.auth = request.user, request.auth
+        return view
+
+    def filter_queryset(self, view):
+        return view.filter_queryset(view.get_queryset())
+
+    async def build(self, request):
+        view = self.get_view(request)
+        if set(request.GET) <= self.local_params:
+            queryset = self.filter_queryset(view)
+        else:
+            queryset = await sync_to_async(self.filter_queryset)(view)
+
+        paginator = view.paginator
+        page_size = paginator.get_page_size(view.request)
+        try:
+            page = int(request.GET.get('page', 1))
+        except ValueError:
+            page = 0
+        count = await queryset.acount()
+        pages = max(1, math.ceil(count / page_size))
+        if not 1 <= page <= pages:
+            raise exceptions.NotFound('Invalid page.')
+
+        offset = (page - 1) * page_size
+        rows = [row async for row in queryset[offset:offset + page_size]]
+        url = request.build_absolute_uri()
+        next_url = previous_url = None
+        if page < pages:
+            next_url = replace_query_param(url, 'page', page + 1)
+        if page == 2:
+            previous_url = remove_query_param(url, 'page')
+        elif page > 2:
+            previous_url = replace_query_param(url, 'page', page - 1)
+        return {
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': view.get_serializer(rows, many=True).data,
+        }
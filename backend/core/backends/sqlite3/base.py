@@ -0,0 +1,35 @@
+"""
+SQLite backend tuned for a web server with concurrent writers.
+
+Two extra OPTIONS keys are read on top of the stock backend's:
+
+- `pragmas`: PRAGMA name to value, applied to every new connection
+  (journal_mode, synchronous, mmap_size, ...).
+- `transaction_mode`: how atomic blocks begin, e.g. 'IMMEDIATE'. A
+  deferred transaction that reads and then writes cannot wait for the
+  write lock and fails with "database is locked" at once, whatever the
+  busy timeout. Taking the lock at BEGIN makes writers queue instead.
+
+Django 5.1 supports both natively (init_command, transaction_mode).
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
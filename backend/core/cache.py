@@ -0,0 +1,117 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = 'model-version'
+
+
+def cached_response(request, prefix, timeout, build):
+    """
+    Return a Response for `build()`'s data, cached under the request's
+    full path. Call it after permission checks: unlike cache_page, the
+    cache is consulted only once the request is known to be allowed.
+    """
+    key = f'{prefix}:{request.get_full_path()}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout)
+    return Response(data)
+
+
+def version_key(model):
+    # A model, or a label for a separately versioned part of one
+    label = model if isinstance(model, str) else model._meta.label_lower
+    return f'{VERSION_KEY_PREFIX}:{label}'
+
+
+def model_versions(models):
+    """
+    Return the current version of each model. Versions are nanosecond
+    timestamps rather than counters, so a version lost to cache eviction
+    is replaced by a new one instead of restarting at a reused value.
+    """
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def amodel_versions(models):
+    """Async `model_versions`."""
+    keys = [version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*models):
+    """
+    Invalidate every versioned response built from these models once the
+    current transaction commits. Bumping earlier would let a concurrent
+    reader cache pre-commit data under the new version.
+    """
+    def bump():
+        now = time.time_ns()
+        cache.set_many({version_key(model): now for model in models}, None)
+    transaction.on_commit(bump)
+
+
+def versioned_response(request, prefix, models, timeout, build, live=None):
+    """
+    Return a Response for `build()`'s data, cached under the request path,
+    the user's role, the rendered format and the versions of `models`.
+
+    The cache key doubles as a strong ETag: a matching If-None-Match gets a
+    304 after reading only the version keys. Responses carry
+    `Cache-Control: private, no-cache` so clients always revalidate.
+
+    `live` is an optional (models, refresh) pair for fields that change too
+    often to be part of the cache key. Their versions only go into the
+    ETag, and cached data is passed through `refresh(data)` to update them.
+    """
+    live_models, refresh = live or ((), None)
+    fmt = request.accepted_renderer.format
+    versions = model_versions([*models, *live_models])
+    fingerprint = response_fingerprint(request, fmt, versions[:len(models)])
+    headers = validator_headers(
+        response_fingerprint(request, fmt, versions) if live_models
+        else fingerprint)
+    if not_modified(request, headers):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = f'{prefix}:{fingerprint}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout)
+    elif refresh is not None:
+        data = refresh(data)
+    return Response(data, headers=headers)
+
+
+def response_fingerprint(request, fmt, versions):
+    return hashlib.md5('|'.join([
+        request.get_full_path(),
+        str(getattr(request.user, 'role', '')),
+        fmt,
+        *map(str, versions),
+    ]).encode()).hexdigest()
+
+
+def validator_headers(fingerprint):
+    return {'ETag': f'"{fingerprint}"', 'Cache-Control': 'private, no-cache'}
+
+
+def not_modified(request, headers):
+    return headers['ETag'] in parse_etags(request.headers.get('If-None-Match', ''))
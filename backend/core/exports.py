@@ -0,0 +1,158 @@
+"""
+Constant-memory CSV/NDJSON exports.
+
+Rows are read in primary-key keyset chunks with `values_list`, so every
+chunk is one short indexed query: no model instances, no OFFSET scans
+and no transaction held open for the length of the export. Encoded
+chunks are yielded as they are produced (optionally through gzip) to a
+StreamingHttpResponse or a file.
+"""
+import csv
+import datetime
+import json
+import threading
+import zlib
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+_slots = threading.BoundedSemaphore(settings.EXPORT_MAX_CONCURRENT)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # Not `format`: DRF reserves it for renderer selection
+    file_format = serializers.ChoiceField(choices=list(FORMATS), default='csv')
+    gzip = serializers.BooleanField(default=False)
+
+
+def header(fields):
+    return [field.replace('__', '_') for field in fields]
+
+
+def iter_rows(queryset, fields, chunk_size=None):
+    """Yield value tuples for `fields`, reading `chunk_size` rows per query."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', *fields)[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class _Line:
+    """File-like sink for csv.writer that hands back each formatted line."""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def encode_csv(rows, fields, batch=1000):
+    writer = csv.writer(_Line())
+    yield writer.writerow(header(fields)).encode()
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow([csv_value(value) for value in row]))
+        if len(lines) >= batch:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+def encode_ndjson(rows, fields, batch=1000):
+    keys = header(fields)
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(keys, row))) + '\n')
+        if len(lines) >= batch:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(queryset, fields, file_format='csv', compress=False,
+                  chunk_size=None):
+    """Yield the encoded (and optionally gzipped) export as bytes chunks."""
+    rows = iter_rows(queryset, fields, chunk_size)
+    encode = encode_csv if file_format == 'csv' else encode_ndjson
+    chunks = encode(rows, fields)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+class _ExportStream:
+    """
+    Streaming content that frees its export slot when the response is
+    closed, including when the client disconnects before the first chunk.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            _slots.release()
+
+
+def export_response(request, queryset, fields, name):
+    """
+    Stream `queryset` as a CSV or NDJSON attachment, per the request's
+    `file_format` and `gzip` parameters. At most EXPORT_MAX_CONCURRENT
+    exports stream at once per process so long downloads cannot occupy
+    every worker thread; further requests get 429.
+    """
+    query = ExportQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    file_format = query.validated_data['file_format']
+    compress = query.validated_data['gzip']
+
+    if not _slots.acquire(blocking=False):
+        return Response(
+            {'error': 'Too many exports in progress; try again shortly'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={'Retry-After': '30'})
+    content_type, extension = FORMATS[file_format]
+    filename = f'{name}-{timezone.now():%Y%m%d-%H%M%S}.{extension}'
+    if compress:
+        content_type, filename = 'application/gzip', f'{filename}.gz'
+    response = StreamingHttpResponse(
+        _ExportStream(export_chunks(queryset, fields, file_format, compress)),
+        content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
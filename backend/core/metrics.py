@@ -0,0 +1,414 @@
+"""
+Per-request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware (core/middleware.py) counts and times every
+request by view and action. For a sampled fraction of requests it also
+records database query count and time and serializer time, by making
+that request's RequestTiming current while it runs:
+
+- a wrapper installed once on every database connection adds each
+  query's duration to the current timing;
+- `BaseSerializer.data` and `is_valid` (and their overrides) add the time
+  spent validating and building representations, including any queries
+  that triggers.
+
+Requests that are not sampled skip both with one context variable
+lookup.
+
+Each process keeps its metrics in memory. With REQUEST_METRICS['DIRECTORY']
+set, a background thread also writes them to DIRECTORY/<id>.json every
+FLUSH_INTERVAL seconds, where <id> is the pid plus a random suffix so a
+reused pid never takes over an old file. `render()` adds up the files of
+every worker, so any worker can answer a scrape with the totals. Each
+process holds a lock on its <id>.alive file for as long as it runs; a
+scrape folds the files of processes whose lock is gone into
+compacted.json, so the totals never go backwards and the directory does
+not grow with every restart.
+"""
+import atexit
+import bisect
+import contextvars
+import copy
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import BaseSerializer, ListSerializer, Serializer
+
+try:
+    import fcntl
+except ImportError:  # Windows: files of exited processes are not compacted
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+current_timing = contextvars.ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    __slots__ = ('queries', 'db', 'serializer', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = self.serializer = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.db += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """Instrument open connections and serializers. Safe to call again."""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(None, connection)
+    for cls in (BaseSerializer, Serializer, ListSerializer):
+        for name in ('data', 'is_valid'):
+            attr = cls.__dict__.get(name)
+            if isinstance(attr, property) and not hasattr(attr.fget, 'timed'):
+                setattr(cls, name, property(timed(attr.fget)))
+            elif callable(attr) and not hasattr(attr, 'timed'):
+                setattr(cls, name, timed(attr))
+
+
+def timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timing = current_timing.get()
+        # Nested serializers and super() calls are timed by the outermost
+        if timing is None or timing.serializing:
+            return func(*args, **kwargs)
+        timing.serializing = True
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timing.serializer += time.perf_counter() - started
+            timing.serializing = False
+    wrapper.timed = True
+    return wrapper
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames):
+        self.name, self.documentation = name, documentation
+        self.labelnames = labelnames
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    @staticmethod
+    def combine(value, other):
+        return value + other
+
+    def samples(self, series):
+        for labels, value in sorted(series.items()):
+            yield f'{self.name}{format_labels(self.labelnames, labels)} {value}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name, self.documentation = name, documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Label values -> [per-bucket counts (last is +Inf), sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @staticmethod
+    def combine(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1]]
+
+    def samples(self, series):
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = 'le="%s"' % (bound if isinstance(bound, str) else float(bound))
+                yield (f'{self.name}_bucket'
+                       f'{format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = format_labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {total}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+VIEW_LABELS = ('view', 'action', 'method')
+
+requests_total = Counter(
+    'http_requests_total', 'Requests by view, action, method and status.',
+    VIEW_LABELS + ('status',))
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Time spent handling requests.',
+    VIEW_LABELS, DURATION_BUCKETS)
+db_queries = Histogram(
+    'http_request_db_queries', 'Database queries per sampled request.',
+    VIEW_LABELS, QUERY_BUCKETS)
+db_duration = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per sampled request.',
+    VIEW_LABELS, DURATION_BUCKETS)
+serializer_duration = Histogram(
+    'http_request_serializer_duration_seconds',
+    'Time spent in serializer validation and representation per sampled '
+    'request.', VIEW_LABELS, DURATION_BUCKETS)
+METRICS = [requests_total, request_duration, db_queries, db_duration,
+           serializer_duration]
+_lock = threading.Lock()
+
+
+def observe_request(labels, status, duration, timing=None):
+    """Record one request; `timing` is its RequestTiming if sampled."""
+    exporter.ensure_started()
+    with _lock:
+        exporter.dirty = True
+        requests_total.inc(labels + (str(status),))
+        request_duration.observe(labels, duration)
+        if timing is not None:
+            db_queries.observe(labels, timing.queries)
+            db_duration.observe(labels, timing.db)
+            serializer_duration.observe(labels, timing.serializer)
+
+
+def snapshot():
+    """This process's series as {metric name: [[labels, value], ...]}."""
+    with _lock:
+        return {metric.name: [[list(labels), copy.deepcopy(value)]
+                              for labels, value in metric.series.items()]
+                for metric in METRICS}
+
+
+def merge(totals, data):
+    """Add a snapshot to `totals`, {metric name: {labels: value}}."""
+    for metric in METRICS:
+        series = totals.setdefault(metric.name, {})
+        for labels, value in data.get(metric.name, []):
+            labels = tuple(labels)
+            series[labels] = (metric.combine(series[labels], value)
+                              if labels in series else value)
+    return totals
+
+
+def render():
+    """All metrics in the text format, including other workers' files."""
+    totals = merge({}, snapshot())
+    for data in exporter.read_others():
+        merge(totals, data)
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples(totals[metric.name]))
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        for metric in METRICS:
+            metric.series.clear()
+
+
+class FileExporter:
+    """
+    Writes this process's metrics to REQUEST_METRICS['DIRECTORY'] from a
+    daemon thread every FLUSH_INTERVAL seconds they changed, and at exit.
+    Does nothing while DIRECTORY is empty.
+    """
+    COMPACTED = 'compacted'
+
+    def __init__(self):
+        self.dirty = False
+        self._pid = None
+        self._id = None
+        # (directory, open <id>.alive file this process holds a lock on)
+        self._alive = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def directory(self):
+        return settings.REQUEST_METRICS.get('DIRECTORY')
+
+    def path(self, name, suffix='.json'):
+        return os.path.join(self.directory, name + suffix)
+
+    def ensure_started(self):
+        # Restart after fork: worker processes do not inherit the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Counted by the parent, which writes its own file
+                reset()
+            if self._alive is not None:
+                # The parent's lock is not inherited, only the file
+                self._alive[1].close()
+                self._alive = None
+            self._id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+            interval = settings.REQUEST_METRICS.get('FLUSH_INTERVAL', 1)
+            threading.Thread(target=self._run, args=(interval,),
+                             name='metrics-exporter', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            if self.dirty:
+                self.flush()
+
+    def flush(self):
+        """Write this process's file now."""
+        if not self.directory or self._pid != os.getpid():
+            return
+        self.dirty = False
+        path = self.path(self._id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._claim()
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump(snapshot(), file)
+            os.replace(f'{path}.tmp', path)
+        except OSError:
+            logger.exception('Failed to write request metrics to %s', path)
+
+    def _claim(self):
+        """Lock <id>.alive until this process exits, before its first write."""
+        if fcntl is None or (self._alive and self._alive[0] == self.directory):
+            return
+        if self._alive is not None:
+            self._alive[1].close()
+        # Locked under a temporary name, so no scrape sees it unlocked
+        file = open(self.path(self._id, '.alive.tmp'), 'w')
+        fcntl.lockf(file, fcntl.LOCK_EX)
+        os.replace(file.name, self.path(self._id, '.alive'))
+        self._alive = (self.directory, file)
+
+    def read_others(self):
+        """Return the snapshots written by every other process."""
+        if not self.directory:
+            return []
+        own = self.path(self._id) if self._id else None
+        with self._directory_lock():
+            try:
+                self._compact()
+            except OSError:
+                logger.exception('Failed to compact request metrics in %s',
+                                 self.directory)
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path != own:
+                    data = self._load(path)
+                    if data is not None:
+                        snapshots.append(data)
+            return snapshots
+
+    @contextmanager
+    def _directory_lock(self):
+        """Keep other scrapes, in any process, from compacting meanwhile."""
+        with self._lock:
+            if fcntl is None or not os.path.isdir(self.directory):
+                yield
+                return
+            with open(self.path('lock', ''), 'a') as file:
+                fcntl.lockf(file, fcntl.LOCK_EX)
+                yield
+
+    def _compact(self):
+        """Fold the files of exited processes into compacted.json."""
+        if fcntl is None:
+            return
+        dead = []
+        for path in glob.glob(os.path.join(self.directory, '*.alive')):
+            name = os.path.basename(path)[:-len('.alive')]
+            # Closing our own file would drop our lock
+            if name == self._id:
+                continue
+            try:
+                with open(path, 'a') as file:
+                    fcntl.lockf(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue  # Still running
+            dead.append(name)
+        if not dead:
+            return
+        totals = merge({}, self._load(self.path(self.COMPACTED)) or {})
+        for name in dead:
+            merge(totals, self._load(self.path(name)) or {})
+        path = self.path(self.COMPACTED)
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump({name: [[list(labels), value]
+                              for labels, value in series.items()]
+                       for name, series in totals.items()}, file)
+        os.replace(f'{path}.tmp', path)
+        for name in dead:
+            for suffix in ('.json', '.alive'):
+                try:
+                    os.remove(self.path(name, suffix))
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            # Exited before its first write
+            return None
+        except (OSError, ValueError):
+            # Replaced while being read
+            logger.warning('Skipped unreadable metrics file %s', path)
+            return None
+
+
+exporter = FileExporter()
@@ -0,0 +1,87 @@
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from . import metrics
+
+UNRESOLVED = ('unresolved', '', '')
+
+
+def view_labels(request, view_func):
+    """(view, action, method) labels: the DRF action for viewsets."""
+    method = request.method.lower()
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    name = cls.__name__ if cls else getattr(view_func, '__name__', 'view')
+    actions = getattr(view_func, 'actions', None) or {}
+    return name, actions.get(method, method), request.method
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request for the metrics endpoint and, for a sampled
+    fraction (REQUEST_METRICS['SAMPLE_RATE']), its database queries and
+    serializers too. Adds a Server-Timing header with what was measured.
+
+    Durations end when the response is returned, before a streaming
+    response's body is produced.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        metrics.install()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = settings.REQUEST_METRICS
+        if not config['ENABLED']:
+            return self.get_response(request)
+        timing, token = self.start(config)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.current_timing.reset(token)
+        return self.finish(request, response, config, started, timing)
+
+    async def __acall__(self, request):
+        config = settings.REQUEST_METRICS
+        if not config['ENABLED']:
+            return await self.get_response(request)
+        timing, token = self.start(config)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.current_timing.reset(token)
+        return self.finish(request, response, config, started, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = view_labels(request, view_func)
+
+    def start(self, config):
+        if random.random() >= config['SAMPLE_RATE']:
+            return None, None
+        timing = metrics.RequestTiming()
+        return timing, metrics.current_timing.set(timing)
+
+    def finish(self, request, response, config, started, timing):
+        duration = time.perf_counter() - started
+        labels = getattr(request, 'metrics_labels', UNRESOLVED)
+        metrics.observe_request(labels, response.status_code, duration, timing)
+        if config['SERVER_TIMING']:
+            entries = []
+            if timing is not None:
+                entries += [
+                    f'db;dur={timing.db * 1000:.1f};desc="{timing.queries} queries"',
+                    f'serializer;dur={timing.serializer * 1000:.1f}',
+                ]
+            entries.append(f'total;dur={duration * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+        return response
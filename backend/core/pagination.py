@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Keyset pagination for append-heavy feeds such as the activity log and
+    sales. Pages are fetched with `WHERE created_at < cursor` on an index
+    instead of COUNT(*) plus OFFSET, so page cost does not grow with the
+    table and rows inserted while paging are neither skipped nor repeated.
+    Small catalogs keep the default page-number pagination.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -39,6 +40,8 @@ INSTALLED_APPS = [
     'stores',
     'sales',
     'inventory',
+    'sync',
+    'ops',
     # 'api',  # Uncomment after creation
     'allauth',
     'allauth.account',
@@ -48,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -79,13 +83,99 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
-# Database
-DATABASES = {
+# Database: DB_ENGINE=postgresql connects with the DB_* variables used by
+# setup_db.py, anything else uses a local SQLite file
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USER'),
+            'PASSWORD': os.getenv('DB_PASSWORD'),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Persistent connections, checked before each request reuses them
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # Set DB_POOLER=1 behind a transaction-pooling PgBouncer, where
+            # server-side cursors (QuerySet.iterator()) do not survive
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER', '0') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+elif os.getenv('SQLITE_TUNED', '1') == '1':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before failing
+                'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+                'transaction_mode': 'IMMEDIATE',
+                'pragmas': {
+                    # Readers do not block the writer and vice versa
+                    'journal_mode': 'WAL',
+                    # A power loss may drop the last commits but cannot
+                    # corrupt a WAL database
+                    'synchronous': 'NORMAL',
+                    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 2**20)),
+                    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64000)),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Cache. Catalog list versions, the barcode/SKU lookup cache and the
+# authenticated user cache are invalidated through it, so every worker
+# process must share the same backend: 'redis' (default) or 'memcached'
+# at CACHE_LOCATION. 'file' is an opt-in for a few workers on one host;
+# Django lists the directory on every set() to cull it, so it keeps few
+# entries. 'locmem' is per process and only correct with a single
+# worker, e.g. runserver.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis')
+CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache',
+              'redis://127.0.0.1:6379'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache',
+                  '127.0.0.1:11211'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             str(BASE_DIR / 'cache')),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f'CACHE_BACKEND must be one of {", ".join(CACHE_BACKENDS)}')
+# gunicorn and uvicorn read their worker count from WEB_CONCURRENCY
+if CACHE_BACKEND == 'locmem' and int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND=locmem is per process; use redis or memcached with '
+        'more than one worker')
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        # Keeps deployments that share one server apart
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', ''),
     }
 }
+# Entries kept by the backends that cull themselves
+CACHE_MAX_ENTRIES = {'file': 1000, 'locmem': 100000}
+if CACHE_BACKEND in CACHE_MAX_ENTRIES:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv(
+            'CACHE_MAX_ENTRIES', CACHE_MAX_ENTRIES[CACHE_BACKEND])),
+    }
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -126,7 +216,7 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -141,6 +231,78 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Audit log: UserActivity rows are buffered and bulk-inserted in the
+# background. Set AUDIT_SINK_BACKEND=users.audit.SyncAuditSink to write
+# them in the request instead (the test runner always does).
+AUDIT_SINK = {
+    'BACKEND': os.getenv('AUDIT_SINK_BACKEND', 'users.audit.BufferedAuditSink'),
+    'OPTIONS': {
+        'batch_size': int(os.getenv('AUDIT_SINK_BATCH_SIZE', 500)),
+        'flush_interval': float(os.getenv('AUDIT_SINK_FLUSH_INTERVAL', 1.0)),
+        'max_queue_size': int(os.getenv('AUDIT_SINK_MAX_QUEUE_SIZE', 100000)),
+    },
+}
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Product image thumbnails (see inventory/images.py). Resizing runs on a
+# local thread pool after the upload commits; WORKERS=0 runs it inline.
+PRODUCT_IMAGES = {
+    'WORKERS': int(os.getenv('PRODUCT_IMAGE_WORKERS', 2)),
+    'SIZES': {'thumb': 100, 'small': 300, 'medium': 800},
+    'FORMATS': ['jpeg', 'webp'],
+    'QUALITY': int(os.getenv('PRODUCT_IMAGE_QUALITY', 82)),
+}
+
+# Barcode/SKU lookup cache (see inventory/cache.py). CACHE must be shared
+# by all workers (see CACHES); LOCAL_TTL then bounds how long another
+# process may serve an entry invalidated elsewhere.
+PRODUCT_LOOKUP_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 3600,
+    'LOCAL_MAXSIZE': 10000,
+    'LOCAL_TTL': 5,
+}
+
+# Maximum entries accepted by one bulk store inventory adjustment request
+STORE_INVENTORY_ADJUST_MAX_ROWS = int(
+    os.getenv('STORE_INVENTORY_ADJUST_MAX_ROWS', 10000))
+
+# Sales older than this many days cannot be deleted (refunded)
+SALE_REFUND_WINDOW_DAYS = int(os.getenv('SALE_REFUND_WINDOW_DAYS', 30))
+
+# Seconds a category/product list page is cached. Entries are keyed by
+# per-model versions bumped on every write, so this only bounds memory.
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 3600))
+
+# Delta sync (see sync/views.py)
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', 1000))
+SYNC_MAX_PAGE_SIZE = int(os.getenv('SYNC_MAX_PAGE_SIZE', 5000))
+SYNC_SETTLE_SECONDS = int(os.getenv('SYNC_SETTLE_SECONDS', 5))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(
+    os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Streaming exports (see core/exports.py): rows read per query and
+# exports streamed at once per process
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', 2))
+
+# Seconds a low-stock report page is cached
+LOW_STOCK_CACHE_TIMEOUT = int(os.getenv('LOW_STOCK_CACHE_TIMEOUT', 60))
+
+# Request metrics served at /api/metrics/ (see core/metrics.py). Every
+# request is counted and timed; SAMPLE_RATE of them also record query and
+# serializer time. SERVER_TIMING adds a Server-Timing response header.
+# Workers write their metrics to DIRECTORY every FLUSH_INTERVAL seconds so
+# a scrape of any worker reports them all; empty keeps them per process.
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS_ENABLED', '1') == '1',
+    'SAMPLE_RATE': float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.1)),
+    'SERVER_TIMING': os.getenv('REQUEST_METRICS_SERVER_TIMING', '1') == '1',
+    'DIRECTORY': os.getenv('REQUEST_METRICS_DIR', str(BASE_DIR / 'metrics')),
+    'FLUSH_INTERVAL': float(os.getenv('REQUEST_METRICS_FLUSH_INTERVAL', 1)),
+}
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -159,7 +321,30 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.FilteredTokenRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'users.serializers.FilteredTokenBlacklistSerializer',
+}
+
+# Refresh token blacklist checks go through an in-process filter (see
+# users/revocation.py). SYNC_INTERVAL bounds how long another process may
+# accept a token revoked elsewhere. Run purge_expired_tokens periodically
+# to keep the token tables proportional to live sessions.
+TOKEN_REVOCATION_FILTER = {
+    'SYNC_INTERVAL': float(os.getenv('TOKEN_REVOCATION_SYNC_INTERVAL', 1)),
+    'REBUILD_INTERVAL': int(os.getenv('TOKEN_REVOCATION_REBUILD_INTERVAL', 300)),
+    'ERROR_RATE': 0.01,
+}
+
+# Authenticated users are cached for TIMEOUT seconds (see
+# users/authentication.py); saves and deletes drop the entry at once in
+# every worker, provided CACHE is shared by all of them (see CACHES)
+AUTH_USER_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60)),
 }
+# Sign the user's role into JWTs so permission checks read it from the token
+JWT_ROLE_CLAIM = os.getenv('JWT_ROLE_CLAIM', '0') == '1'
 
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
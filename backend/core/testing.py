@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs tests with audit records and image thumbnails written
+    synchronously, and an in-process cache and request metrics rather
+    than the shared ones.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.AUDIT_SINK = {'BACKEND': 'users.audit.SyncAuditSink'}
+        settings.PRODUCT_IMAGES = {**settings.PRODUCT_IMAGES, 'WORKERS': 0}
+        settings.REQUEST_METRICS = {**settings.REQUEST_METRICS, 'DIRECTORY': ''}
+        self.cache_settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class QueryCountAssertionsMixin:
+    """
+    Assertions for APITestCase subclasses that guard against N+1 queries:
+    an endpoint must run the same number of queries no matter how many rows
+    (or related rows) it serializes.
+    """
+
+    def count_queries(self, url):
+        # Measure the uncached path of versioned list responses
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(ctx.captured_queries)
+
+    def assertListQueriesConstant(self, url, create_rows, sizes=(1, 10)):
+        """
+        Grow the table to each of `sizes` rows via `create_rows(n)` and check
+        that listing `url` costs the same number of queries every time.
+        """
+        counts = {}
+        created = 0
+        for size in sizes:
+            create_rows(size - created)
+            created = size
+            counts[size] = self.count_queries(url)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"{url} query count varies with page size: {counts}")
+
+    def assertDetailQueriesConstant(self, urls):
+        """
+        Check that every detail url in `urls`, typically objects with
+        different numbers of related rows, costs the same number of queries.
+        """
+        counts = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"detail query counts differ: {counts}")
@@ -0,0 +1,226 @@
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from decimal import Decimal
+from unittest import skipUnless
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from core import metrics
+from core.backends.sqlite3.base import DatabaseWrapper
+from inventory.models import Category, Product
+from sales.models import Sale
+from stores.models import Store
+from users.models import User, UserActivity
+
+
+class TunedSQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        path = os.path.join(tempfile.mkdtemp(), 'db.sqlite3')
+        self.wrapper = DatabaseWrapper({
+            'NAME': path,
+            'OPTIONS': {
+                'timeout': 0,
+                'transaction_mode': 'IMMEDIATE',
+                'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+            },
+            'TIME_ZONE': None,
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False,
+        }, alias='tuned')
+        self.addCleanup(self.wrapper.close)
+        self.other = sqlite3.connect(path, timeout=0, isolation_level=None)
+        self.addCleanup(self.other.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connections(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_transactions_take_write_lock_at_begin(self):
+        self.wrapper.ensure_connection()
+        self.wrapper._start_transaction_under_autocommit()
+        self.addCleanup(self.wrapper.rollback)
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            self.other.execute('BEGIN IMMEDIATE')
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', category=self.category,
+                    sku=f'SKU-{i:03d}', price=Decimal('1.50'))
+            for i in range(25)
+        ])
+        self.stores = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+        for i in range(6):
+            Sale.objects.create(store=self.stores[i % 2], total_amount=i,
+                                payment_method='cash')
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=10)
+    def test_product_csv_streams_in_chunks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/inventory/products/export/')
+            rows = list(csv.DictReader(io.StringIO(self.content(response).decode())))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="products-', response['Content-Disposition'])
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['sku'], 'SKU-000')
+        self.assertEqual(rows[0]['category_name'], 'Snacks')
+        # One query per chunk of 10 rows, none per row
+        export_queries = [q for q in ctx.captured_queries
+                          if 'inventory_product' in q['sql']]
+        self.assertEqual(len(export_queries), 3)
+
+    def test_sales_ndjson_gzip_honors_filters(self):
+        response = self.client.get('/api/sales/export/', {
+            'file_format': 'ndjson', 'gzip': 'true', 'store': self.stores[0].id})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(self.content(response)).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['store_id'] for row in rows}, {self.stores[0].id})
+
+    def test_activity_export_requires_super_admin(self):
+        response = self.client.get('/api/activities/export/')
+        self.assertEqual(response.status_code, 403)
+        UserActivity.objects.create(
+            user=self.user, action_type='CR', model_name='Product',
+            object_id=1, details={'name': 'x'})
+        self.user.role = User.Role.SUPER_ADMIN
+        self.user.save()
+        response = self.client.get('/api/activities/export/')
+        rows = list(csv.DictReader(io.StringIO(self.content(response).decode())))
+        self.assertEqual(json.loads(rows[0]['details']), {'name': 'x'})
+
+
+def record_in_worker(labels):
+    metrics.observe_request(labels, 200, 0.01)
+    metrics.observe_request(labels, 200, 0.02)
+    metrics.exporter.flush()
+
+
+@override_settings(REQUEST_METRICS={
+    'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True})
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass',
+            role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        Product.objects.create(name='Chips', category=category, sku='SKU-1',
+                               price=Decimal('1.00'))
+
+    def scrape(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_server_timing_reports_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/inventory/products/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", '
+                                 r'serializer;dur=[\d.]+, total;dur=[\d.]+$')
+        queries = int(re.search(r'(\d+) queries', timing).group(1))
+        self.assertEqual(queries, len(ctx.captured_queries))
+
+    def test_metrics_by_view_and_action(self):
+        self.client.get('/api/inventory/products/')
+        self.client.get('/api/inventory/products/lookup/', {'sku': 'SKU-1'})
+        self.client.get('/api/no-such-endpoint/')
+        text = self.scrape()
+        labels = '{view="ProductViewSet",action="%s",method="GET"'
+        self.assertIn(labels % 'list' + ',status="200"} 1', text)
+        self.assertIn(labels % 'lookup' + ',status="200"} 1', text)
+        self.assertIn('{view="unresolved",action="",method="",status="404"} 1', text)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_request_db_queries_bucket' + labels % 'list'
+                      + ',le="+Inf"} 1', text)
+        self.assertIn('http_request_serializer_duration_seconds_count'
+                      + labels % 'list' + '} 1', text)
+
+    @override_settings(REQUEST_METRICS={
+        'ENABLED': True, 'SAMPLE_RATE': 0.0, 'SERVER_TIMING': True})
+    def test_unsampled_requests_are_only_timed(self):
+        response = self.client.get('/api/inventory/products/')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+$')
+        text = self.scrape()
+        self.assertIn('http_request_duration_seconds_count', text)
+        self.assertNotIn('http_request_db_queries_count', text)
+
+    @override_settings(REQUEST_METRICS={
+        'ENABLED': False, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True})
+    def test_disabled(self):
+        response = self.client.get('/api/inventory/products/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('http_requests_total{', self.scrape())
+
+    @skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_scrape_adds_up_all_workers(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(REQUEST_METRICS={
+                **settings.REQUEST_METRICS, 'DIRECTORY': directory}):
+            self.client.get('/api/inventory/products/')
+            # The forked worker starts from empty metrics, not this process's
+            worker = multiprocessing.get_context('fork').Process(
+                target=record_in_worker,
+                args=(('ProductViewSet', 'list', 'GET'),))
+            worker.start()
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+            metrics.exporter.flush()
+            files = [name for name in os.listdir(directory)
+                     if name.endswith('.json')]
+            self.assertEqual(len(files), 2)
+            text = self.scrape()
+            # The exited worker's file is folded into compacted.json
+            self.assertEqual(
+                sorted(name for name in os.listdir(directory)
+                       if name.endswith('.json')),
+                sorted([f'{metrics.exporter._id}.json', 'compacted.json']))
+            compacted = self.scrape()
+        labels = '{view="ProductViewSet",action="list",method="GET"'
+        for text in (text, compacted):
+            self.assertIn(labels + ',status="200"} 3', text)
+            self.assertIn('http_request_duration_seconds_count' + labels + '} 3',
+                          text)
+            self.assertIn('http_request_db_queries_count' + labels + '} 1', text)
+
+    def test_metrics_require_super_admin(self):
+        self.user.role = User.Role.ADMIN
+        self.user.save()
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
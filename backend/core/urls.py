@@ -8,6 +8,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenBlacklistView,
 )
+from .views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,5 +22,9 @@ urlpatterns = [
          name='swagger-ui'),
     path('api/inventory/', include('inventory.urls')),
     path('api/', include('sales.urls')),
+    path('api/', include('stores.urls')),
+    path('api/', include('sync.urls')),
+    path('api/async/', include('core.asyncurls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     path('accounts/', include('allauth.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from users.permissions import IsSuperAdmin
+from . import metrics
+
+
+class MetricsView(APIView):
+    """Request metrics of every worker on this host, as Prometheus text."""
+    permission_classes = [IsAuthenticated, IsSuperAdmin]
+
+    @extend_schema(responses={(200, 'text/plain'): OpenApiTypes.STR})
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
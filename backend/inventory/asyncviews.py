@@ -0,0 +1,57 @@
+import json
+from django.conf import settings
+from rest_framework import exceptions, status
+from core.asyncviews import AsyncAPIView, AsyncListView, json_response
+from .cache import (
+    PRODUCT_ON_HAND, arefresh_on_hand, product_list_models, product_lookup_cache)
+from .serializers import ProductLookupRequestSerializer
+from .views import ProductViewSet, StockViewSet
+
+
+class ProductListView(AsyncListView):
+    viewset_class = ProductViewSet
+    cache_prefix = 'product-list'
+    cache_timeout = settings.CATALOG_CACHE_TIMEOUT
+    live_models = [PRODUCT_ON_HAND]
+    local_params = AsyncListView.local_params | {'in_stock'}
+
+    def get_cache_models(self, request):
+        return product_list_models(request.GET)
+
+    async def refresh(self, data):
+        return await arefresh_on_hand(data)
+
+
+class ProductLookupView(AsyncAPIView):
+    """Async version of ProductViewSet.lookup."""
+
+    async def get(self, request):
+        for kind in ('barcode', 'sku'):
+            code = request.GET.get(kind)
+            if code:
+                product = (await product_lookup_cache.aget_many(
+                    kind, [code])).get(code)
+                if product is None:
+                    return json_response({'error': 'Product not found'},
+                                         status.HTTP_404_NOT_FOUND)
+                return json_response(product)
+        return json_response({'error': 'Either barcode or sku is required'},
+                             status.HTTP_400_BAD_REQUEST)
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise exceptions.ParseError(f'JSON parse error - {e}')
+        serializer = ProductLookupRequestSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        results = {}
+        for kind in ('barcode', 'sku'):
+            codes = serializer.validated_data.get(f'{kind}s', [])
+            found = await product_lookup_cache.aget_many(kind, codes)
+            results[f'{kind}s'] = {code: found.get(code) for code in codes}
+        return json_response(results)
+
+
+class StockListView(AsyncListView):
+    viewset_class = StockViewSet
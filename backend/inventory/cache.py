@@ -0,0 +1,198 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from .models import Category, Product
+from .serializers import ProductLookupSerializer
+
+LOOKUP_KINDS = ('barcode', 'sku')
+
+# Version of Product.on_hand, which every sale and stock movement changes.
+# Product list pages are cached without it and refreshed on each hit.
+PRODUCT_ON_HAND = 'inventory.product.on_hand'
+
+
+def product_list_models(params):
+    """The models a cached product list page is keyed on."""
+    # Rows embed the category name
+    models = [Product, Category]
+    # Filtering or ordering on on_hand changes which rows a page holds
+    if 'in_stock' in params or 'on_hand' in params.get('ordering', ''):
+        models.append(PRODUCT_ON_HAND)
+    return models
+
+
+def refresh_on_hand(data):
+    """Update on_hand in a cached product list page."""
+    rows = data['results']
+    on_hand = dict(Product.objects.filter(
+        id__in=[row['id'] for row in rows]).values_list('id', 'on_hand'))
+    for row in rows:
+        row['on_hand'] = on_hand.get(row['id'], row['on_hand'])
+    return data
+
+
+async def arefresh_on_hand(data):
+    """Async `refresh_on_hand`."""
+    rows = data['results']
+    on_hand = {id: value async for id, value in Product.objects.filter(
+        id__in=[row['id'] for row in rows]).values_list('id', 'on_hand')}
+    for row in rows:
+        row['on_hand'] = on_hand.get(row['id'], row['on_hand'])
+    return data
+
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize=10000, ttl=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ProductLookupCache:
+    """
+    Two-tier cache of exact barcode/SKU lookups: a per-process LRU in front
+    of Django's cache framework, falling back to one IN query for misses.
+
+    Saves and deletes invalidate the affected codes in the shared cache and
+    in this process's LRU by giving each code a new version token. Shared
+    entries carry the version read before their database query, so a fill
+    that raced with a write is never served. Bulk writes call `clear()`,
+    which bumps a generation number that is part of every shared key. Other processes
+    drop their local copies when LOCAL_TTL expires, so keep it short, and
+    see the shared invalidation only if every worker uses the same cache
+    backend for PRODUCT_LOOKUP_CACHE['CACHE'].
+    """
+    generation_key = 'product-lookup:generation'
+
+    def __init__(self):
+        config = getattr(settings, 'PRODUCT_LOOKUP_CACHE', {})
+        self.cache_alias = config.get('CACHE', 'default')
+        self.timeout = config.get('TIMEOUT', 3600)
+        self.local = LocalLRUCache(
+            maxsize=config.get('LOCAL_MAXSIZE', 10000),
+            ttl=config.get('LOCAL_TTL', 5))
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def generation(self):
+        return self.shared.get_or_set(self.generation_key, time.time_ns, None)
+
+    @staticmethod
+    def digest(code):
+        # Hash the code: barcodes may contain characters memcached rejects
+        return hashlib.md5(code.encode()).hexdigest()
+
+    def shared_key(self, generation, kind, code):
+        return f'product-lookup:{generation}:{kind}:{self.digest(code)}'
+
+    def version_key(self, kind, code):
+        return f'product-lookup:version:{kind}:{self.digest(code)}'
+
+    def get_many(self, kind, codes):
+        """Return {code: product data} for every code that exists."""
+        found = {}
+        missing = []
+        for code in codes:
+            value = self.local.get((kind, code))
+            if value is None:
+                missing.append(code)
+            else:
+                found[code] = value
+        if not missing:
+            return found
+
+        generation = self.generation()
+        keys = {self.shared_key(generation, kind, code): code
+                for code in missing}
+        version_keys = {self.version_key(kind, code): code for code in missing}
+        cached = self.shared.get_many([*keys, *version_keys])
+        versions = {code: cached.get(key) for key, code in version_keys.items()}
+        for key, code in keys.items():
+            entry = cached.get(key)
+            # Filled before the code's last invalidation
+            if entry is None or entry[0] != versions[code]:
+                continue
+            found[code] = entry[1]
+            self.local.set((kind, code), entry[1])
+        missing = [code for code in missing if code not in found]
+        if not missing:
+            return found
+
+        products = Product.objects.select_related('category').filter(
+            **{f'{kind}__in': missing})
+        fetched = {}
+        for product in products:
+            code = getattr(product, kind)
+            fetched[code] = dict(ProductLookupSerializer(product).data)
+            self.local.set((kind, code), fetched[code])
+        self.shared.set_many(
+            {self.shared_key(generation, kind, code): (versions[code], value)
+             for code, value in fetched.items()},
+            self.timeout)
+        found.update(fetched)
+        return found
+
+    async def aget_many(self, kind, codes):
+        """Async `get_many`: local hits are served without leaving the event loop."""
+        found = {}
+        missing = []
+        for code in codes:
+            value = self.local.get((kind, code))
+            if value is None:
+                missing.append(code)
+            else:
+                found[code] = value
+        if missing:
+            found.update(await sync_to_async(self.get_many)(kind, missing))
+        return found
+
+    def invalidate(self, codes):
+        """Drop cached entries for (kind, code) pairs."""
+        version = time.time_ns()
+        self.shared.set_many({self.version_key(kind, code): version
+                              for kind, code in codes}, None)
+        for key in codes:
+            self.local.delete(key)
+
+    def clear(self):
+        self.shared.set(self.generation_key, time.time_ns(), None)
+        self.local.clear()
+
+
+product_lookup_cache = ProductLookupCache()
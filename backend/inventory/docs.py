@@ -4,8 +4,9 @@ from drf_spectacular.types import OpenApiTypes
 # Category ViewSet documentation
 category_list_docs = extend_schema(
     summary="List all categories",
-    description="Returns a list of all product categories with pagination.",
-    responses={200: "List of categories retrieved successfully"},
+    description="Returns a list of all product categories with pagination. Responses are cached until the next "
+                "category write and carry an ETag; send it back in If-None-Match to get 304 Not Modified.",
+    responses={200: "List of categories retrieved successfully", 304: "Not modified since the given ETag"},
     tags=["Categories"]
 )
 
@@ -42,13 +43,20 @@ category_delete_docs = extend_schema(
 # Product ViewSet documentation
 product_list_docs = extend_schema(
     summary="List all products",
-    description="Returns a list of all products with pagination and filtering options.",
+    description="Returns a list of all products with pagination and filtering options. Responses are cached until "
+                "the next product or category write and carry an ETag; send it back in If-None-Match to get "
+                "304 Not Modified.",
     parameters=[
         OpenApiParameter(
             name="category",
             type=OpenApiTypes.INT,
             description="Filter products by category ID"
         ),
+        OpenApiParameter(
+            name="in_stock",
+            type=OpenApiTypes.BOOL,
+            description="Only products with (true) or without (false) stock on hand across all stores"
+        ),
         OpenApiParameter(
             name="search",
             type=OpenApiTypes.STR,
@@ -57,16 +65,18 @@ product_list_docs = extend_schema(
         OpenApiParameter(
             name="ordering",
             type=OpenApiTypes.STR,
-            description="Order products by field (name, price, created_at)"
+            description="Order products by field (name, price, on_hand, created_at)"
         )
     ],
-    responses={200: "List of products retrieved successfully"},
+    responses={200: "List of products retrieved successfully", 304: "Not modified since the given ETag"},
     tags=["Products"]
 )
 
 product_create_docs = extend_schema(
     summary="Create a new product",
-    description="Creates a new product with optional barcode and image.",
+    description="Creates a new product with optional barcode and image. Images are stored once per distinct "
+                "content; thumbnails (JPEG and WebP at each configured size) are generated in the background "
+                "after the request, and `thumbnails` stays null until they are ready.",
     request={
         "multipart/form-data": {
             "type": "object",
@@ -89,6 +99,139 @@ product_create_docs = extend_schema(
     tags=["Products"]
 )
 
+product_search_docs = extend_schema(
+    summary="Full-text product search",
+    description="Searches product name, description, SKU and barcode using the database's full-text index. "
+                "Every word must match, the last characters of each word are matched as a prefix, and results "
+                "are ordered by relevance. The response includes per-category match counts.",
+    parameters=[
+        OpenApiParameter(
+            name="q",
+            type=OpenApiTypes.STR,
+            description="Search terms",
+            required=True
+        ),
+        OpenApiParameter(
+            name="category",
+            type=OpenApiTypes.INT,
+            description="Only return products in this category (facets still cover all categories)"
+        ),
+        OpenApiParameter(
+            name="page",
+            type=OpenApiTypes.INT,
+            description="Page number"
+        ),
+        OpenApiParameter(
+            name="page_size",
+            type=OpenApiTypes.INT,
+            description="Results per page (max 100)"
+        )
+    ],
+    responses={
+        200: "Ranked search results with category facets",
+        400: "Invalid query parameters"
+    },
+    tags=["Products"]
+)
+
+product_lookup_docs = extend_schema(
+    summary="Look up products by barcode or SKU",
+    description="Exact-match lookup for scanners, served from an in-process cache backed by the shared cache. "
+                "GET takes a single barcode or sku query parameter and returns the product or 404. "
+                "POST takes lists of barcodes and skus and returns a mapping of each code to its product, or null if unknown.",
+    parameters=[
+        OpenApiParameter(
+            name="barcode",
+            type=OpenApiTypes.STR,
+            description="Product barcode (GET only)"
+        ),
+        OpenApiParameter(
+            name="sku",
+            type=OpenApiTypes.STR,
+            description="Product SKU (GET only)"
+        )
+    ],
+    request={
+        "application/json": {
+            "type": "object",
+            "properties": {
+                "barcodes": {"type": "array", "items": {"type": "string"}, "description": "Barcodes to look up"},
+                "skus": {"type": "array", "items": {"type": "string"}, "description": "SKUs to look up"}
+            }
+        }
+    },
+    responses={
+        200: "Product(s) found",
+        400: "No barcode or SKU given",
+        404: "Product not found"
+    },
+    tags=["Products"]
+)
+
+product_import_docs = extend_schema(
+    summary="Bulk import products",
+    description="Upserts products by SKU from a CSV or NDJSON file. The file is processed in chunks with "
+                "bulk inserts and updates; rows that fail validation are reported individually instead of "
+                "failing the whole import. Only accessible by super admin.",
+    request={
+        "multipart/form-data": {
+            "type": "object",
+            "properties": {
+                "file": {"type": "string", "format": "binary", "description": "CSV or NDJSON file with name, category, sku, price and optional description and barcode"},
+                "format": {"type": "string", "enum": ["csv", "ndjson"], "description": "File format (detected from the file extension by default)"},
+                "create_categories": {"type": "boolean", "description": "Create categories that do not exist yet"}
+            },
+            "required": ["file"]
+        }
+    },
+    responses={
+        200: "Import finished; returns created/updated counts and per-row errors",
+        400: "Missing file or unsupported format"
+    },
+    tags=["Products"]
+)
+
+product_bulk_price_update_docs = extend_schema(
+    summary="Bulk update product prices",
+    description="Updates prices either from a list of explicit prices keyed by product ID or SKU, or by applying "
+                "a percentage or multiplier to every product matching a rule. Each request runs as one set-based "
+                "update in a transaction and records a price update activity per product. Only accessible by super admin.",
+    request={
+        "application/json": {
+            "type": "object",
+            "properties": {
+                "updates": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "product_id": {"type": "integer", "description": "Product ID"},
+                            "sku": {"type": "string", "description": "Product SKU (instead of product_id)"},
+                            "new_price": {"type": "number", "description": "New product price"}
+                        },
+                        "required": ["new_price"]
+                    }
+                },
+                "rule": {
+                    "type": "object",
+                    "properties": {
+                        "category": {"type": "integer", "description": "Only products in this category"},
+                        "sku_prefix": {"type": "string", "description": "Only products whose SKU starts with this prefix"},
+                        "percent": {"type": "number", "description": "Percentage change, e.g. 5 or -10"},
+                        "multiplier": {"type": "number", "description": "Price multiplier, e.g. 0.9 (instead of percent)"}
+                    }
+                }
+            }
+        }
+    },
+    responses={
+        200: "Prices updated successfully",
+        400: "Invalid input data",
+        404: "No matching products found"
+    },
+    tags=["Products"]
+)
+
 product_delete_docs = extend_schema(
     summary="Delete a product",
     description="Deletes a product. This will fail if there are sales or stock entries associated with this product.",
@@ -124,6 +267,22 @@ stock_list_docs = extend_schema(
     tags=["Stock"]
 )
 
+stock_low_stock_docs = extend_schema(
+    summary="List low stock",
+    description="Returns stock entries whose quantity is at or below the reorder level, with the shortfall and "
+                "a suggested order quantity based on the reorder quantity. Filtered in the database using a "
+                "partial index; pages are cached briefly.",
+    parameters=[
+        OpenApiParameter(
+            name="product",
+            type=OpenApiTypes.INT,
+            description="Filter by product ID"
+        )
+    ],
+    responses={200: "List of low stock entries retrieved successfully"},
+    tags=["Stock"]
+)
+
 stock_update_docs = extend_schema(
     summary="Update stock quantity",
     description="Updates the quantity of a product in stock.",
@@ -154,3 +313,53 @@ stock_delete_docs = extend_schema(
     },
     tags=["Stock"]
 )
+
+product_export_docs = extend_schema(
+    summary="Export products",
+    description="Streams every product matching the list filters as CSV or NDJSON, optionally gzipped, "
+                "without pagination.",
+    parameters=[
+        OpenApiParameter(
+            name="file_format",
+            type=OpenApiTypes.STR,
+            enum=["csv", "ndjson"],
+            description="Output format (default csv)"
+        ),
+        OpenApiParameter(
+            name="gzip",
+            type=OpenApiTypes.BOOL,
+            description="Gzip the file"
+        )
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.BINARY,
+        400: "Invalid export parameters",
+        429: "Too many exports in progress"
+    },
+    tags=["Products"]
+)
+
+stock_export_docs = extend_schema(
+    summary="Export stock entries",
+    description="Streams every stock entry matching the list filters as CSV or NDJSON, optionally gzipped, "
+                "without pagination.",
+    parameters=[
+        OpenApiParameter(
+            name="file_format",
+            type=OpenApiTypes.STR,
+            enum=["csv", "ndjson"],
+            description="Output format (default csv)"
+        ),
+        OpenApiParameter(
+            name="gzip",
+            type=OpenApiTypes.BOOL,
+            description="Gzip the file"
+        )
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.BINARY,
+        400: "Invalid export parameters",
+        429: "Too many exports in progress"
+    },
+    tags=["Stock"]
+)
@@ -0,0 +1,16 @@
+import django_filters
+from .models import Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    # Reads the denormalized total instead of aggregating store inventory
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'in_stock']
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(on_hand__gt=0)
+        return queryset.filter(on_hand__lte=0)
@@ -0,0 +1,175 @@
+"""
+Product image storage and thumbnail generation.
+
+Uploads are stored once per distinct content under a SHA-256 derived name
+(`products/originals/ab/<hash>.<ext>`), so identical files share one
+original and one set of thumbnails. Resizing runs after the request's
+transaction commits, on a small local thread pool; `Product.image_hash`
+is set once the thumbnails exist and the serializer only then exposes
+per-size URLs.
+
+Configured by the PRODUCT_IMAGES setting:
+
+    PRODUCT_IMAGES = {
+        'WORKERS': 2,  # 0 resizes in the request thread after commit
+        'SIZES': {'thumb': 100, 'small': 300, 'medium': 800},
+        'FORMATS': ['jpeg', 'webp'],
+        'QUALITY': 82,
+    }
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+from core.cache import bump_versions
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'gif': 'gif', 'webp': 'webp'}
+CONTENT_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def image_settings():
+    config = getattr(settings, 'PRODUCT_IMAGES', {})
+    return {
+        'WORKERS': config.get('WORKERS', 2),
+        'SIZES': config.get('SIZES', {'thumb': 100, 'small': 300, 'medium': 800}),
+        'FORMATS': config.get('FORMATS', ['jpeg', 'webp']),
+        'QUALITY': config.get('QUALITY', 82),
+    }
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def original_name(digest, image_format):
+    extension = EXTENSIONS.get((image_format or '').lower(), 'img')
+    return f'products/originals/{digest[:2]}/{digest}.{extension}'
+
+
+def thumbnail_name(digest, size, image_format):
+    return f'products/thumbs/{digest[:2]}/{digest}/{size}.{EXTENSIONS[image_format]}'
+
+
+def thumbnail_urls(digest):
+    """Return {size: {format: url}} for a processed image; no storage I/O."""
+    config = image_settings()
+    return {
+        size: {image_format: default_storage.url(
+            thumbnail_name(digest, size, image_format))
+            for image_format in config['FORMATS']}
+        for size in config['SIZES']
+    }
+
+
+def store_image(product, file):
+    """
+    Store an uploaded image content-addressed and point the product at it.
+    Thumbnails are generated after commit unless another product already
+    uses the same processed image. Call inside the saving transaction.
+    """
+    digest = content_hash(file)
+    with Image.open(file) as image:
+        name = original_name(digest, image.format)
+    file.seek(0)
+    if not default_storage.exists(name):
+        stored = default_storage.save(name, file)
+        if stored != name:
+            # Lost a race with an identical upload; keep the first copy
+            default_storage.delete(stored)
+
+    processed = Product.objects.filter(
+        image=name).exclude(image_hash='').exists()
+    Product.objects.filter(pk=product.pk).update(
+        image=name, image_hash=digest if processed else '',
+        updated_at=timezone.now())
+    bump_versions(Product)
+    product.image.name = name
+    product.image_hash = digest if processed else ''
+    if not processed:
+        transaction.on_commit(lambda: schedule(digest, name))
+
+
+def schedule(digest, name):
+    workers = image_settings()['WORKERS']
+    if workers <= 0:
+        process_image(digest, name)
+        return
+    get_executor(workers).submit(run_job, digest, name)
+
+
+def get_executor(workers):
+    global _executor, _executor_pid
+    with _lock:
+        # A forked worker process must not reuse the parent's threads
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='product-images')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_job(digest, name):
+    close_old_connections()
+    try:
+        process_image(digest, name)
+    except Exception:
+        logger.exception('Failed to process product image %s', name)
+    finally:
+        close_old_connections()
+
+
+def process_image(digest, name):
+    """Write every missing thumbnail for one original, then mark products."""
+    config = image_settings()
+    with default_storage.open(name, 'rb') as file:
+        with Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            for size, pixels in config['SIZES'].items():
+                thumbnail = image.copy()
+                thumbnail.thumbnail((pixels, pixels), Image.LANCZOS)
+                for image_format in config['FORMATS']:
+                    target = thumbnail_name(digest, size, image_format)
+                    if default_storage.exists(target):
+                        continue
+                    output = thumbnail
+                    if image_format == 'jpeg' and output.mode != 'RGB':
+                        output = output.convert('RGB')
+                    buffer = io.BytesIO()
+                    output.save(buffer, format=image_format.upper(),
+                                quality=config['QUALITY'])
+                    default_storage.save(target, ContentFile(buffer.getvalue()))
+    if Product.objects.filter(image=name, image_hash='').update(
+            image_hash=digest, updated_at=timezone.now()):
+        bump_versions(Product)
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'PRODUCT_IMAGES':
+        with _lock:
+            _executor = None
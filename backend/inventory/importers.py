@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from core.cache import bump_versions
+from .cache import product_lookup_cache
+from .models import Category, Product
+from .serializers import ProductImportRowSerializer
+
+FORMATS = ('csv', 'ndjson')
+UPDATE_FIELDS = ['name', 'description', 'category', 'barcode', 'price',
+                 'updated_at']
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line_number, row_or_error) pairs from a binary stream without
+    loading it into memory. Undecodable NDJSON lines yield a string error.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {
+                key: value for key, value in row.items() if key is not None}
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, 'Expected a JSON object'
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+class ProductImporter:
+    """
+    Upserts products by SKU from an iterable of rows in fixed-size chunks.
+
+    Each chunk costs a constant number of queries: existing SKUs and
+    barcode owners are fetched with one IN query each, new products are
+    bulk inserted and existing ones bulk updated. Invalid rows are
+    collected in `errors` instead of aborting the import.
+    """
+
+    def __init__(self, chunk_size=1000, create_categories=False):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.seen_skus = set()
+        self.seen_barcodes = {}
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def run(self, rows):
+        chunk = []
+        for line, row in rows:
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self.process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.process_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': len(self.errors),
+            'errors': self.errors,
+        }
+
+    def add_error(self, line, errors, sku=None):
+        self.errors.append({'line': line, 'sku': sku, 'errors': errors})
+
+    def process_chunk(self, chunk):
+        valid = []
+        for line, row in chunk:
+            if isinstance(row, str):
+                self.add_error(line, {'non_field_errors': [row]})
+                continue
+            serializer = ProductImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.add_error(line, serializer.errors, row.get('sku'))
+                continue
+            data = serializer.validated_data
+            if data['sku'] in self.seen_skus:
+                self.add_error(
+                    line, {'sku': ['Duplicate SKU in file']}, data['sku'])
+                continue
+            self.seen_skus.add(data['sku'])
+            valid.append((line, data))
+        if not valid:
+            return
+
+        self.resolve_categories({data['category'] for _, data in valid})
+        skus = [data['sku'] for _, data in valid]
+        existing = Product.objects.in_bulk(skus, field_name='sku')
+        barcodes = [data['barcode'] for _, data in valid if data.get('barcode')]
+        barcode_owners = dict(
+            Product.objects.filter(barcode__in=barcodes)
+            .values_list('barcode', 'sku'))
+
+        to_create, to_update, lines = [], [], []
+        now = timezone.now()
+        for line, data in valid:
+            sku = data['sku']
+            category_id = self.categories.get(data['category'])
+            if category_id is None:
+                self.add_error(
+                    line, {'category': [f"Unknown category '{data['category']}'"]}, sku)
+                continue
+            barcode = data.get('barcode')
+            if barcode:
+                owner = barcode_owners.get(
+                    barcode, self.seen_barcodes.get(barcode, sku))
+                if owner != sku:
+                    self.add_error(
+                        line, {'barcode': [f'Barcode already used by SKU {owner}']}, sku)
+                    continue
+                self.seen_barcodes[barcode] = sku
+
+            product = existing.get(sku)
+            if product is None:
+                to_create.append(Product(
+                    sku=sku,
+                    name=data['name'],
+                    description=data.get('description', ''),
+                    category_id=category_id,
+                    barcode=barcode,
+                    price=data['price'],
+                ))
+            else:
+                product.name = data['name']
+                product.category_id = category_id
+                product.price = data['price']
+                if 'description' in data:
+                    product.description = data['description']
+                if 'barcode' in data:
+                    product.barcode = barcode
+                # bulk_update does not apply auto_now
+                product.updated_at = now
+                to_update.append(product)
+            lines.append((line, sku))
+
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create(to_create)
+                Product.objects.bulk_update(to_update, UPDATE_FIELDS)
+        except IntegrityError as e:
+            for line, sku in lines:
+                self.add_error(line, {'non_field_errors': [str(e)]}, sku)
+            return
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        if to_create or to_update:
+            bump_versions(Product)
+        if to_update:
+            product_lookup_cache.clear()
+
+    def resolve_categories(self, names):
+        missing = [name for name in names if name not in self.categories]
+        if not missing or not self.create_categories:
+            return
+        Category.objects.bulk_create(
+            [Category(name=name) for name in missing], ignore_conflicts=True)
+        self.categories.update(
+            Category.objects.filter(name__in=missing).values_list('name', 'id'))
@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from inventory.importers import FORMATS, ProductImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Upsert products by SKU from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='File format (detected from the extension by default)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create categories that do not exist yet')
+        parser.add_argument('--errors', help='Write the per-row error report to this file')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        importer = ProductImporter(
+            chunk_size=options['chunk_size'],
+            create_categories=options['create_categories'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(read_rows(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w') as f:
+                json.dump(report['errors'], f, indent=2)
+        else:
+            for error in report['errors']:
+                self.stderr.write(json.dumps(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, "
+            f"failed {report['failed']}"))
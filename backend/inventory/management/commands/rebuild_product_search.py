@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from inventory.search import BACKENDS
+
+
+class Command(BaseCommand):
+    help = 'Create the product full-text search index if missing and rebuild it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        backend_class = BACKENDS.get(connection.vendor)
+        if backend_class is None:
+            self.stdout.write(
+                f'No full-text index for {connection.vendor}; '
+                'search uses icontains matching.')
+            return
+        backend = backend_class(connection)
+        if not backend.install():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS('Product search index rebuilt.'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_product_barcode_product_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['product'], name='stock_low_stock_idx'),
+        ),
+    ]
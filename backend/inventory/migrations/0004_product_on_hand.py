@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_low_stock_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='on_hand',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
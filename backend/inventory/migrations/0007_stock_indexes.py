@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stock',
+            name='stock_low_stock_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['id'], name='stock_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['last_updated'], name='stock_last_updated_idx'),
+        ),
+    ]
@@ -16,6 +16,11 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = "Categories"
+        indexes = [
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'],
+                         name='category_sync_idx'),
+        ]
 
 
 class Product(models.Model):
@@ -27,15 +32,40 @@ class Product(models.Model):
     barcode = models.CharField(
         max_length=100, unique=True, blank=True, null=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # SHA-256 of the image content, set once its thumbnails are generated
+    # (see inventory/images.py)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
     price = models.DecimalField(
         max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    # Sum of StoreInventory quantities across stores, maintained by
+    # stores.adjustments on every inventory write
+    on_hand = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'],
+                         name='product_sync_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
 
+class ReorderQuerySet(models.QuerySet):
+    def below_reorder_level(self):
+        """
+        Rows at or below their reorder level, filtered in SQL (matching the
+        partial low-stock index) and annotated with reorder suggestions.
+        """
+        return self.filter(quantity__lte=models.F('reorder_level')).annotate(
+            shortfall=models.F('reorder_level') - models.F('quantity'),
+            suggested_order_quantity=models.F('reorder_quantity'),
+        )
+
+
 class Stock(models.Model):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name='stock')
@@ -47,6 +77,19 @@ class Stock(models.Model):
     reorder_quantity = models.IntegerField(
         default=20, validators=[MinValueValidator(0)])
 
+    objects = ReorderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Low-stock rows in the order the low-stock list pages them
+            models.Index(fields=['id'],
+                         condition=models.Q(
+                             quantity__lte=models.F('reorder_level')),
+                         name='stock_low_stock_idx'),
+            models.Index(fields=['last_updated'],
+                         name='stock_last_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.quantity} units"
 
@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Round
+from django.utils import timezone
+from core.cache import bump_versions
+from users.audit import build_activity, record_activities
+from users.models import UserActivity
+from .cache import product_lookup_cache
+from .models import Product
+
+
+def log_price_changes(user, changes):
+    """
+    Record one PRICE_UPDATE activity per changed product in a single batch.
+    `changes` is a list of (product_id, name, old_price, new_price).
+    """
+    record_activities([
+        build_activity(
+            user=user,
+            action_type=UserActivity.ActionType.PRICE_UPDATE,
+            model_name='Product',
+            object_id=product_id,
+            details={
+                'name': name,
+                'old_price': str(old_price),
+                'new_price': str(new_price)
+            }
+        )
+        for product_id, name, old_price, new_price in changes
+    ])
+
+
+def apply_price_list(updates, user):
+    """
+    Set explicit prices for products identified by id or SKU. Returns the
+    list of changes and the identifiers that matched no product.
+    """
+    new_prices = {}
+    for update in updates:
+        key = update.get('product_id', update.get('sku'))
+        new_prices[key] = update['new_price']
+    ids = [key for key in new_prices if isinstance(key, int)]
+    skus = [key for key in new_prices if isinstance(key, str)]
+
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update()
+            .filter(Q(id__in=ids) | Q(sku__in=skus))
+            .only('id', 'sku', 'barcode', 'name', 'price')
+            .order_by('id'))
+        matched = set()
+        changes = []
+        now = timezone.now()
+        for product in products:
+            # An id match takes precedence over a SKU match
+            key = product.id if product.id in new_prices else product.sku
+            matched.add(key)
+            old_price = product.price
+            product.price = new_prices[key]
+            product.updated_at = now
+            changes.append((product.id, product.name, old_price, product.price))
+        Product.objects.bulk_update(products, ['price', 'updated_at'])
+        log_price_changes(user, changes)
+        codes = [('sku', product.sku) for product in products] + [
+            ('barcode', product.barcode) for product in products if product.barcode]
+        transaction.on_commit(lambda: product_lookup_cache.invalidate(codes))
+        bump_versions(Product)
+
+    not_found = [key for key in new_prices if key not in matched]
+    return changes, not_found
+
+
+def apply_price_rule(rule, user):
+    """
+    Multiply the price of every product matching the rule's filters with a
+    single UPDATE, rounding to cents in the database.
+    """
+    queryset = Product.objects.all()
+    if 'category' in rule:
+        queryset = queryset.filter(category_id=rule['category'])
+    if 'sku_prefix' in rule:
+        queryset = queryset.filter(sku__startswith=rule['sku_prefix'])
+
+    with transaction.atomic():
+        old = {
+            product_id: (name, price)
+            for product_id, name, price in queryset.select_for_update()
+            .order_by('id').values_list('id', 'name', 'price')
+        }
+        queryset.update(
+            price=Round(F('price') * rule['multiplier'], 2),
+            updated_at=timezone.now())
+        changes = [
+            (product_id, old[product_id][0], old[product_id][1], price)
+            for product_id, price in queryset.order_by('id')
+            .values_list('id', 'price')
+        ]
+        log_price_changes(user, changes)
+        transaction.on_commit(product_lookup_cache.clear)
+        bump_versions(Product)
+    return changes
@@ -0,0 +1,240 @@
+"""
+Full-text product search.
+
+On SQLite the index is an external-content FTS5 table over
+inventory_product; on PostgreSQL it is a generated tsvector column with a
+GIN index. Either way the database keeps it in sync on every write,
+including bulk inserts and queryset updates. Other backends fall back to
+unranked icontains matching.
+
+The index objects are created idempotently after every migrate (see
+`ensure_search_index`), because SQLite drops triggers whenever Django
+rebuilds the product table during a schema change.
+"""
+import re
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Count, Q
+from .models import Category, Product
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKENS = 10
+
+SQLITE_TRIGGERS = {
+    'inventory_product_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_ai
+        AFTER INSERT ON inventory_product BEGIN
+            INSERT INTO inventory_product_fts(rowid, name, description, sku, barcode)
+            VALUES (new.id, new.name, new.description, new.sku, new.barcode);
+        END""",
+    'inventory_product_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_ad
+        AFTER DELETE ON inventory_product BEGIN
+            INSERT INTO inventory_product_fts(inventory_product_fts, rowid, name, description, sku, barcode)
+            VALUES ('delete', old.id, old.name, old.description, old.sku, old.barcode);
+        END""",
+    'inventory_product_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_au
+        AFTER UPDATE OF name, description, sku, barcode ON inventory_product BEGIN
+            INSERT INTO inventory_product_fts(inventory_product_fts, rowid, name, description, sku, barcode)
+            VALUES ('delete', old.id, old.name, old.description, old.sku, old.barcode);
+            INSERT INTO inventory_product_fts(rowid, name, description, sku, barcode)
+            VALUES (new.id, new.name, new.description, new.sku, new.barcode);
+        END""",
+}
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())[:MAX_TOKENS]
+
+
+class ProductSearch:
+    """
+    Unranked fallback: every token must appear in the name, description,
+    SKU or barcode.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def is_installed(self):
+        return True
+
+    def install(self):
+        """Create missing index objects. Returns True if anything was created."""
+        return False
+
+    def rebuild(self):
+        pass
+
+    def search(self, tokens, category=None, limit=10, offset=0):
+        """Return (product ids in rank order, total matches, {category_id: count})."""
+        queryset = Product.objects.using(self.connection.alias)
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(name__icontains=token) | Q(description__icontains=token) |
+                Q(sku__icontains=token) | Q(barcode__icontains=token))
+        facets = dict(queryset.order_by().values_list(
+            'category').annotate(Count('id')))
+        if category is not None:
+            queryset = queryset.filter(category_id=category)
+        ids = list(queryset.order_by('name', 'id').values_list(
+            'id', flat=True)[offset:offset + limit])
+        return ids, self.total(facets, category), facets
+
+    def total(self, facets, category):
+        if category is not None:
+            return facets.get(category, 0)
+        return sum(facets.values())
+
+
+class RankedProductSearch(ProductSearch):
+    """Shared query shape for the database-backed indexes."""
+    from_sql = 'inventory_product p'
+
+    def match(self, tokens):
+        """Return (where_sql, params, rank_sql, rank_params); lower rank is better."""
+        raise NotImplementedError
+
+    def search(self, tokens, category=None, limit=10, offset=0):
+        where_sql, params, rank_sql, rank_params = self.match(tokens)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT p.category_id, COUNT(*) FROM {self.from_sql} '
+                f'WHERE {where_sql} GROUP BY p.category_id', params)
+            facets = dict(cursor.fetchall())
+
+            filter_sql, filter_params = '', []
+            if category is not None:
+                filter_sql, filter_params = ' AND p.category_id = %s', [category]
+            cursor.execute(
+                f'SELECT p.id FROM {self.from_sql} '
+                f'WHERE {where_sql}{filter_sql} '
+                f'ORDER BY {rank_sql}, p.id LIMIT %s OFFSET %s',
+                params + filter_params + rank_params + [limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+        return ids, self.total(facets, category), facets
+
+
+class SQLiteProductSearch(RankedProductSearch):
+    from_sql = ('inventory_product_fts f '
+                'JOIN inventory_product p ON p.id = f.rowid')
+    # bm25 column weights: name, description, sku, barcode
+    rank_sql = 'bm25(inventory_product_fts, 10.0, 1.0, 5.0, 5.0)'
+
+    def is_installed(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'inventory_product_fts'")
+            return cursor.fetchone() is not None
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND tbl_name = 'inventory_product'")
+            existing = {row[0] for row in cursor.fetchall()}
+            if self.is_installed() and existing >= set(SQLITE_TRIGGERS):
+                return False
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS inventory_product_fts "
+                "USING fts5(name, description, sku, barcode, "
+                "content='inventory_product', content_rowid='id', "
+                "prefix='2 3')")
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+        self.rebuild()
+        return True
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO inventory_product_fts(inventory_product_fts) "
+                "VALUES ('rebuild')")
+            cursor.execute(
+                "INSERT INTO inventory_product_fts(inventory_product_fts) "
+                "VALUES ('optimize')")
+
+    def match(self, tokens):
+        # Tokens are \w+ only, so quoting them cannot break the FTS syntax
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        return 'inventory_product_fts MATCH %s', [query], self.rank_sql, []
+
+
+class PostgreSQLProductSearch(RankedProductSearch):
+    def is_installed(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'inventory_product' "
+                "AND column_name = 'search_vector'")
+            return cursor.fetchone() is not None
+
+    def install(self):
+        if self.is_installed():
+            return False
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                ALTER TABLE inventory_product ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(sku, '') || ' ' || coalesce(barcode, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+                ) STORED""")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS inventory_product_search_idx "
+                "ON inventory_product USING GIN (search_vector)")
+        return True
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("REINDEX INDEX inventory_product_search_idx")
+
+    def match(self, tokens):
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        return (
+            "p.search_vector @@ to_tsquery('simple', %s)", [query],
+            "ts_rank(p.search_vector, to_tsquery('simple', %s)) DESC", [query],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteProductSearch,
+    'postgresql': PostgreSQLProductSearch,
+}
+_installed = {}
+
+
+def get_product_search(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    backend = BACKENDS.get(connection.vendor, ProductSearch)(connection)
+    if using not in _installed:
+        _installed[using] = backend.is_installed()
+    if not _installed[using]:
+        return ProductSearch(connection)
+    return backend
+
+
+def ensure_search_index(sender, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """post_migrate handler that (re)creates the search index objects."""
+    connection = connections[using]
+    backend = BACKENDS.get(connection.vendor, ProductSearch)(connection)
+    try:
+        installed = backend.install()
+    except DatabaseError as e:
+        # e.g. SQLite built without FTS5: search falls back to icontains
+        if verbosity >= 1:
+            print(f'  Product search index unavailable: {e}')
+        return
+    finally:
+        _installed.pop(using, None)
+    if installed and verbosity >= 1:
+        print('  Installed product search index.')
+
+
+def category_facets(facets):
+    names = dict(Category.objects.filter(
+        id__in=facets).values_list('id', 'name'))
+    return sorted(
+        ({'category': category_id, 'category_name': names.get(category_id),
+          'count': count} for category_id, count in facets.items()),
+        key=lambda facet: (-facet['count'], facet['category']))
@@ -1,4 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
+from .images import store_image, thumbnail_urls
 from .models import Category, Product, Stock
 
 
@@ -11,22 +13,164 @@ class CategorySerializer(serializers.ModelSerializer):
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(
         source='category.name', read_only=True)
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'category', 'category_name',
-                  'sku', 'barcode', 'image', 'price', 'created_at', 'updated_at']
+                  'sku', 'barcode', 'image', 'thumbnails', 'price', 'on_hand',
+                  'created_at', 'updated_at']
+        read_only_fields = ['on_hand']
+
+    def get_thumbnails(self, obj):
+        """{size: {format: url}} once processed, otherwise null."""
+        if not obj.image_hash:
+            return None
+        urls = thumbnail_urls(obj.image_hash)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: {fmt: request.build_absolute_uri(url)
+                           for fmt, url in formats.items()}
+                    for size, formats in urls.items()}
+        return urls
+
+    def create(self, validated_data):
+        image = validated_data.pop('image', None)
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            if image:
+                store_image(instance, image)
+        return instance
+
+    def update(self, instance, validated_data):
+        image = validated_data.pop('image', None)
+        if 'image' in self.initial_data and not image:
+            # Explicitly cleared
+            validated_data['image'] = None
+            validated_data['image_hash'] = ''
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if image:
+                store_image(instance, image)
+        return instance
+
+
+class ProductLookupSerializer(serializers.ModelSerializer):
+    """Compact product representation returned by barcode/SKU lookups."""
+    category_name = serializers.CharField(
+        source='category.name', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'category', 'category_name', 'sku',
+                  'barcode', 'price']
 
 
 class StockSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
+    # Total across all stores, read from the denormalized product column
+    product_on_hand = serializers.IntegerField(
+        source='product.on_hand', read_only=True)
 
     class Meta:
         model = Stock
-        fields = ['id', 'product', 'product_name', 'quantity', 'last_updated',
-                  'reorder_level', 'reorder_quantity']
+        fields = ['id', 'product', 'product_name', 'product_on_hand',
+                  'quantity', 'last_updated', 'reorder_level',
+                  'reorder_quantity']
 
     def validate_quantity(self, value):
         if value < 0:
             raise serializers.ValidationError("Quantity cannot be negative")
         return value
+
+
+class LowStockSerializer(StockSerializer):
+    sku = serializers.CharField(source='product.sku', read_only=True)
+    shortfall = serializers.IntegerField(read_only=True)
+    suggested_order_quantity = serializers.IntegerField(read_only=True)
+
+    class Meta(StockSerializer.Meta):
+        fields = StockSerializer.Meta.fields + [
+            'sku', 'shortfall', 'suggested_order_quantity']
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk product import. Uniqueness of SKU and
+    barcode is checked per chunk by the importer, not per row here.
+    """
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, required=False)
+    category = serializers.CharField(max_length=100)
+    sku = serializers.CharField(max_length=50)
+    barcode = serializers.CharField(
+        max_length=100, allow_blank=True, allow_null=True, required=False)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0)
+
+    def validate_barcode(self, value):
+        return value or None
+
+
+class PriceUpdateItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(max_length=50, required=False)
+    new_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0)
+
+    def validate(self, attrs):
+        if ('product_id' in attrs) == ('sku' in attrs):
+            raise serializers.ValidationError(
+                "Provide exactly one of product_id or sku")
+        return attrs
+
+
+class PriceRuleSerializer(serializers.Serializer):
+    category = serializers.IntegerField(required=False)
+    sku_prefix = serializers.CharField(max_length=50, required=False)
+    percent = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=-100, required=False)
+    multiplier = serializers.DecimalField(
+        max_digits=8, decimal_places=4, min_value=0, required=False)
+
+    def validate(self, attrs):
+        if ('percent' in attrs) == ('multiplier' in attrs):
+            raise serializers.ValidationError(
+                "Provide exactly one of percent or multiplier")
+        if 'percent' in attrs:
+            attrs['multiplier'] = 1 + attrs.pop('percent') / 100
+        return attrs
+
+
+class BulkPriceUpdateSerializer(serializers.Serializer):
+    updates = PriceUpdateItemSerializer(many=True, required=False,
+                                        allow_empty=False)
+    rule = PriceRuleSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('updates' in attrs) == ('rule' in attrs):
+            raise serializers.ValidationError(
+                "Provide exactly one of updates or rule")
+        return attrs
+
+
+class ProductLookupRequestSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False,
+        max_length=1000)
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False,
+        max_length=1000)
+
+    def validate(self, attrs):
+        if not attrs.get('barcodes') and not attrs.get('skus'):
+            raise serializers.ValidationError(
+                "Provide barcodes or skus to look up")
+        return attrs
+
+
+class ProductSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    category = serializers.IntegerField(required=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=100, default=10)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from core.cache import bump_versions
+from .cache import LOOKUP_KINDS, product_lookup_cache
+from .models import Category, Product
+
+
+def lookup_codes(instance):
+    # Read __dict__ so deferred fields are not fetched one row at a time
+    return {(kind, instance.__dict__[kind]) for kind in LOOKUP_KINDS
+            if instance.__dict__.get(kind)}
+
+
+@receiver(post_init, sender=Product)
+def remember_lookup_codes(sender, instance, **kwargs):
+    # Keep the codes the row was loaded with so a changed barcode or SKU
+    # also invalidates the entry cached under its old value.
+    instance._loaded_lookup_codes = lookup_codes(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_lookup(sender, instance, **kwargs):
+    codes = instance._loaded_lookup_codes | lookup_codes(instance)
+    instance._loaded_lookup_codes = lookup_codes(instance)
+    transaction.on_commit(lambda: product_lookup_cache.invalidate(codes))
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_lookups(sender, instance, created, **kwargs):
+    # Cached lookups embed the category name
+    if not created:
+        transaction.on_commit(product_lookup_cache.clear)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    bump_versions(sender)
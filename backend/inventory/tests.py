@@ -1,3 +1,499 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.testing import QueryCountAssertionsMixin
+from stores.adjustments import apply_adjustments
+from stores.models import Store
+from users.models import User, UserActivity
+from . import cache as lookup_cache
+from .cache import ProductLookupCache, product_lookup_cache
+from .images import thumbnail_name
+from .models import Category, Product, Stock
 
-# Create your tests here.
+
+class InventoryQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.sequence = 0
+
+    def create_products(self, count):
+        products = []
+        for _ in range(count):
+            self.sequence += 1
+            category = Category.objects.create(name=f'Category {self.sequence}')
+            products.append(Product.objects.create(
+                name=f'Product {self.sequence}', category=category,
+                sku=f'SKU-{self.sequence}', price=Decimal('1.00')))
+        return products
+
+    def create_stock(self, count):
+        for product in self.create_products(count):
+            Stock.objects.create(product=product, quantity=3)
+
+    def test_category_list(self):
+        self.assertListQueriesConstant(
+            '/api/inventory/categories/', self.create_products)
+
+    def test_product_list(self):
+        self.assertListQueriesConstant(
+            '/api/inventory/products/', self.create_products)
+
+    def test_product_detail(self):
+        products = self.create_products(2)
+        self.assertDetailQueriesConstant(
+            [f'/api/inventory/products/{p.id}/' for p in products])
+
+    def test_stock_list(self):
+        self.assertListQueriesConstant(
+            '/api/inventory/stock/', self.create_stock)
+
+
+class ProductImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='root', email='root@example.com', password='pass',
+            role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+        self.existing = Product.objects.create(
+            name='Old chips', category=self.category, sku='CHIPS',
+            barcode='111', price=Decimal('1.00'))
+
+    def upload(self, name, content, **extra):
+        return self.client.post('/api/inventory/products/import/', {
+            'file': SimpleUploadedFile(name, content.encode()), **extra,
+        }, format='multipart')
+
+    def test_csv_import_upserts_and_reports_row_errors(self):
+        response = self.upload('catalog.csv', (
+            'sku,name,category,price,barcode\n'
+            'CHIPS,Chips,Snacks,1.50,111\n'
+            'SODA,Soda,Drinks,2.00,222\n'
+            'NUTS,Nuts,Snacks,-1,333\n'
+            'GUM,Gum,Snacks,0.50,111\n'
+        ), create_categories='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(
+            [(e['line'], e['sku']) for e in response.data['errors']],
+            [(4, 'NUTS'), (5, 'GUM')])
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Chips')
+        self.assertEqual(self.existing.price, Decimal('1.50'))
+        self.assertEqual(
+            Product.objects.get(sku='SODA').category.name, 'Drinks')
+
+    def test_ndjson_import_rejects_unknown_category(self):
+        response = self.upload('catalog.ndjson', (
+            '{"sku": "TEA", "name": "Tea", "category": "Snacks", "price": "3"}\n'
+            'not json\n'
+            '{"sku": "COFFEE", "name": "Coffee", "category": "Hot", "price": "4"}\n'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertFalse(Product.objects.filter(sku='COFFEE').exists())
+
+
+class BulkPriceUpdateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='root', email='root@example.com', password='pass',
+            role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.user)
+        snacks = Category.objects.create(name='Snacks')
+        drinks = Category.objects.create(name='Drinks')
+        self.chips = Product.objects.create(
+            name='Chips', category=snacks, sku='CHIPS', price=Decimal('2.00'))
+        self.nuts = Product.objects.create(
+            name='Nuts', category=snacks, sku='NUTS', price=Decimal('3.33'))
+        self.soda = Product.objects.create(
+            name='Soda', category=drinks, sku='SODA', price=Decimal('1.00'))
+        self.url = '/api/inventory/products/bulk_price_update/'
+
+    def test_price_list_by_id_and_sku(self):
+        response = self.client.post(self.url, {'updates': [
+            {'product_id': self.chips.id, 'new_price': '2.50'},
+            {'sku': 'SODA', 'new_price': '1.25'},
+            {'sku': 'MISSING', 'new_price': '1.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['not_found'], ['MISSING'])
+        self.soda.refresh_from_db()
+        self.assertEqual(self.soda.price, Decimal('1.25'))
+        activity = UserActivity.objects.get(
+            object_id=self.chips.id,
+            action_type=UserActivity.ActionType.PRICE_UPDATE)
+        self.assertEqual(activity.details['old_price'], '2.00')
+        self.assertEqual(activity.details['new_price'], '2.50')
+
+    def test_category_rule_updates_matching_products(self):
+        response = self.client.post(self.url, {'rule': {
+            'category': self.chips.category_id, 'percent': '10',
+        }}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.nuts.refresh_from_db()
+        self.soda.refresh_from_db()
+        self.assertEqual(self.nuts.price, Decimal('3.66'))
+        self.assertEqual(self.soda.price, Decimal('1.00'))
+        self.assertEqual(UserActivity.objects.filter(
+            action_type=UserActivity.ActionType.PRICE_UPDATE).count(), 2)
+
+    def test_legacy_single_product_form(self):
+        response = self.client.post(self.url, {
+            'product_id': self.chips.id, 'new_price': '9.99'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(self.url, {
+            'product_id': 999999, 'new_price': '9.99'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductLookupTests(APITestCase):
+    def setUp(self):
+        product_lookup_cache.clear()
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            name='Chips', category=category, sku='CHIPS', barcode='4006381333931',
+            price=Decimal('2.00'))
+        self.url = '/api/inventory/products/lookup/'
+
+    def test_lookup_is_served_from_cache_after_first_hit(self):
+        response = self.client.get(self.url, {'barcode': '4006381333931'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sku'], 'CHIPS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'barcode': '4006381333931'})
+        self.assertEqual(response.data['category_name'], 'Snacks')
+        self.assertEqual(
+            self.client.get(self.url, {'sku': 'NOPE'}).status_code, 404)
+
+    def test_save_invalidates_cached_entry(self):
+        self.client.get(self.url, {'sku': 'CHIPS'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chips.price = Decimal('2.50')
+            self.chips.barcode = '111'
+            self.chips.save()
+        self.assertEqual(
+            self.client.get(self.url, {'sku': 'CHIPS'}).data['price'], '2.50')
+        self.assertEqual(
+            self.client.get(self.url, {'barcode': '4006381333931'}).status_code, 404)
+
+    def test_invalidation_reaches_other_processes(self):
+        # Two caches with their own local tier over one file cache stand in
+        # for two worker processes
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(
+                CACHES={**settings.CACHES, 'lookup': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location}},
+                PRODUCT_LOOKUP_CACHE={'CACHE': 'lookup', 'LOCAL_TTL': 0}):
+            writer, reader = ProductLookupCache(), ProductLookupCache()
+            self.assertEqual(reader.get_many('sku', ['CHIPS'])['CHIPS']['price'], '2.00')
+            Product.objects.filter(pk=self.chips.pk).update(price=Decimal('2.50'))
+            writer.invalidate({('sku', 'CHIPS')})
+            self.assertEqual(reader.get_many('sku', ['CHIPS'])['CHIPS']['price'], '2.50')
+            Product.objects.filter(pk=self.chips.pk).update(price=Decimal('3.00'))
+            writer.clear()
+            self.assertEqual(reader.get_many('sku', ['CHIPS'])['CHIPS']['price'], '3.00')
+
+    @override_settings(PRODUCT_LOOKUP_CACHE={'LOCAL_TTL': 0})
+    def test_fill_racing_a_write_is_not_served(self):
+        writer, reader = ProductLookupCache(), ProductLookupCache()
+        serializer = lookup_cache.ProductLookupSerializer
+
+        def write_meanwhile(product):
+            # Commits and invalidates after the reader loaded the old row
+            Product.objects.filter(pk=product.pk).update(price=Decimal('2.50'))
+            writer.invalidate({('sku', 'CHIPS')})
+            return serializer(product)
+
+        with mock.patch.object(lookup_cache, 'ProductLookupSerializer',
+                               side_effect=write_meanwhile):
+            self.assertEqual(
+                reader.get_many('sku', ['CHIPS'])['CHIPS']['price'], '2.00')
+        self.assertEqual(reader.get_many('sku', ['CHIPS'])['CHIPS']['price'], '2.50')
+
+    def test_batch_lookup(self):
+        response = self.client.post(self.url, {
+            'barcodes': ['4006381333931', 'missing'], 'skus': ['CHIPS'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['barcodes']['4006381333931']['id'], self.chips.id)
+        self.assertIsNone(response.data['barcodes']['missing'])
+        self.assertEqual(response.data['skus']['CHIPS']['name'], 'Chips')
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        snacks = Category.objects.create(name='Snacks')
+        drinks = Category.objects.create(name='Drinks')
+        self.chips = Product.objects.create(
+            name='Salted chips', category=snacks, sku='CH-1', price=1)
+        self.crisps = Product.objects.create(
+            name='Crisps', description='Chips with extra salt', category=snacks,
+            sku='CR-1', price=1)
+        self.cola = Product.objects.create(
+            name='Cola chiller', category=drinks, sku='CO-1', price=1)
+        self.url = '/api/inventory/products/search/'
+
+    def test_ranked_prefix_search_with_facets(self):
+        response = self.client.get(self.url, {'q': 'chi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            {facet['category_name']: facet['count']
+             for facet in response.data['facets']},
+            {'Snacks': 2, 'Drinks': 1})
+
+        response = self.client.get(
+            self.url, {'q': 'chips', 'category': self.chips.category_id})
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [self.chips.id, self.crisps.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        Product.objects.filter(id=self.cola.id).update(name='Lemonade')
+        self.crisps.delete()
+        response = self.client.get(self.url, {'q': 'chi'})
+        self.assertEqual(
+            [p['id'] for p in response.data['results']], [self.chips.id])
+
+
+class ProductImageTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+
+    def upload(self, sku, color='red'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 900), color).save(buffer, format='PNG')
+        image = SimpleUploadedFile(
+            'photo.png', buffer.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/inventory/products/', {
+                'name': sku, 'category': self.category.id, 'sku': sku,
+                'price': '1.00', 'image': image}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response
+
+    def test_upload_generates_thumbnails_after_commit(self):
+        response = self.upload('A')
+        # Resizing happens after the response data is built
+        self.assertIsNone(response.data['thumbnails'])
+
+        product = Product.objects.get(sku='A')
+        self.assertTrue(product.image.name.startswith('products/originals/'))
+        self.assertEqual(len(product.image_hash), 64)
+        for size, pixels in (('thumb', 100), ('medium', 800)):
+            for image_format in ('jpeg', 'webp'):
+                name = thumbnail_name(product.image_hash, size, image_format)
+                with default_storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.format, image_format.upper())
+                    self.assertEqual(max(image.size), pixels)
+
+        response = self.client.get(f'/api/inventory/products/{product.id}/')
+        thumbnails = response.data['thumbnails']
+        self.assertTrue(thumbnails['small']['webp'].endswith('/small.webp'))
+
+    def test_identical_uploads_share_storage(self):
+        self.upload('A')
+        response = self.upload('B')
+        # Already processed: thumbnails are available immediately
+        self.assertIsNotNone(response.data['thumbnails'])
+        first, second = Product.objects.order_by('sku')
+        self.assertEqual(first.image.name, second.image.name)
+        self.upload('C', color='blue')
+        self.assertNotEqual(
+            Product.objects.get(sku='C').image.name, first.image.name)
+
+
+class CatalogResponseCacheTests(APITestCase):
+    url = '/api/inventory/products/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+        self.product = Product.objects.create(
+            name='Chips', category=self.category, sku='CHIPS',
+            price=Decimal('1.00'))
+
+    def get(self, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(self.url, **headers)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.get()
+        self.assertIn('ETag', first)
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.get()
+        # Only on_hand is read
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        response = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_cached_lists(self):
+        first = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/inventory/products/{self.product.id}/',
+                              {'price': '2.00'}, format='json')
+        response = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['price'], '2.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/inventory/categories/{self.category.id}/',
+                              {'name': 'Crisps'}, format='json')
+        response = self.get()
+        self.assertEqual(response.data['results'][0]['category_name'], 'Crisps')
+
+        self.user.role = User.Role.SUPER_ADMIN
+        self.user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/inventory/products/bulk_price_update/', {
+                'rule': {'percent': 50}}, format='json')
+        response = self.get()
+        self.assertEqual(response.data['results'][0]['price'], '3.00')
+
+
+    def test_stock_changes_keep_cached_pages(self):
+        first = self.get()
+        in_stock = self.client.get(self.url, {'in_stock': 'true'})
+        self.assertEqual(in_stock.data['count'], 0)
+        store = Store.objects.create(
+            name='Main', address='-', phone='-', email='main@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_adjustments({(store.id, self.product.id): 5})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response.data['results'][0]['on_hand'], 5)
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        in_stock = self.client.get(self.url, {'in_stock': 'true'})
+        self.assertEqual(in_stock.data['count'], 1)
+
+
+class AsyncReadEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        product_lookup_cache.clear()
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.category = Category.objects.create(name='Snacks')
+        other = Category.objects.create(name='Drinks')
+        for i in range(12):
+            product = Product.objects.create(
+                name=f'Product {i}', sku=f'SKU-{i}', barcode=f'BC-{i}',
+                category=self.category if i % 2 else other,
+                price=Decimal('1.00'))
+            Stock.objects.create(product=product, quantity=i)
+
+    def assertMatchesSync(self, path, params=None):
+        sync = self.client.get(f'/api{path}', params)
+        response = self.client.get(f'/api/async{path}', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['count'], sync.data['count'])
+        self.assertEqual(data['results'], sync.json()['results'])
+        return response
+
+    def test_lists_match_sync_endpoints(self):
+        self.assertMatchesSync('/inventory/products/', {'page': 2})
+        self.assertMatchesSync(
+            '/inventory/products/', {'category': self.category.id})
+        response = self.assertMatchesSync(
+            '/inventory/stock/', {'ordering': '-quantity'})
+        self.assertTrue(response.json()['next'].endswith('page=2'))
+
+    def test_product_list_revalidates_with_etag(self):
+        response = self.client.get('/api/async/inventory/products/')
+        response = self.client.get(
+            '/api/async/inventory/products/',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        store = Store.objects.create(
+            name='Main', address='-', phone='-', email='main@example.com')
+        product = Product.objects.get(sku='SKU-0')
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_adjustments({(store.id, product.id): 4})
+        response = self.client.get(
+            '/api/async/inventory/products/',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['on_hand'], 4)
+
+    def test_lookup(self):
+        response = self.client.get(
+            '/api/async/inventory/products/lookup/', {'barcode': 'BC-3'})
+        self.assertEqual(response.json()['sku'], 'SKU-3')
+        response = self.client.get(
+            '/api/async/inventory/products/lookup/', {'sku': 'missing'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(
+            '/api/async/inventory/products/lookup/',
+            {'skus': ['SKU-1', 'missing']}, format='json')
+        self.assertEqual(response.json()['skus']['SKU-1']['barcode'], 'BC-1')
+        self.assertIsNone(response.json()['skus']['missing'])
+
+    def test_post_needs_no_csrf_token(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        response = client.post(
+            '/api/async/inventory/products/lookup/',
+            {'skus': ['SKU-1']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_errors(self):
+        response = self.client.get(
+            '/api/async/inventory/stock/', {'page': 5})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            '/api/async/inventory/products/', {'category': 999})
+        self.assertEqual(response.status_code, 400)
+        self.client.credentials()
+        response = self.client.get('/api/async/inventory/products/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
@@ -3,20 +3,38 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
+from core.cache import cached_response, versioned_response
+from core.exports import export_response
 from .models import Category, Product, Stock
-from .serializers import CategorySerializer, ProductSerializer, StockSerializer
+from .filters import ProductFilter
+from .serializers import (
+    CategorySerializer, ProductSerializer, StockSerializer,
+    LowStockSerializer, BulkPriceUpdateSerializer, ProductLookupRequestSerializer,
+    ProductSearchQuerySerializer
+)
+from .importers import FORMATS, ProductImporter, detect_format, read_rows
+from .pricing import apply_price_list, apply_price_rule
+from .cache import (
+    PRODUCT_ON_HAND, product_list_models, product_lookup_cache, refresh_on_hand)
+from .search import category_facets, get_product_search, tokenize
 from .docs import (
     category_list_docs, category_create_docs, category_delete_docs,
     product_list_docs, product_create_docs, product_delete_docs,
-    stock_list_docs, stock_update_docs, stock_delete_docs
+    product_import_docs, product_bulk_price_update_docs, product_lookup_docs,
+    product_search_docs, product_export_docs,
+    stock_list_docs, stock_update_docs, stock_delete_docs, stock_low_stock_docs,
+    stock_export_docs
 )
 from users.models import UserActivity
+from users.audit import record_activity
 from users.permissions import IsSuperAdmin
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+    queryset = Category.objects.order_by('id')
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -25,13 +43,17 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     @category_list_docs
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return versioned_response(
+            request, 'category-list', [Category],
+            settings.CATALOG_CACHE_TIMEOUT,
+            lambda: super(CategoryViewSet, self).list(
+                request, *args, **kwargs).data)
 
     @category_create_docs
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         if response.status_code == 201:
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.CREATE,
                 model_name='Category',
@@ -45,7 +67,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         response = super().destroy(request, *args, **kwargs)
         if response.status_code == 204:
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.DELETE,
                 model_name='Category',
@@ -56,24 +78,32 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related('category').order_by('id')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend,
                        filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category']
+    filterset_class = ProductFilter
     search_fields = ['name', 'description', 'sku', 'barcode']
-    ordering_fields = ['name', 'price', 'created_at']
+    ordering_fields = ['name', 'price', 'on_hand', 'created_at']
+    export_fields = ['id', 'sku', 'barcode', 'name', 'description',
+                     'category_id', 'category__name', 'price', 'on_hand',
+                     'created_at', 'updated_at']
 
     @product_list_docs
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return versioned_response(
+            request, 'product-list', product_list_models(request.query_params),
+            settings.CATALOG_CACHE_TIMEOUT,
+            lambda: super(ProductViewSet, self).list(
+                request, *args, **kwargs).data,
+            live=([PRODUCT_ON_HAND], refresh_on_hand))
 
     @product_create_docs
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         if response.status_code == 201:
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.CREATE,
                 model_name='Product',
@@ -88,7 +118,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         response = super().destroy(request, *args, **kwargs)
         if response.status_code == 204:
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.DELETE,
                 model_name='Product',
@@ -97,59 +127,157 @@ class ProductViewSet(viewsets.ModelViewSet):
             )
         return response
 
-    @action(detail=False, methods=['post'], permission_classes=[IsSuperAdmin])
-    def bulk_price_update(self, request):
+    @product_export_docs
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all products matching the list filters"""
+        return export_response(
+            request, self.filter_queryset(self.get_queryset()),
+            self.export_fields, 'products')
+
+    @product_search_docs
+    @action(detail=False, methods=['get'])
+    def search(self, request):
         """
-        Bulk update prices for products across all stores.
-        Only accessible by super admin.
+        Ranked full-text search with prefix matching and category facets.
         """
-        product_id = request.data.get('product_id')
-        new_price = request.data.get('new_price')
+        params = ProductSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        tokens = tokenize(query['q'])
+        if not tokens:
+            return Response({'count': 0, 'results': [], 'facets': []})
 
-        if not product_id or not new_price:
+        page_size = query['page_size']
+        ids, count, facets = get_product_search().search(
+            tokens, category=query.get('category'), limit=page_size,
+            offset=(query['page'] - 1) * page_size)
+        products = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [products[i] for i in ids if i in products], many=True)
+        return Response({
+            'count': count,
+            'results': serializer.data,
+            'facets': category_facets(facets)
+        })
+
+    @product_lookup_docs
+    @action(detail=False, methods=['get', 'post'])
+    def lookup(self, request):
+        """
+        Exact-match product lookup by barcode or SKU for scanners, served
+        from the lookup cache. GET takes a single barcode or sku, POST takes
+        lists of barcodes and skus.
+        """
+        if request.method == 'GET':
+            for kind in ('barcode', 'sku'):
+                code = request.query_params.get(kind)
+                if code:
+                    product = product_lookup_cache.get_many(kind, [code]).get(code)
+                    if product is None:
+                        return Response(
+                            {'error': 'Product not found'},
+                            status=status.HTTP_404_NOT_FOUND
+                        )
+                    return Response(product)
             return Response(
-                {'error': 'Both product_id and new_price are required'},
+                {'error': 'Either barcode or sku is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            product = Product.objects.get(id=product_id)
-            old_price = product.price
-            product.price = new_price
-            product.save()
+        serializer = ProductLookupRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = {}
+        for kind in ('barcode', 'sku'):
+            codes = serializer.validated_data.get(f'{kind}s', [])
+            found = product_lookup_cache.get_many(kind, codes)
+            results[f'{kind}s'] = {code: found.get(code) for code in codes}
+        return Response(results)
 
-            # Log the price update activity
-            UserActivity.objects.create(
-                user=request.user,
-                action_type=UserActivity.ActionType.PRICE_UPDATE,
-                model_name='Product',
-                object_id=product.id,
-                details={
-                    'name': product.name,
-                    'old_price': str(old_price),
-                    'new_price': str(new_price)
-                }
-            )
-
-            return Response({
-                'message': f'Price updated successfully for {product.name}',
-                'old_price': old_price,
-                'new_price': new_price
-            })
-        except Product.DoesNotExist:
+    @product_import_docs
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[IsSuperAdmin], parser_classes=[MultiPartParser])
+    def import_products(self, request):
+        """
+        Upsert products by SKU from an uploaded CSV or NDJSON file.
+        Only accessible by super admin.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
             return Response(
-                {'error': 'Product not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'A CSV or NDJSON file is required'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
+
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in FORMATS:
             return Response(
-                {'error': str(e)},
+                {'error': f'Unsupported format: {fmt}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        importer = ProductImporter(
+            create_categories=request.data.get('create_categories') in ('1', 'true', 'True'))
+        report = importer.run(read_rows(upload.file, fmt))
+
+        record_activity(
+            user=request.user,
+            action_type=UserActivity.ActionType.CREATE,
+            model_name='Product',
+            object_id=0,
+            details={
+                'import': upload.name,
+                'created': report['created'],
+                'updated': report['updated'],
+                'failed': report['failed']
+            }
+        )
+        return Response(report)
+
+    @product_bulk_price_update_docs
+    @action(detail=False, methods=['post'], permission_classes=[IsSuperAdmin])
+    def bulk_price_update(self, request):
+        """
+        Bulk update prices for products across all stores, either from a
+        list of explicit prices or from a rule applied to matching products.
+        Only accessible by super admin.
+        """
+        data = request.data
+        if 'product_id' in data and 'updates' not in data:
+            # Single-product form kept for existing clients
+            data = {'updates': [{'product_id': data.get('product_id'),
+                                 'new_price': data.get('new_price')}]}
+
+        serializer = BulkPriceUpdateSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        if 'rule' in serializer.validated_data:
+            changes = apply_price_rule(
+                serializer.validated_data['rule'], request.user)
+            not_found = []
+        else:
+            changes, not_found = apply_price_list(
+                serializer.validated_data['updates'], request.user)
+            if not changes:
+                return Response(
+                    {'error': 'Product not found', 'not_found': not_found},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+        return Response({
+            'message': f'Prices updated successfully for {len(changes)} products',
+            'updated': len(changes),
+            'not_found': not_found,
+            'changes': [
+                {'product_id': product_id, 'name': name,
+                 'old_price': old_price, 'new_price': new_price}
+                for product_id, name, old_price, new_price in changes
+            ]
+        })
+
 
 class StockViewSet(viewsets.ModelViewSet):
-    queryset = Stock.objects.all()
+    queryset = Stock.objects.select_related('product').order_by('id')
     serializer_class = StockSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend,
@@ -157,17 +285,42 @@ class StockViewSet(viewsets.ModelViewSet):
     filterset_fields = ['product']
     search_fields = ['product__name']
     ordering_fields = ['quantity', 'last_updated']
+    export_fields = ['id', 'product_id', 'product__sku', 'product__name',
+                     'quantity', 'reorder_level', 'reorder_quantity',
+                     'last_updated']
 
     @stock_list_docs
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @stock_export_docs
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all stock entries matching the list filters"""
+        return export_response(
+            request, self.filter_queryset(self.get_queryset()),
+            self.export_fields, 'stock')
+
+    @stock_low_stock_docs
+    @action(detail=False, methods=['get'])
+    def low_stock(self, request):
+        """Stock entries at or below their reorder level"""
+        def build():
+            queryset = self.filter_queryset(
+                self.get_queryset()).below_reorder_level()
+            page = self.paginate_queryset(queryset)
+            serializer = LowStockSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
+
+        return cached_response(
+            request, 'low-stock', settings.LOW_STOCK_CACHE_TIMEOUT, build)
+
     @stock_update_docs
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
         if response.status_code == 200:
             instance = self.get_object()
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.UPDATE,
                 model_name='Stock',
@@ -184,7 +337,7 @@ class StockViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         response = super().destroy(request, *args, **kwargs)
         if response.status_code == 204:
-            UserActivity.objects.create(
+            record_activity(
                 user=request.user,
                 action_type=UserActivity.ActionType.DELETE,
                 model_name='Stock',
@@ -0,0 +1,161 @@
+import re
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+class First:
+    """Query parameter filled in with the lowest primary key of a model."""
+
+    def __init__(self, label):
+        self.label = label
+
+
+STORE = First('stores.Store')
+
+# Typical list queries: (label, view, action, query params, queryset method).
+# Search is left out on purpose: icontains can never use a B-tree index.
+CASES = [
+    ('products', 'inventory.views.ProductViewSet', 'list', {}, None),
+    ('products by category', 'inventory.views.ProductViewSet', 'list',
+     {'category': First('inventory.Category')}, None),
+    ('stock by last update', 'inventory.views.StockViewSet', 'list',
+     {'ordering': '-last_updated'}, None),
+    ('stock low stock', 'inventory.views.StockViewSet', 'low_stock', {},
+     'below_reorder_level'),
+    ('store inventory by store', 'stores.views.StoreInventoryViewSet', 'list',
+     {'store': STORE}, None),
+    ('store inventory by quantity', 'stores.views.StoreInventoryViewSet',
+     'list', {'store': STORE, 'ordering': 'quantity'}, None),
+    ('store inventory low stock', 'stores.views.StoreInventoryViewSet',
+     'low_stock', {'store': STORE}, 'below_reorder_level'),
+    ('stock movements by store', 'stores.views.StockMovementViewSet', 'list',
+     {'store': STORE}, None),
+    ('stock transfers', 'stores.views.StockTransferViewSet', 'list', {}, None),
+    ('sales', 'sales.views.SaleViewSet', 'list', {}, None),
+    ('sales by store and date', 'sales.views.SaleViewSet', 'list',
+     {'store': STORE, 'date_from': '2024-01-01', 'date_to': '2024-01-31',
+      'ordering': '-date'}, None),
+    ('activity', 'users.views.UserActivityViewSet', 'list', {}, None),
+    ('activity by user', 'users.views.UserActivityViewSet', 'list',
+     {'user': First('users.User')}, None),
+    ('activity by object', 'users.views.UserActivityViewSet', 'list',
+     {'model_name': 'Product', 'object_id': 1}, None),
+]
+
+# Plan lines meaning every row of a table is read, or that rows are sorted
+# after the fact instead of read in index order
+PATTERNS = {
+    'sqlite': [
+        ('full scan', re.compile(
+            r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (?P<index>\w+))?')),
+        ('temp sort', re.compile(r'\bUSE TEMP B-TREE FOR (.+)')),
+    ],
+    'postgresql': [
+        ('full scan', re.compile(r'\bSeq Scan on (\w+)')),
+        ('temp sort', re.compile(r'\b((?:Incremental )?Sort)\b(?! Key)')),
+    ],
+}
+
+
+def partial_indexes():
+    return {index.name for model in apps.get_models()
+            for index in model._meta.indexes if index.condition is not None}
+
+
+def plan_warnings(plan, patterns):
+    """Return (kind, detail) for each worrying line of an EXPLAIN plan."""
+    # Scanning a partial index reads only the rows it was built for
+    partial = partial_indexes()
+    warnings = []
+    for line in plan.splitlines():
+        for kind, pattern in patterns:
+            match = pattern.search(line)
+            if match and match.groupdict().get('index') not in partial:
+                warnings.append((kind, match.group(1)))
+    return warnings
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the typical list queries of each ViewSet and report "
+            "full table scans and temporary sorts")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', action='append', default=[],
+                            help='Only run cases whose label contains this text')
+        parser.add_argument('--fail', action='store_true',
+                            help='Exit with an error if any query is flagged')
+
+    def handle(self, *args, **options):
+        patterns = PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(
+                f'Reading {connection.vendor} query plans is not supported')
+        cases = [case for case in CASES if not options['case'] or any(
+            text in case[0] for text in options['case'])]
+
+        flagged = 0
+        for label, view_path, action, params, method in cases:
+            try:
+                params = self.resolve(params)
+            except LookupError as e:
+                self.stdout.write(f'{label}: skipped, no {e} rows')
+                continue
+            queryset = self.build(view_path, action, params, method)
+            plan = queryset.explain()
+            warnings = plan_warnings(plan, patterns)
+            if not queryset.query.where and all(
+                    kind == 'full scan' for kind, _ in warnings):
+                # Unfiltered and already in index order: the scan stops
+                # after one page
+                warnings = []
+
+            if warnings:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'{label}:'))
+                for kind, detail in warnings:
+                    self.stdout.write(f'  {kind}: {detail}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: ok'))
+            if options['verbosity'] >= 2:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        summary = f'{flagged} of {len(cases)} queries flagged'
+        if flagged and options['fail']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def resolve(self, params):
+        resolved = {}
+        for name, value in params.items():
+            if isinstance(value, First):
+                model = apps.get_model(value.label)
+                value = model.objects.order_by('pk').values_list(
+                    'pk', flat=True).first()
+                if value is None:
+                    raise LookupError(model.__name__)
+            resolved[name] = value
+        return resolved
+
+    def build(self, view_path, action, params, method):
+        """The queryset for the first page of a request with `params`."""
+        view = import_string(view_path)()
+        view.action = action
+        view.format_kwarg = None
+        view.args = ()
+        view.kwargs = {}
+        view.request = Request(APIRequestFactory().get('/', params))
+        queryset = view.filter_queryset(view.get_queryset())
+        if method:
+            queryset = getattr(queryset, method)()
+        paginator = view.paginator
+        if isinstance(paginator, CursorPagination):
+            queryset = queryset.order_by(
+                *paginator.get_ordering(view.request, queryset, view))
+        page_size = paginator.get_page_size(view.request) if paginator else None
+        return queryset[:page_size or 100]
@@ -0,0 +1,70 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from django_filters.rest_framework import DjangoFilterBackend
+from core.exports import FORMATS, export_chunks
+
+# Each export reuses its API view's queryset, filters and columns
+RESOURCES = {
+    'products': 'inventory.views.ProductViewSet',
+    'stock': 'inventory.views.StockViewSet',
+    'sales': 'sales.views.SaleViewSet',
+    'activity': 'users.views.UserActivityViewSet',
+}
+
+
+class Command(BaseCommand):
+    help = 'Stream products, stock, sales or user activity to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(RESOURCES))
+        parser.add_argument('--format', dest='file_format',
+                            choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', default='-',
+                            help='File path, or - for stdout (default)')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Rows read per query (default EXPORT_CHUNK_SIZE)')
+        parser.add_argument('--filter', action='append', default=[],
+                            metavar='FIELD=VALUE',
+                            help='Filter as accepted by the list endpoint, '
+                                 'e.g. --filter store=1 --filter date_from=2024-01-01')
+
+    def handle(self, *args, **options):
+        view_class = import_string(RESOURCES[options['resource']])
+        view = view_class()
+        queryset = view.get_queryset()
+        params = {}
+        for item in options['filter']:
+            field, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Invalid filter {item!r}; use FIELD=VALUE')
+            params[field] = value
+        if params:
+            filterset_class = DjangoFilterBackend().get_filterset_class(
+                view, queryset)
+            if filterset_class is None:
+                raise CommandError(
+                    f'{options["resource"]} export does not support filters')
+            filterset = filterset_class(data=params, queryset=queryset)
+            unknown = set(params) - set(filterset.filters)
+            if unknown:
+                raise CommandError(f'Unknown filters: {", ".join(sorted(unknown))}')
+            if not filterset.is_valid():
+                raise CommandError(filterset.errors.as_text())
+            queryset = filterset.qs
+
+        chunks = export_chunks(queryset, view.export_fields,
+                               options['file_format'], options['gzip'],
+                               options['chunk_size'])
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+            return
+        with open(options['output'], 'wb') as output:
+            self.write(chunks, output)
+        self.stderr.write(f'Wrote {options["output"]}')
+
+    def write(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,274 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from core.cache import bump_versions
+from inventory.models import Category, Product, Stock
+from sales.models import ProductSalesDaily, Sale, SaleItem, StoreSalesDaily
+from sales.rollups import sale_deltas
+from stores.models import StockMovement, Store, StoreInventory
+from users.models import User, UserActivity
+
+ADJECTIVES = ['Organic', 'Classic', 'Fresh', 'Large', 'Small', 'Premium',
+              'Family', 'Spicy', 'Sweet', 'Light', 'Whole', 'Frozen']
+NOUNS = ['Coffee', 'Rice', 'Soap', 'Milk', 'Bread', 'Tea', 'Juice', 'Pasta',
+         'Cereal', 'Butter', 'Cheese', 'Honey', 'Flour', 'Beans', 'Water']
+PAYMENT_METHODS = ['cash', 'card', 'mobile']
+ACTIVITY_MODELS = ['Product', 'Store', 'Sale', 'Category', 'StoreInventory']
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = ('Fill an empty database with a deterministic synthetic dataset '
+            'for benchmarks: stores, products, stock, sales and activity')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', type=int, default=5)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--sales', type=int, default=10000)
+        parser.add_argument('--activity', type=int, default=10000,
+                            help='Number of user activity rows')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of users; the first is a super admin')
+        parser.add_argument('--days', type=int, default=90,
+                            help='Sales and activity are spread over this many '
+                                 'days before --end')
+        parser.add_argument('--end', type=datetime.fromisoformat,
+                            help='Day the dataset ends, exclusive (default '
+                                 'today); fix it to reproduce timestamps too')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        if Product.objects.exists() or Store.objects.exists():
+            raise CommandError(
+                'The database already has products or stores; '
+                'generate_dataset only fills an empty database')
+        if options['stores'] < 1 or options['products'] < 1 or options['users'] < 1:
+            raise CommandError('--stores, --products and --users must be at least 1')
+
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        end = options['end'] or timezone.now()
+        self.end = timezone.make_aware(datetime.combine(end.date(), dt_time.min))
+        self.start = self.end - timedelta(days=options['days'])
+        store_count, product_count = options['stores'], options['products']
+
+        started = time.monotonic()
+        # Quantities are worked out before anything is inserted, so every
+        # row goes in once with its final values
+        sold = self.count_sold(options['sales'], store_count, product_count)
+        quantities = self.final_quantities(store_count, product_count)
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            stores = self.create_stores(store_count)
+            products = self.create_products(product_count, quantities)
+            self.create_inventory(stores, products, quantities, sold)
+            self.create_sales(options['sales'], stores, products, users)
+            self.create_activity(options['activity'], users, stores, products)
+            bump_versions(Category, Product)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(stores)} stores, {len(products)} products, '
+            f'{options["sales"]} sales and {options["activity"]} activity rows '
+            f'in {time.monotonic() - started:.1f}s.'))
+
+    def random(self, name):
+        # One generator per entity, so changing one size leaves the rows
+        # generated for the others unchanged
+        return random.Random(f'{self.seed}:{name}')
+
+    def moment(self, rng):
+        return self.start + timedelta(
+            seconds=rng.randrange(int((self.end - self.start).total_seconds())))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        return User.objects.bulk_create([
+            User(username=f'bench-user-{i}', email=f'bench-user-{i}@example.com',
+                 password=password,
+                 role=User.Role.SUPER_ADMIN if i == 0 else User.Role.ADMIN)
+            for i in range(count)
+        ], batch_size=self.batch_size)
+
+    def create_stores(self, count):
+        return Store.objects.bulk_create([
+            Store(name=f'Store {i}', address=f'{i} Market Street',
+                  phone=f'555-{i:04d}', email=f'store{i}@example.com')
+            for i in range(count)
+        ], batch_size=self.batch_size)
+
+    def final_quantities(self, store_count, product_count):
+        """Store inventory quantity per (store, product) index, some below
+        the default reorder level."""
+        rng = self.random('inventory')
+        return [[rng.randrange(0, 60) for _ in range(product_count)]
+                for _ in range(store_count)]
+
+    def create_products(self, count, quantities):
+        rng = self.random('products')
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {i}',
+                     description=f'{NOUNS[i % len(NOUNS)]} and more')
+            for i in range(max(1, count // 50))
+        ], batch_size=self.batch_size)
+        products = Product.objects.bulk_create([
+            Product(name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+                    description=f'Synthetic product {i}',
+                    category=rng.choice(categories),
+                    sku=f'SKU-{i:07d}', barcode=f'{i:013d}',
+                    price=Decimal(rng.randrange(50, 10000)) / 100,
+                    on_hand=sum(store[i] for store in quantities))
+            for i in range(count)
+        ], batch_size=self.batch_size)
+        Stock.objects.bulk_create([
+            Stock(product=product, quantity=rng.randrange(0, 100),
+                  last_updated=self.moment(rng))
+            for product in products
+        ], batch_size=self.batch_size)
+        return products
+
+    def sales(self, count, store_count, product_count):
+        """
+        Yield (store index, date, payment method, {product index: quantity})
+        in date order.
+        """
+        rng = self.random('sales')
+        step = (self.end - self.start) / max(count, 1)
+        for i in range(count):
+            basket = {}
+            for _ in range(rng.randint(1, 4)):
+                product = rng.randrange(product_count)
+                basket[product] = basket.get(product, 0) + rng.randint(1, 3)
+            yield (rng.randrange(store_count), self.start + step * i,
+                   rng.choice(PAYMENT_METHODS), basket)
+
+    def count_sold(self, count, store_count, product_count):
+        sold = {}
+        for store, _, _, basket in self.sales(count, store_count, product_count):
+            for product, quantity in basket.items():
+                sold[store, product] = sold.get((store, product), 0) + quantity
+        return sold
+
+    def create_inventory(self, stores, products, quantities, sold):
+        """
+        Each row's ledger starts with a receipt of its final quantity plus
+        everything the generated sales take away.
+        """
+        rows, receipts = [], []
+        for s, store in enumerate(stores):
+            for p, product in enumerate(products):
+                quantity = quantities[s][p]
+                rows.append(StoreInventory(store=store, product=product,
+                                           quantity=quantity))
+                receipts.append(StockMovement(
+                    store=store, product=product,
+                    quantity=quantity + sold.get((s, p), 0),
+                    kind=StockMovement.Kind.RECEIPT, reference='generated',
+                    created_at=self.start))
+        StoreInventory.objects.bulk_create(rows, batch_size=self.batch_size)
+        StockMovement.objects.bulk_create(receipts, batch_size=self.batch_size)
+
+    def create_sales(self, count, stores, products, users):
+        sales = self.sales(count, len(stores), len(products))
+        store_rollups, product_rollups = {}, {}
+        while True:
+            chunk = [sale for sale in (next(sales, None)
+                                       for _ in range(self.batch_size))
+                     if sale is not None]
+            if not chunk:
+                break
+            with auto_now_off(Sale):
+                rows = Sale.objects.bulk_create([
+                    Sale(store=stores[store], payment_method=method,
+                         date=date, created_at=date, updated_at=date,
+                         total_amount=sum(products[product].price * quantity
+                                          for product, quantity in basket.items()))
+                    for store, date, method, basket in chunk
+                ])
+
+            items, movements = [], []
+            for sale, (_, date, _, basket) in zip(rows, chunk):
+                sale_items = [
+                    SaleItem(sale=sale, product=products[product],
+                             quantity=quantity,
+                             unit_price=products[product].price,
+                             total_price=products[product].price * quantity)
+                    for product, quantity in basket.items()
+                ]
+                items += sale_items
+                movements += [
+                    StockMovement(
+                        store_id=sale.store_id, product_id=item.product_id,
+                        quantity=-item.quantity, kind=StockMovement.Kind.SALE,
+                        reference=f'sale:{sale.id}', user=users[0],
+                        created_at=date)
+                    for item in sale_items
+                ]
+                add_deltas(store_rollups, product_rollups,
+                           *sale_deltas(sale, sale_items))
+            SaleItem.objects.bulk_create(items, batch_size=self.batch_size)
+            StockMovement.objects.bulk_create(movements,
+                                              batch_size=self.batch_size)
+
+        StoreSalesDaily.objects.bulk_create([
+            StoreSalesDaily(store_id=store_id, day=day, sale_count=sale_count,
+                            units=units, revenue=revenue)
+            for (store_id, day), (sale_count, units, revenue)
+            in store_rollups.items()
+        ], batch_size=self.batch_size)
+        ProductSalesDaily.objects.bulk_create([
+            ProductSalesDaily(store_id=store_id, day=day, product_id=product_id,
+                              units=units, revenue=revenue)
+            for (store_id, day, product_id), (units, revenue)
+            in product_rollups.items()
+        ], batch_size=self.batch_size)
+
+    def create_activity(self, count, users, stores, products):
+        rng = self.random('activity')
+        targets = {'Product': products, 'Store': stores}
+        rows = []
+        for _ in range(count):
+            model_name = rng.choice(ACTIVITY_MODELS)
+            objects = targets.get(model_name)
+            object_id = (rng.choice(objects).id if objects
+                         else rng.randint(1, 1000))
+            rows.append(UserActivity(
+                user=rng.choice(users),
+                action_type=rng.choice(UserActivity.ActionType.values),
+                model_name=model_name, object_id=object_id,
+                details={'generated': True}, created_at=self.moment(rng)))
+            if len(rows) == self.batch_size:
+                UserActivity.objects.bulk_create(rows)
+                rows = []
+        UserActivity.objects.bulk_create(rows)
+
+
+def add_deltas(stores, products, store_deltas, product_deltas):
+    for totals, deltas in ((stores, store_deltas), (products, product_deltas)):
+        for key, values in deltas.items():
+            current = totals.get(key)
+            totals[key] = (list(values) if current is None
+                           else [a + b for a, b in zip(current, values)])
+
+
+@contextmanager
+def auto_now_off(model):
+    """Let bulk_create keep explicit values for auto_now(_add) fields."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
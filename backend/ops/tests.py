@@ -0,0 +1,148 @@
+import csv
+import gzip
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from inventory.models import Category, Product
+from sales.models import ProductSalesDaily, Sale, StoreSalesDaily
+from stores.models import StockMovement, Store, StoreInventory
+from users.models import User, UserActivity
+from .management.commands.explain_queries import PATTERNS, plan_warnings
+
+
+class ExportDataTests(APITestCase):
+    def setUp(self):
+        self.stores = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+        for i in range(6):
+            Sale.objects.create(store=self.stores[i % 2], total_amount=i,
+                                payment_method='cash')
+
+    def test_applies_filters(self):
+        path = os.path.join(tempfile.mkdtemp(), 'sales.csv.gz')
+        self.addCleanup(os.remove, path)
+        call_command('export_data', 'sales', '--gzip', '--output', path,
+                     '--filter', f'store={self.stores[1].id}',
+                     '--chunk-size', '2', stderr=StringIO())
+        with gzip.open(path, 'rt') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 3)
+
+
+class ExplainQueriesTests(APITestCase):
+    def test_plan_warnings(self):
+        plan = '\n'.join([
+            '3 0 0 SCAN users_useractivity USING INDEX activity_feed_idx',
+            '5 0 0 SCAN inventory_stock USING INDEX stock_low_stock_idx',
+            '7 0 0 SEARCH users_user USING INTEGER PRIMARY KEY (rowid=?)',
+            '9 0 0 USE TEMP B-TREE FOR ORDER BY',
+        ])
+        # Scanning a partial index is not a full scan
+        self.assertEqual(plan_warnings(plan, PATTERNS['sqlite']), [
+            ('full scan', 'users_useractivity'), ('temp sort', 'ORDER BY')])
+
+    @skipUnless(connection.vendor == 'sqlite', 'plans checked on SQLite')
+    def test_list_queries_use_indexes(self):
+        User.objects.create_user(username='admin', password='pass')
+        Category.objects.create(name='Snacks')
+        Store.objects.create(name='Main', address='-', phone='-',
+                             email='main@example.com')
+        out = StringIO()
+        call_command('explain_queries', '--fail', stdout=out)
+        self.assertIn('0 of 14 queries flagged', out.getvalue())
+
+    @skipUnless(connection.vendor == 'sqlite', 'plans checked on SQLite')
+    def test_fail_reports_flagged_queries(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX activity_object_idx')
+        with self.assertRaisesMessage(CommandError, '1 of 1 queries flagged'):
+            call_command('explain_queries', '--fail', '--case', 'by object',
+                         stdout=StringIO())
+
+
+class GenerateDatasetTests(APITestCase):
+    options = ['--stores', '2', '--products', '30', '--sales', '40',
+               '--activity', '25', '--users', '3', '--end', '2024-06-01']
+
+    def generate(self, *extra):
+        call_command('generate_dataset', *self.options, *extra, stdout=StringIO())
+
+    def snapshot(self):
+        return (
+            list(Product.objects.order_by('id').values_list(
+                'sku', 'name', 'price', 'on_hand', 'category__name')),
+            list(StoreInventory.objects.order_by('id').values_list(
+                'store__name', 'product__sku', 'quantity')),
+            list(Sale.objects.order_by('id').values_list(
+                'store__name', 'date', 'total_amount')),
+            list(UserActivity.objects.order_by('id').values_list(
+                'user__username', 'action_type', 'created_at')),
+        )
+
+    def test_generates_requested_sizes(self):
+        self.generate()
+        self.assertEqual(Store.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(StoreInventory.objects.count(), 60)
+        self.assertEqual(Sale.objects.count(), 40)
+        self.assertEqual(UserActivity.objects.count(), 25)
+        self.assertEqual(User.objects.filter(
+            role=User.Role.SUPER_ADMIN).count(), 1)
+        self.assertFalse(Sale.objects.filter(
+            date__gte=timezone.make_aware(datetime(2024, 6, 1))).exists())
+
+    def test_dataset_is_consistent(self):
+        self.generate()
+        out = StringIO()
+        call_command('check_product_totals', stdout=out)
+        self.assertIn('0 wrong', out.getvalue())
+        ledger = {
+            (store, product): total for store, product, total in
+            StockMovement.objects.values_list('store', 'product')
+            .annotate(total=Sum('quantity')).order_by()}
+        self.assertEqual(ledger, {
+            (row.store_id, row.product_id): row.quantity
+            for row in StoreInventory.objects.all()})
+
+        rollups = (sorted(StoreSalesDaily.objects.values_list(
+            'store', 'day', 'sale_count', 'units', 'revenue')),
+            sorted(ProductSalesDaily.objects.values_list(
+                'store', 'day', 'product', 'units', 'revenue')))
+        call_command('backfill_sales_rollups', stdout=StringIO())
+        self.assertEqual(rollups, (sorted(StoreSalesDaily.objects.values_list(
+            'store', 'day', 'sale_count', 'units', 'revenue')),
+            sorted(ProductSalesDaily.objects.values_list(
+                'store', 'day', 'product', 'units', 'revenue'))))
+
+    def test_same_seed_generates_same_data(self):
+        self.generate()
+        first = self.snapshot()
+        Sale.objects.all().delete()
+        Store.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+        Sale.objects.all().delete()
+        Store.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+        self.generate('--seed', '1')
+        self.assertNotEqual(self.snapshot()[0], first[0])
+
+    def test_refuses_non_empty_database(self):
+        Store.objects.create(name='Main', address='-', phone='-',
+                             email='main@example.com')
+        with self.assertRaisesMessage(CommandError, 'empty database'):
+            self.generate()
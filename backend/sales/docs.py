@@ -33,15 +33,16 @@ sale_list_docs = extend_schema(
 
 sale_create_docs = extend_schema(
     summary="Create a new sale",
-    description="Creates a new sale with multiple items and updates store inventory.",
+    description="Creates a new sale with multiple items and updates store inventory in a single transaction. "
+                "Inventory rows are locked for the duration of the checkout, so concurrent sales cannot oversell. "
+                "The unit price defaults to the current product price and the sale total is computed server-side.",
     request={
         "application/json": {
             "type": "object",
             "properties": {
                 "store": {"type": "integer", "description": "Store ID"},
-                "date": {"type": "string", "format": "date-time", "description": "Sale date and time"},
-                "customer_name": {"type": "string", "description": "Customer name"},
-                "customer_email": {"type": "string", "format": "email", "description": "Customer email"},
+                "payment_method": {"type": "string", "description": "Payment method"},
+                "status": {"type": "string", "description": "Sale status (defaults to completed)"},
                 "items": {
                     "type": "array",
                     "items": {
@@ -49,13 +50,13 @@ sale_create_docs = extend_schema(
                         "properties": {
                             "product": {"type": "integer", "description": "Product ID"},
                             "quantity": {"type": "integer", "description": "Quantity sold"},
-                            "unit_price": {"type": "number", "description": "Price per unit"}
+                            "unit_price": {"type": "number", "description": "Price per unit (defaults to product price)"}
                         },
-                        "required": ["product", "quantity", "unit_price"]
+                        "required": ["product", "quantity"]
                     }
                 }
             },
-            "required": ["store", "date", "items"]
+            "required": ["store", "payment_method", "items"]
         }
     },
     responses={
@@ -67,10 +68,12 @@ sale_create_docs = extend_schema(
 
 sale_delete_docs = extend_schema(
     summary="Delete a sale",
-    description="Deletes a sale and restores the inventory quantities. This operation is only allowed for recent sales.",
+    description="Deletes a sale, restores the store inventory quantities and reverses the sale in the daily "
+                "sales rollups, in one transaction. Only sales within the refund window "
+                "(SALE_REFUND_WINDOW_DAYS) can be deleted.",
     responses={
         204: "Sale deleted successfully and inventory restored",
-        400: "Cannot delete old sales or sale with processed payments"
+        400: "Cannot delete sales older than the refund window"
     },
     tags=["Sales"]
 )
@@ -109,3 +112,84 @@ sale_item_delete_docs = extend_schema(
     },
     tags=["Sale Items"]
 )
+
+# Sales report documentation
+sales_daily_report_docs = extend_schema(
+    summary="Daily sales by store",
+    description="Returns sale count, units sold and revenue per store and day, read from the daily rollup "
+                "table that is updated in the same transaction as each sale and refund.",
+    parameters=[
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Filter by store ID"
+        ),
+        OpenApiParameter(
+            name="date_from",
+            type=OpenApiTypes.DATE,
+            description="First day to include (YYYY-MM-DD)"
+        ),
+        OpenApiParameter(
+            name="date_to",
+            type=OpenApiTypes.DATE,
+            description="Last day to include (YYYY-MM-DD)"
+        )
+    ],
+    responses={200: "Daily sales retrieved successfully"},
+    tags=["Reports"]
+)
+
+sales_product_report_docs = extend_schema(
+    summary="Sales by product",
+    description="Returns units sold and revenue per product over the selected stores and days, ordered by "
+                "revenue, read from the daily product rollup table.",
+    parameters=[
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Filter by store ID"
+        ),
+        OpenApiParameter(
+            name="product",
+            type=OpenApiTypes.INT,
+            description="Filter by product ID"
+        ),
+        OpenApiParameter(
+            name="date_from",
+            type=OpenApiTypes.DATE,
+            description="First day to include (YYYY-MM-DD)"
+        ),
+        OpenApiParameter(
+            name="date_to",
+            type=OpenApiTypes.DATE,
+            description="Last day to include (YYYY-MM-DD)"
+        )
+    ],
+    responses={200: "Product sales retrieved successfully"},
+    tags=["Reports"]
+)
+
+sale_export_docs = extend_schema(
+    summary="Export sales",
+    description="Streams every sale matching the list filters (store, date range) as CSV or NDJSON, "
+                "optionally gzipped, without pagination.",
+    parameters=[
+        OpenApiParameter(
+            name="file_format",
+            type=OpenApiTypes.STR,
+            enum=["csv", "ndjson"],
+            description="Output format (default csv)"
+        ),
+        OpenApiParameter(
+            name="gzip",
+            type=OpenApiTypes.BOOL,
+            description="Gzip the file"
+        )
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.BINARY,
+        400: "Invalid export parameters",
+        429: "Too many exports in progress"
+    },
+    tags=["Sales"]
+)
@@ -0,0 +1,40 @@
+from datetime import datetime, time, timedelta
+import django_filters
+from django.utils import timezone
+from .models import Sale, ProductSalesDaily, StoreSalesDaily
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class SaleFilter(django_filters.FilterSet):
+    # Compare against day boundaries rather than date(date) so an index on
+    # the sale date can be used
+    date_from = django_filters.DateFilter(method='filter_date_from')
+    date_to = django_filters.DateFilter(method='filter_date_to')
+
+    class Meta:
+        model = Sale
+        fields = ['store', 'date_from', 'date_to']
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(date__gte=start_of_day(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(date__lt=start_of_day(value + timedelta(days=1)))
+
+
+class StoreSalesDailyFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name='day', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='day', lookup_expr='lte')
+
+    class Meta:
+        model = StoreSalesDaily
+        fields = ['store', 'date_from', 'date_to']
+
+
+class ProductSalesDailyFilter(StoreSalesDailyFilter):
+    class Meta:
+        model = ProductSalesDaily
+        fields = ['store', 'product', 'date_from', 'date_to']
@@ -0,0 +1,94 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from sales.models import ProductSalesDaily, Sale, SaleItem, StoreSalesDaily
+
+ROLLUP_MODELS = (StoreSalesDaily, ProductSalesDaily)
+
+
+def lock_rollup_tables():
+    """
+    Make concurrent sales wait until the current transaction commits
+    instead of adding deltas to rows it is replacing. SQLite already
+    serializes writers once the transaction has written.
+    """
+    if connection.vendor == 'postgresql':
+        tables = ', '.join(connection.ops.quote_name(model._meta.db_table)
+                           for model in ROLLUP_MODELS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE')
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily sales rollup tables from existing sales, '
+            'committing a few days at a time')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=7,
+                            help='Days of rollups rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        tz = timezone.get_current_timezone()
+        span = self.day_span(tz)
+        if span is not None:
+            first, last = span
+            step = timedelta(days=options['chunk_days'])
+            start = first
+            while start <= last:
+                self.rebuild(start, min(start + step, last + timedelta(days=1)), tz)
+                start += step
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt sales rollups for {StoreSalesDaily.objects.count()} '
+            'store days.'))
+
+    def day_span(self, tz):
+        """First and last day with sales or rollup rows, or None."""
+        days = []
+        dates = Sale.objects.aggregate(first=Min('date'), last=Max('date'))
+        days += [timezone.localdate(value, tz) for value in dates.values()
+                 if value is not None]
+        for model in ROLLUP_MODELS:
+            days += [value for value in model.objects.aggregate(
+                first=Min('day'), last=Max('day')).values() if value is not None]
+        return (min(days), max(days)) if days else None
+
+    def rebuild(self, start, end, tz):
+        """Replace the rollup rows for days in [start, end) in one transaction."""
+        since = timezone.make_aware(datetime.combine(start, time.min), tz)
+        until = timezone.make_aware(datetime.combine(end, time.min), tz)
+        with transaction.atomic():
+            lock_rollup_tables()
+            # Deleting first also takes SQLite's write lock before reading
+            for model in ROLLUP_MODELS:
+                model.objects.filter(day__gte=start, day__lt=end).delete()
+
+            stores = {}
+            for row in Sale.objects.filter(date__gte=since, date__lt=until).annotate(
+                    day=TruncDate('date', tzinfo=tz)).values(
+                    'store_id', 'day').annotate(
+                    sale_count=Count('id'), revenue=Sum('total_amount')
+            ).order_by():
+                stores[(row['store_id'], row['day'])] = StoreSalesDaily(
+                    store_id=row['store_id'], day=row['day'],
+                    sale_count=row['sale_count'], units=0,
+                    revenue=row['revenue'])
+
+            products = []
+            for row in SaleItem.objects.filter(
+                    sale__date__gte=since, sale__date__lt=until).annotate(
+                    day=TruncDate('sale__date', tzinfo=tz)).values(
+                    'sale__store_id', 'day', 'product_id').annotate(
+                    units=Sum('quantity'), revenue=Sum('total_price')
+            ).order_by():
+                products.append(ProductSalesDaily(
+                    store_id=row['sale__store_id'], day=row['day'],
+                    product_id=row['product_id'], units=row['units'],
+                    revenue=row['revenue']))
+                stores[(row['sale__store_id'], row['day'])].units += row['units']
+
+            StoreSalesDaily.objects.bulk_create(stores.values(), batch_size=1000)
+            ProductSalesDaily.objects.bulk_create(products, batch_size=1000)
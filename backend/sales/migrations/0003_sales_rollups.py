@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_low_stock_index'),
+        ('stores', '0002_storeinventory_low_stock_index'),
+        ('sales', '0002_sale_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_sales', to='stores.store')),
+            ],
+            options={
+                'verbose_name_plural': 'Product sales (daily)',
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sale_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='stores.store')),
+            ],
+            options={
+                'verbose_name_plural': 'Store sales (daily)',
+                'indexes': [models.Index(fields=['day'], name='store_sales_daily_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='storesalesdaily',
+            constraint=models.UniqueConstraint(fields=('store', 'day'), name='unique_store_sales_daily'),
+        ),
+        migrations.AddIndex(
+            model_name='productsalesdaily',
+            index=models.Index(fields=['day', 'product'], name='product_sales_daily_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesdaily',
+            constraint=models.UniqueConstraint(fields=('store', 'day', 'product'), name='unique_product_sales_daily'),
+        ),
+    ]
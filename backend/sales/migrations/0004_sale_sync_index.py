@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['store', 'updated_at', 'id'], name='sale_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_sale_sync_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['store', '-date', '-id'], name='sale_store_date_idx'),
+        ),
+    ]
@@ -15,6 +15,18 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the sales feed
+            models.Index(fields=['-created_at', '-id'], name='sale_feed_idx'),
+            # Per-store date ranges, newest first
+            models.Index(fields=['store', '-date', '-id'],
+                         name='sale_store_date_idx'),
+            # Delta sync keyset per store
+            models.Index(fields=['store', 'updated_at', 'id'],
+                         name='sale_sync_idx'),
+        ]
+
     def __str__(self):
         return f"Sale {self.id} - {self.store.name} ({self.date})"
 
@@ -35,3 +47,52 @@ class SaleItem(models.Model):
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity} - ${self.total_price}"
+
+
+class StoreSalesDaily(models.Model):
+    """Sales totals per store and day, maintained incrementally."""
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    sale_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Store sales (daily)'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'day'], name='unique_store_sales_daily'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='store_sales_daily_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name} {self.day}: {self.revenue}"
+
+
+class ProductSalesDaily(models.Model):
+    """Sales totals per store, product and day, maintained incrementally."""
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name='daily_product_sales')
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Product sales (daily)'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'day', 'product'],
+                name='unique_product_sales_daily'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'product'],
+                         name='product_sales_daily_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name} {self.product.name} {self.day}: {self.units}"
@@ -0,0 +1,61 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .models import ProductSalesDaily, StoreSalesDaily
+
+
+def sale_deltas(sale, items, sign=1):
+    """
+    Rollup deltas for one sale and its items. Use sign=-1 to reverse a
+    refunded sale.
+    """
+    day = timezone.localdate(sale.date)
+    products = defaultdict(lambda: [0, Decimal('0')])
+    units = 0
+    for item in items:
+        delta = products[(sale.store_id, day, item.product_id)]
+        delta[0] += sign * item.quantity
+        delta[1] += sign * item.total_price
+        units += item.quantity
+    stores = {(sale.store_id, day): [sign, sign * units, sign * sale.total_amount]}
+    return stores, products
+
+
+def apply_rollup_deltas(stores, products):
+    """
+    Add deltas to the daily rollup rows in a constant number of queries.
+
+    `stores` maps (store_id, day) to [sale_count, units, revenue] and
+    `products` maps (store_id, day, product_id) to [units, revenue]. Missing
+    rows are inserted first, then every affected row is locked in key order
+    so concurrent sales for the same store and day cannot deadlock.
+    """
+    with transaction.atomic():
+        _apply(StoreSalesDaily, ('store_id', 'day'),
+               ('sale_count', 'units', 'revenue'), stores)
+        _apply(ProductSalesDaily, ('store_id', 'day', 'product_id'),
+               ('units', 'revenue'), products)
+
+
+def _apply(model, key_fields, value_fields, deltas):
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas],
+        ignore_conflicts=True)
+    # Superset filter on each key column, narrowed in Python
+    lookup = {
+        f'{field}__in': {key[i] for key in deltas}
+        for i, field in enumerate(key_fields)
+    }
+    rows = [
+        row for row in model.objects.select_for_update()
+        .filter(**lookup).order_by(*key_fields)
+        if tuple(getattr(row, field) for field in key_fields) in deltas
+    ]
+    for row in rows:
+        key = tuple(getattr(row, field) for field in key_fields)
+        for field, delta in zip(value_fields, deltas[key]):
+            setattr(row, field, getattr(row, field) + delta)
+    model.objects.bulk_update(rows, value_fields)
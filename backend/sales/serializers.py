@@ -1,5 +1,10 @@
+from decimal import Decimal
+from django.db import transaction
 from rest_framework import serializers
-from .models import Sale, SaleItem
+from stores.adjustments import adjust_quantities, lock_store_inventory
+from stores.models import StockMovement
+from .models import Sale, SaleItem, StoreSalesDaily
+from .rollups import apply_rollup_deltas, sale_deltas
 
 
 class SaleItemSerializer(serializers.ModelSerializer):
@@ -15,3 +20,98 @@ class SaleSerializer(serializers.ModelSerializer):
         model = Sale
         fields = ['id', 'store', 'date', 'total_amount',
                   'payment_method', 'status', 'items', 'created_at', 'updated_at']
+
+
+class SaleItemCreateSerializer(serializers.Serializer):
+    # Plain integer rather than a related field: products are resolved
+    # together with the locked inventory rows instead of one query per line.
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+
+
+class SaleCreateSerializer(serializers.ModelSerializer):
+    """
+    Checkout serializer: creates the sale, its items and the store inventory
+    decrements in one transaction, using a constant number of queries
+    regardless of basket size.
+    """
+    items = SaleItemCreateSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = Sale
+        fields = ['store', 'payment_method', 'status', 'items']
+
+    def validate_store(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError("Store is not active")
+        return value
+
+    def create(self, validated_data):
+        items = validated_data.pop('items')
+        store = validated_data['store']
+
+        requested = {}
+        for item in items:
+            requested[item['product']] = requested.get(
+                item['product'], 0) + item['quantity']
+
+        with transaction.atomic():
+            inventory = lock_store_inventory(store.id, requested)
+
+            errors = []
+            for product_id, quantity in requested.items():
+                row = inventory.get(product_id)
+                if row is None:
+                    errors.append(
+                        f"Product {product_id} is not stocked at this store")
+                elif row.quantity < quantity:
+                    errors.append(
+                        f"Insufficient stock for {row.product.name}: "
+                        f"{row.quantity} available, {quantity} requested")
+            if errors:
+                raise serializers.ValidationError({'items': errors})
+
+            sale_items = []
+            for item in items:
+                unit_price = item.get(
+                    'unit_price', inventory[item['product']].product.price)
+                sale_items.append(SaleItem(
+                    product_id=item['product'],
+                    quantity=item['quantity'],
+                    unit_price=unit_price,
+                    # bulk_create bypasses SaleItem.save()
+                    total_price=item['quantity'] * unit_price,
+                ))
+
+            sale = Sale.objects.create(
+                total_amount=sum(i.total_price for i in sale_items),
+                **validated_data)
+            for sale_item in sale_items:
+                sale_item.sale = sale
+            SaleItem.objects.bulk_create(sale_items)
+
+            request = self.context.get('request')
+            adjust_quantities(
+                inventory,
+                {product_id: -quantity
+                 for product_id, quantity in requested.items()},
+                StockMovement.Kind.SALE, f'sale:{sale.id}',
+                getattr(request, 'user', None))
+            apply_rollup_deltas(*sale_deltas(sale, sale_items))
+        return sale
+
+
+class StoreSalesDailySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StoreSalesDaily
+        fields = ['store', 'day', 'sale_count', 'units', 'revenue']
+
+
+class ProductSalesSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    product_name = serializers.CharField(source='product__name')
+    sku = serializers.CharField(source='product__sku')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -0,0 +1,242 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.testing import QueryCountAssertionsMixin
+from inventory.models import Category, Product
+from stores.models import Store, StoreInventory
+from users.models import User
+from .models import ProductSalesDaily, Sale, SaleItem, StoreSalesDaily
+from .views import SaleViewSet
+
+
+class SaleCheckoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cashier', email='cashier@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.store = Store.objects.create(
+            name='Main', address='1 High St', phone='123', email='main@example.com')
+        category = Category.objects.create(name='Snacks')
+        self.products = [
+            Product.objects.create(
+                name=f'Product {i}', category=category, sku=f'SKU-{i}',
+                price=Decimal('2.50'))
+            for i in range(10)
+        ]
+        for product in self.products:
+            StoreInventory.objects.create(
+                store=self.store, product=product, quantity=5)
+
+    def checkout(self, items):
+        return self.client.post('/api/sales/', {
+            'store': self.store.id,
+            'payment_method': 'cash',
+            'items': items,
+        }, format='json')
+
+    def test_checkout_creates_sale_and_decrements_inventory(self):
+        response = self.checkout([
+            {'product': self.products[0].id, 'quantity': 2},
+            {'product': self.products[1].id, 'quantity': 1, 'unit_price': '4.00'},
+            {'product': self.products[0].id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['total_amount']), Decimal('11.50'))
+        self.assertEqual(len(response.data['items']), 3)
+        quantities = dict(StoreInventory.objects.filter(
+            store=self.store).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities[self.products[0].id], 2)
+        self.assertEqual(quantities[self.products[1].id], 4)
+
+    def test_checkout_rejects_oversell_without_side_effects(self):
+        response = self.checkout([
+            {'product': self.products[0].id, 'quantity': 1},
+            {'product': self.products[1].id, 'quantity': 6},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Sale.objects.count(), 0)
+        self.assertEqual(SaleItem.objects.count(), 0)
+        self.assertEqual(StoreInventory.objects.get(
+            store=self.store, product=self.products[0]).quantity, 5)
+
+    def test_checkout_query_count_is_independent_of_basket_size(self):
+        counts = []
+        for size in (1, 10):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.checkout([
+                    {'product': p.id, 'quantity': 1} for p in self.products[:size]
+                ])
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class SaleQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='manager', email='manager@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.store = Store.objects.create(
+            name='Main', address='1 High St', phone='123', email='main@example.com')
+        category = Category.objects.create(name='Snacks')
+        self.product = Product.objects.create(
+            name='Chips', category=category, sku='CHIPS', price=Decimal('1.00'))
+
+    def create_sales(self, count, items=3):
+        sales = []
+        for _ in range(count):
+            sale = Sale.objects.create(
+                store=self.store, total_amount=items, payment_method='cash')
+            for _ in range(items):
+                SaleItem.objects.create(
+                    sale=sale, product=self.product, quantity=1,
+                    unit_price=Decimal('1.00'))
+            sales.append(sale)
+        return sales
+
+    def test_sale_list(self):
+        self.assertListQueriesConstant('/api/sales/', self.create_sales)
+
+    def test_sale_detail(self):
+        small, = self.create_sales(1, items=1)
+        large, = self.create_sales(1, items=10)
+        self.assertDetailQueriesConstant(
+            [f'/api/sales/{small.id}/', f'/api/sales/{large.id}/'])
+
+
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cashier', email='cashier@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.store = Store.objects.create(
+            name='Main', address='1 High St', phone='123', email='main@example.com')
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            name='Chips', category=category, sku='CHIPS', price=Decimal('2.00'))
+        self.soda = Product.objects.create(
+            name='Soda', category=category, sku='SODA', price=Decimal('1.50'))
+        for product in (self.chips, self.soda):
+            StoreInventory.objects.create(
+                store=self.store, product=product, quantity=50)
+
+    def checkout(self, items):
+        response = self.client.post('/api/sales/', {
+            'store': self.store.id,
+            'payment_method': 'cash',
+            'items': [{'product': product.id, 'quantity': quantity}
+                      for product, quantity in items],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def rollups(self):
+        return (
+            list(StoreSalesDaily.objects.order_by('store', 'day').values_list(
+                'store', 'day', 'sale_count', 'units', 'revenue')),
+            list(ProductSalesDaily.objects.order_by('product').values_list(
+                'store', 'day', 'product', 'units', 'revenue')),
+        )
+
+    def test_checkout_updates_rollups(self):
+        self.checkout([(self.chips, 2), (self.soda, 1)])
+        self.checkout([(self.chips, 1)])
+        today = timezone.localdate()
+        stores, products = self.rollups()
+        self.assertEqual(stores, [(self.store.id, today, 2, 4, Decimal('7.50'))])
+        self.assertEqual(products, [
+            (self.store.id, today, self.chips.id, 3, Decimal('6.00')),
+            (self.store.id, today, self.soda.id, 1, Decimal('1.50')),
+        ])
+
+    def test_refund_reverses_rollups_and_restores_inventory(self):
+        self.checkout([(self.chips, 2)])
+        sale_id = self.checkout([(self.chips, 1), (self.soda, 3)])
+        response = self.client.delete(f'/api/sales/{sale_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        stores, products = self.rollups()
+        self.assertEqual(stores[0][2:], (1, 2, Decimal('4.00')))
+        self.assertEqual([row[3:] for row in products], [
+            (2, Decimal('4.00')), (0, Decimal('0.00'))])
+        quantities = dict(StoreInventory.objects.values_list('product', 'quantity'))
+        self.assertEqual(quantities, {self.chips.id: 48, self.soda.id: 50})
+
+    def test_refund_of_a_refunded_sale_changes_nothing(self):
+        sale_id = self.checkout([(self.chips, 2)])
+        stale = Sale.objects.get(id=sale_id)
+        self.assertEqual(self.client.delete(f'/api/sales/{sale_id}/').status_code,
+                         status.HTTP_204_NO_CONTENT)
+        expected = self.rollups()
+        # A second request that loaded the sale before the first committed
+        with mock.patch.object(SaleViewSet, 'get_object', return_value=stale):
+            response = self.client.delete(f'/api/sales/{sale_id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.rollups(), expected)
+        self.assertEqual(StoreInventory.objects.get(product=self.chips).quantity, 50)
+
+    def test_sales_cannot_be_edited(self):
+        sale_id = self.checkout([(self.chips, 1)])
+        response = self.client.patch(
+            f'/api/sales/{sale_id}/', {'total_amount': '999.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        response = self.client.put(f'/api/sales/{sale_id}/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_refund_rejects_old_sales(self):
+        sale_id = self.checkout([(self.chips, 1)])
+        Sale.objects.filter(id=sale_id).update(
+            date=timezone.now() - timedelta(days=365))
+        response = self.client.delete(f'/api/sales/{sale_id}/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Sale.objects.filter(id=sale_id).exists())
+
+    def test_backfill_matches_incremental_rollups(self):
+        self.checkout([(self.chips, 2), (self.soda, 1)])
+        self.checkout([(self.soda, 4)])
+        self.checkout([(self.chips, 1)])
+        expected = self.rollups()
+        StoreSalesDaily.objects.all().delete()
+        call_command('backfill_sales_rollups', chunk_days=1, stdout=StringIO())
+        self.assertEqual(self.rollups(), expected)
+
+    def test_backfill_rebuilds_each_day(self):
+        self.checkout([(self.chips, 2)])
+        old_id = self.checkout([(self.soda, 1)])
+        # Moving a sale leaves today's rollups stale and its new day empty
+        old_day = timezone.localdate() - timedelta(days=3)
+        Sale.objects.filter(id=old_id).update(
+            date=timezone.now() - timedelta(days=3))
+        call_command('backfill_sales_rollups', chunk_days=2, stdout=StringIO())
+        stores, products = self.rollups()
+        self.assertEqual(stores, [
+            (self.store.id, old_day, 1, 1, Decimal('1.50')),
+            (self.store.id, timezone.localdate(), 1, 2, Decimal('4.00')),
+        ])
+        self.assertEqual([row[1:3] for row in products], [
+            (timezone.localdate(), self.chips.id), (old_day, self.soda.id)])
+
+    def test_reports(self):
+        self.checkout([(self.chips, 2), (self.soda, 1)])
+        self.checkout([(self.soda, 4)])
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(
+            '/api/reports/sales/daily/', {'store': self.store.id, 'date_from': today})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['sale_count'], 2)
+        self.assertEqual(response.data['results'][0]['revenue'], '11.50')
+
+        response = self.client.get('/api/reports/sales/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['sku'], row['units'], row['revenue'])
+             for row in response.data['results']],
+            [('SODA', 5, '7.50'), ('CHIPS', 2, '4.00')])
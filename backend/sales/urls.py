@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SaleViewSet
+from .views import SaleViewSet, SalesReportViewSet
 
 router = DefaultRouter()
 router.register(r'sales', SaleViewSet)
+router.register(r'reports/sales', SalesReportViewSet, basename='sales-report')
 
 urlpatterns = [
     path('', include(router.urls)),
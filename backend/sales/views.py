@@ -1,10 +1,150 @@
-from rest_framework import viewsets
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
-from .models import Sale
-from .serializers import SaleSerializer
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from core.exports import export_response
+from core.pagination import FeedCursorPagination
+from stores.adjustments import adjust_quantities, lock_store_inventory
+from stores.models import StockMovement
+from users.models import UserActivity
+from users.audit import record_activity
+from .models import Sale, StoreSalesDaily, ProductSalesDaily
+from .serializers import (
+    SaleSerializer, SaleCreateSerializer, StoreSalesDailySerializer,
+    ProductSalesSerializer
+)
+from .filters import SaleFilter, StoreSalesDailyFilter, ProductSalesDailyFilter
+from .rollups import apply_rollup_deltas, sale_deltas
+from .docs import (
+    sale_list_docs, sale_create_docs, sale_delete_docs, sale_export_docs,
+    sales_daily_report_docs, sales_product_report_docs
+)
 
 
-class SaleViewSet(viewsets.ModelViewSet):
-    queryset = Sale.objects.all()
+class SaleViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                  mixins.DestroyModelMixin, mixins.ListModelMixin,
+                  viewsets.GenericViewSet):
+    """
+    Sales are immutable once checked out: there is no update, so the
+    rollups and inventory only change through checkout and refund.
+    """
+    queryset = Sale.objects.prefetch_related('items')
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = FeedCursorPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = SaleFilter
+    ordering_fields = ['date', 'created_at', 'total_amount']
+    ordering = ['-created_at', '-id']
+    export_fields = ['id', 'store_id', 'date', 'total_amount',
+                     'payment_method', 'status', 'created_at', 'updated_at']
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return SaleCreateSerializer
+        return SaleSerializer
+
+    @sale_list_docs
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @sale_create_docs
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sale = serializer.save()
+        record_activity(
+            user=request.user,
+            action_type=UserActivity.ActionType.CREATE,
+            model_name='Sale',
+            object_id=sale.id,
+            details={'store': sale.store_id,
+                     'total_amount': str(sale.total_amount)}
+        )
+        data = SaleSerializer(sale, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @sale_export_docs
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all sales matching the list filters"""
+        return export_response(
+            request, self.filter_queryset(self.get_queryset()),
+            self.export_fields, 'sales')
+
+    @sale_delete_docs
+    def destroy(self, request, *args, **kwargs):
+        """Refund a recent sale: restore inventory and reverse the rollups."""
+        sale = self.get_object()
+        window = timedelta(days=settings.SALE_REFUND_WINDOW_DAYS)
+        if sale.date < timezone.now() - window:
+            return Response(
+                {'error': f'Only sales from the last {window.days} days can be deleted'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            # Lock and read the sale again so a concurrent or retried
+            # refund finds it gone instead of restoring the stock twice
+            sale = Sale.objects.select_for_update().filter(pk=sale.pk).first()
+            if sale is None:
+                raise NotFound()
+            items = list(sale.items.all())
+            restored = {}
+            for item in items:
+                restored[item.product_id] = restored.get(
+                    item.product_id, 0) + item.quantity
+            inventory = lock_store_inventory(sale.store_id, restored)
+            adjust_quantities(inventory, restored, StockMovement.Kind.REFUND,
+                              f'sale:{sale.id}', request.user)
+            apply_rollup_deltas(*sale_deltas(sale, items, sign=-1))
+            sale.delete()
+
+        record_activity(
+            user=request.user,
+            action_type=UserActivity.ActionType.DELETE,
+            model_name='Sale',
+            object_id=kwargs['pk'],
+            details={'store': sale.store_id,
+                     'total_amount': str(sale.total_amount)}
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SalesReportViewSet(viewsets.GenericViewSet):
+    """Sales reports served only from the daily rollup tables."""
+    queryset = StoreSalesDaily.objects.all()
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = StoreSalesDailyFilter
+
+    @sales_daily_report_docs
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """Sale count, units and revenue per store and day"""
+        queryset = self.filter_queryset(
+            StoreSalesDaily.objects.order_by('day', 'store_id'))
+        page = self.paginate_queryset(queryset)
+        serializer = StoreSalesDailySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @sales_product_report_docs
+    @action(detail=False, methods=['get'], filterset_class=ProductSalesDailyFilter)
+    def products(self, request):
+        """Units and revenue per product over the filtered stores and days"""
+        queryset = self.filter_queryset(ProductSalesDaily.objects.all()).values(
+            'product', 'product__name', 'product__sku'
+        ).annotate(
+            units=Sum('units'), revenue=Sum('revenue')
+        ).order_by('-revenue', 'product')
+        page = self.paginate_queryset(queryset)
+        serializer = ProductSalesSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
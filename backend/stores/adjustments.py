@@ -0,0 +1,151 @@
+"""
+The write path for store inventory quantities. Every change goes through
+these helpers so the stock movement ledger and the per-product on-hand
+totals are updated in the same transaction.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+from core.cache import bump_versions
+from inventory.cache import PRODUCT_ON_HAND
+from inventory.models import Product
+from .ledger import record_movements
+from .models import StockMovement, StoreInventory
+
+
+def update_product_totals(deltas):
+    """
+    Add the per-product sum of {(store_id, product_id): delta} to
+    Product.on_hand. Products are locked in id order first so concurrent
+    writers touching the same products cannot deadlock.
+    """
+    totals = {}
+    for (_, product_id), delta in deltas.items():
+        totals[product_id] = totals.get(product_id, 0) + delta
+    totals = {product_id: delta for product_id, delta in totals.items() if delta}
+    if not totals:
+        return
+    list(Product.objects.select_for_update().filter(
+        id__in=totals).order_by('id').values_list('id', flat=True))
+    bump_versions(PRODUCT_ON_HAND)
+    Product.objects.filter(id__in=totals).update(
+        on_hand=Case(
+            *[When(id=product_id, then=F('on_hand') + delta)
+              for product_id, delta in totals.items()],
+            output_field=IntegerField()))
+
+
+def recompute_product_totals(product_ids):
+    """Reset Product.on_hand for the given products from store inventory."""
+    totals = StoreInventory.objects.filter(
+        product=OuterRef('pk')).order_by().values('product').annotate(
+        total=Sum('quantity')).values('total')
+    Product.objects.filter(id__in=product_ids).update(
+        on_hand=Coalesce(Subquery(totals), 0))
+    bump_versions(PRODUCT_ON_HAND)
+
+
+def record_changes(deltas, kind, reference='', user=None, batch_size=1000):
+    """
+    Record applied quantity changes: append them to the stock ledger and
+    roll them into the product totals. Call inside the transaction that
+    changed the inventory rows.
+    """
+    record_movements(deltas, kind, reference, user, batch_size)
+    update_product_totals(deltas)
+
+
+def lock_store_inventory(store_id, product_ids):
+    """
+    Lock a store's inventory rows for the given products, in product order
+    so concurrent transactions always acquire locks in the same sequence.
+    """
+    return {
+        row.product_id: row
+        for row in StoreInventory.objects
+        .select_for_update(of=('self',))
+        .select_related('product')
+        .filter(store_id=store_id, product_id__in=product_ids)
+        .order_by('product_id')
+    }
+
+
+def adjust_quantities(rows, deltas, kind, reference='', user=None):
+    """
+    Add deltas[product_id] to each locked row from `lock_store_inventory`
+    in one UPDATE and record the movements.
+    """
+    if not rows:
+        return
+    StoreInventory.objects.filter(
+        pk__in=[row.pk for row in rows.values()]
+    ).update(
+        quantity=Case(
+            *[When(pk=row.pk, then=F('quantity') + deltas[product_id])
+              for product_id, row in rows.items()],
+            output_field=IntegerField()),
+        last_updated=timezone.now(),
+    )
+    record_changes(
+        {(row.store_id, product_id): deltas[product_id]
+         for product_id, row in rows.items()},
+        kind, reference, user)
+
+
+def apply_adjustments(deltas, kind=StockMovement.Kind.ADJUSTMENT,
+                      reference='', user=None, batch_size=1000):
+    """
+    Add quantity deltas to store inventory in one transaction.
+
+    `deltas` maps (store_id, product_id) to a quantity change. Missing rows
+    are inserted with quantity 0 first, then every affected row is locked in
+    (store, product) order and updated with batched CASE statements, so the
+    number of queries depends on the batch count rather than the row count.
+    Raises ValidationError, rolling everything back, if any quantity would
+    become negative. Returns (updated, created).
+    """
+    if not deltas:
+        return 0, 0
+    store_ids = {store_id for store_id, _ in deltas}
+    product_ids = {product_id for _, product_id in deltas}
+
+    with transaction.atomic():
+        existing = set(StoreInventory.objects.filter(
+            store_id__in=store_ids, product_id__in=product_ids
+        ).values_list('store_id', 'product_id'))
+        missing = [key for key in deltas if key not in existing]
+        StoreInventory.objects.bulk_create(
+            [StoreInventory(store_id=store_id, product_id=product_id)
+             for store_id, product_id in missing],
+            batch_size=batch_size, ignore_conflicts=True)
+
+        # Superset filter on store and product, narrowed in Python
+        rows = [
+            row for row in StoreInventory.objects.select_for_update()
+            .filter(store_id__in=store_ids, product_id__in=product_ids)
+            .only('id', 'store_id', 'product_id', 'quantity')
+            .order_by('store_id', 'product_id')
+            if (row.store_id, row.product_id) in deltas
+        ]
+        errors = []
+        now = timezone.now()
+        for row in rows:
+            delta = deltas[(row.store_id, row.product_id)]
+            if row.quantity + delta < 0:
+                errors.append({
+                    'store': row.store_id,
+                    'product': row.product_id,
+                    'error': f'Insufficient stock: {row.quantity} available, '
+                             f'{-delta} removed',
+                })
+            row.quantity += delta
+            # bulk_update does not apply auto_now
+            row.last_updated = now
+        if errors:
+            raise serializers.ValidationError({'adjustments': errors})
+        StoreInventory.objects.bulk_update(
+            rows, ['quantity', 'last_updated'], batch_size=batch_size)
+        record_changes(deltas, kind, reference, user, batch_size)
+    return len(rows) - len(missing), len(missing)
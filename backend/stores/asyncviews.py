@@ -0,0 +1,6 @@
+from core.asyncviews import AsyncListView
+from .views import StoreInventoryViewSet
+
+
+class StoreInventoryListView(AsyncListView):
+    viewset_class = StoreInventoryViewSet
@@ -9,7 +9,7 @@ store_list_docs = extend_schema(
         OpenApiParameter(
             name="search",
             type=OpenApiTypes.STR,
-            description="Search stores by name or location"
+            description="Search stores by name or address"
         ),
         OpenApiParameter(
             name="ordering",
@@ -29,12 +29,12 @@ store_create_docs = extend_schema(
             "type": "object",
             "properties": {
                 "name": {"type": "string", "description": "Store name"},
-                "location": {"type": "string", "description": "Store location"},
-                "contact_number": {"type": "string", "description": "Contact phone number"},
+                "address": {"type": "string", "description": "Store address"},
+                "phone": {"type": "string", "description": "Contact phone number"},
                 "email": {"type": "string", "format": "email", "description": "Contact email"},
-                "address": {"type": "string", "description": "Store address"}
+                "is_active": {"type": "boolean", "description": "Whether the store can record sales"}
             },
-            "required": ["name", "location"]
+            "required": ["name", "address", "phone", "email"]
         }
     },
     responses={
@@ -84,6 +84,92 @@ store_inventory_list_docs = extend_schema(
     tags=["Store Inventory"]
 )
 
+store_inventory_low_stock_docs = extend_schema(
+    summary="List low stock",
+    description="Returns store inventory rows whose quantity is at or below the reorder level, with the shortfall and "
+                "a suggested order quantity based on the reorder quantity. Filtered in the database using a "
+                "partial index; pages are cached briefly.",
+    parameters=[
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Only this store (all stores when omitted)"
+        ),
+        OpenApiParameter(
+            name="product",
+            type=OpenApiTypes.INT,
+            description="Filter by product ID"
+        )
+    ],
+    responses={200: "List of low stock entries retrieved successfully"},
+    tags=["Store Inventory"]
+)
+
+store_inventory_adjust_docs = extend_schema(
+    summary="Bulk adjust store inventory",
+    description="Applies quantity deltas to many store/product rows in one transaction. Deltas for the same "
+                "store and product are summed, missing inventory rows are created, and rows are updated with "
+                "batched set-based statements. If any quantity would become negative nothing is applied.",
+    request={
+        "application/json": {
+            "type": "object",
+            "properties": {
+                "kind": {"type": "string", "enum": ["adjustment", "receipt"],
+                         "description": "Movement kind recorded in the stock ledger (default adjustment)"},
+                "reference": {"type": "string", "description": "Optional reference, e.g. a delivery number"},
+                "adjustments": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "store": {"type": "integer", "description": "Store ID"},
+                            "product": {"type": "integer", "description": "Product ID"},
+                            "delta": {"type": "integer", "description": "Quantity to add (negative to remove)"}
+                        },
+                        "required": ["store", "product", "delta"]
+                    }
+                }
+            },
+            "required": ["adjustments"]
+        }
+    },
+    responses={
+        200: "Adjustments applied; returns the number of rows updated and created",
+        400: "Invalid entries, unknown stores or products, or insufficient stock"
+    },
+    tags=["Store Inventory"]
+)
+
+store_inventory_as_of_docs = extend_schema(
+    summary="Store inventory as of a time",
+    description="Returns a store's product quantities at a past time, computed from the latest inventory snapshot "
+                "taken by then plus the stock movements recorded after it.",
+    parameters=[
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Store ID",
+            required=True
+        ),
+        OpenApiParameter(
+            name="at",
+            type=OpenApiTypes.DATETIME,
+            description="Point in time (ISO 8601)",
+            required=True
+        ),
+        OpenApiParameter(
+            name="product",
+            type=OpenApiTypes.INT,
+            description="Only this product"
+        )
+    ],
+    responses={
+        200: "Quantities retrieved successfully",
+        400: "Missing or invalid store or time"
+    },
+    tags=["Store Inventory"]
+)
+
 store_inventory_update_docs = extend_schema(
     summary="Update store inventory",
     description="Updates the quantity of a product in a store's inventory.",
@@ -114,3 +200,83 @@ store_inventory_delete_docs = extend_schema(
     },
     tags=["Store Inventory"]
 )
+
+# StockTransfer ViewSet documentation
+stock_transfer_list_docs = extend_schema(
+    summary="List stock transfers",
+    description="Returns stock transfers between stores, newest first, with their lines.",
+    parameters=[
+        OpenApiParameter(
+            name="source_store",
+            type=OpenApiTypes.INT,
+            description="Filter by source store ID"
+        ),
+        OpenApiParameter(
+            name="destination_store",
+            type=OpenApiTypes.INT,
+            description="Filter by destination store ID"
+        )
+    ],
+    responses={200: "List of stock transfers retrieved successfully"},
+    tags=["Stock Transfers"]
+)
+
+stock_transfer_create_docs = extend_schema(
+    summary="Transfer stock between stores",
+    description="Moves product quantities from one store to another in a single transaction and records a "
+                "transfer document. Both stores' inventory rows are locked in a fixed order, missing destination "
+                "rows are created, and the whole transfer is rejected if any line exceeds the source quantity.",
+    request={
+        "application/json": {
+            "type": "object",
+            "properties": {
+                "source_store": {"type": "integer", "description": "Store to take stock from"},
+                "destination_store": {"type": "integer", "description": "Store to move stock to"},
+                "note": {"type": "string", "description": "Optional note"},
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "product": {"type": "integer", "description": "Product ID"},
+                            "quantity": {"type": "integer", "description": "Quantity to move"}
+                        },
+                        "required": ["product", "quantity"]
+                    }
+                }
+            },
+            "required": ["source_store", "destination_store", "items"]
+        }
+    },
+    responses={
+        201: "Transfer completed successfully",
+        400: "Invalid input data or insufficient stock at the source store"
+    },
+    tags=["Stock Transfers"]
+)
+
+# StockMovement ViewSet documentation
+stock_movement_list_docs = extend_schema(
+    summary="List stock movements",
+    description="Returns the append-only ledger of store inventory changes (sales, refunds, transfers, "
+                "adjustments and receipts), newest first, with cursor pagination.",
+    parameters=[
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Filter by store ID"
+        ),
+        OpenApiParameter(
+            name="product",
+            type=OpenApiTypes.INT,
+            description="Filter by product ID"
+        ),
+        OpenApiParameter(
+            name="kind",
+            type=OpenApiTypes.STR,
+            description="Filter by movement kind (sale, refund, transfer, adjustment, receipt)"
+        )
+    ],
+    responses={200: "List of stock movements retrieved successfully"},
+    tags=["Stock Movements"]
+)
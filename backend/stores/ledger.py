@@ -0,0 +1,105 @@
+"""
+Stock movement ledger for store inventory.
+
+Every change to a StoreInventory quantity appends StockMovement rows in the
+same transaction (see `stores.adjustments`), so on-hand stays a single-row
+read while the ledger explains how each quantity was reached. Snapshots
+record a store's quantities at a ledger position; "as of" queries and
+replays start from the latest snapshot and add the ledger tail.
+"""
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+from .models import (
+    InventorySnapshot, InventorySnapshotItem, StockMovement, StoreInventory
+)
+
+
+def record_movements(deltas, kind, reference='', user=None, batch_size=1000):
+    """Append one movement per non-zero delta in {(store_id, product_id): delta}."""
+    now = timezone.now()
+    user_id = getattr(user, 'pk', None)
+    StockMovement.objects.bulk_create([
+        StockMovement(store_id=store_id, product_id=product_id,
+                      quantity=delta, kind=kind, reference=reference,
+                      user_id=user_id, created_at=now)
+        for (store_id, product_id), delta in deltas.items() if delta
+    ], batch_size=batch_size)
+
+
+def take_snapshot(store_id, batch_size=1000):
+    """
+    Snapshot a store's quantities. The store's inventory rows are locked
+    while the ledger position is read, so no movement for them can commit
+    between the two.
+    """
+    with transaction.atomic():
+        quantities = list(
+            StoreInventory.objects.select_for_update()
+            .filter(store_id=store_id).exclude(quantity=0)
+            .order_by('product_id').values_list('product_id', 'quantity'))
+        last_id = StockMovement.objects.filter(store_id=store_id).aggregate(
+            last=Max('id'))['last'] or 0
+        snapshot = InventorySnapshot.objects.create(
+            store_id=store_id, last_movement_id=last_id)
+        InventorySnapshotItem.objects.bulk_create([
+            InventorySnapshotItem(
+                snapshot=snapshot, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities
+        ], batch_size=batch_size)
+    return snapshot
+
+
+def latest_snapshot(store_id, at=None):
+    snapshots = InventorySnapshot.objects.filter(store_id=store_id)
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    return snapshots.order_by('-taken_at', '-id').first()
+
+
+def snapshot_quantities(snapshot, product_id=None):
+    if snapshot is None:
+        return {}
+    items = snapshot.items.all()
+    if product_id is not None:
+        items = items.filter(product_id=product_id)
+    return dict(items.values_list('product_id', 'quantity'))
+
+
+def quantities_as_of(store_id, at, product_id=None):
+    """
+    Return {product_id: quantity} for a store at time `at`, from the latest
+    snapshot taken by then plus the movements recorded after it.
+    """
+    snapshot = latest_snapshot(store_id, at)
+    quantities = snapshot_quantities(snapshot, product_id)
+    movements = StockMovement.objects.filter(
+        store_id=store_id, created_at__lte=at,
+        id__gt=snapshot.last_movement_id if snapshot else 0)
+    if product_id is not None:
+        movements = movements.filter(product_id=product_id)
+    for product, delta in movements.values_list('product_id').annotate(
+            Sum('quantity')).order_by():
+        quantities[product] = quantities.get(product, 0) + delta
+    return {product: quantity
+            for product, quantity in quantities.items() if quantity}
+
+
+def replay(store_id, from_snapshot=True, chunk_size=5000):
+    """
+    Rebuild {product_id: quantity} for a store by streaming its ledger in
+    id order, `chunk_size` movements at a time, starting from the latest
+    snapshot unless `from_snapshot` is False.
+    """
+    snapshot = latest_snapshot(store_id) if from_snapshot else None
+    quantities = snapshot_quantities(snapshot)
+    last_id = snapshot.last_movement_id if snapshot else 0
+    while True:
+        chunk = list(
+            StockMovement.objects.filter(store_id=store_id, id__gt=last_id)
+            .order_by('id').values_list('id', 'product_id', 'quantity')
+            [:chunk_size])
+        for last_id, product_id, delta in chunk:
+            quantities[product_id] = quantities.get(product_id, 0) + delta
+        if len(chunk) < chunk_size:
+            return quantities
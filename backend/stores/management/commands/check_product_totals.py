@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from core.cache import bump_versions
+from inventory.cache import PRODUCT_ON_HAND
+from inventory.models import Product
+from stores.models import StoreInventory
+
+
+class Command(BaseCommand):
+    help = ('Verify Product.on_hand against the sum of store inventory, '
+            'walking products in id-ordered chunks')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Products checked per transaction')
+        parser.add_argument('--repair', action='store_true',
+                            help='Overwrite wrong totals with the summed '
+                                 'store inventory')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        checked = mismatched = 0
+        while True:
+            with transaction.atomic():
+                # Lock the chunk's products: inventory writers update the
+                # total under the same lock, so the sums below are stable
+                products = list(
+                    Product.objects.select_for_update()
+                    .filter(id__gt=last_id).order_by('id')
+                    .only('id', 'on_hand')[:chunk_size])
+                if not products:
+                    break
+                last_id = products[-1].id
+                totals = dict(
+                    StoreInventory.objects.filter(
+                        product_id__in=[p.id for p in products])
+                    .values_list('product_id').annotate(Sum('quantity'))
+                    .order_by())
+                wrong = []
+                for product in products:
+                    expected = totals.get(product.id, 0)
+                    if product.on_hand != expected:
+                        self.stdout.write(
+                            f'Product {product.id}: on_hand {product.on_hand}, '
+                            f'store inventory {expected}')
+                        product.on_hand = expected
+                        wrong.append(product)
+                if options['repair'] and wrong:
+                    Product.objects.bulk_update(wrong, ['on_hand'])
+                    bump_versions(PRODUCT_ON_HAND)
+            checked += len(products)
+            mismatched += len(wrong)
+
+        if mismatched and not options['repair']:
+            raise CommandError(
+                f'{mismatched} of {checked} product totals are wrong')
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} products, '
+            f'{mismatched} {"repaired" if options["repair"] else "wrong"}.'))
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from stores.adjustments import recompute_product_totals
+from stores.ledger import replay
+from stores.models import Store, StoreInventory
+
+
+class Command(BaseCommand):
+    help = ('Replay the stock movement ledger to verify store inventory '
+            'quantities, optionally repairing rows that disagree')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, action='append',
+                            help='Store ID (repeatable; default all stores)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Movements read per query')
+        parser.add_argument('--full', action='store_true',
+                            help='Replay from the first movement instead of '
+                                 'the latest snapshot')
+        parser.add_argument('--repair', action='store_true',
+                            help='Overwrite disagreeing rows with the ledger '
+                                 'quantity')
+
+    def handle(self, *args, **options):
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id__in=options['store'])
+        mismatched = 0
+        for store_id in stores.values_list('id', flat=True):
+            mismatched += self.check_store(store_id, options)
+        if mismatched and not options['repair']:
+            raise CommandError(
+                f'{mismatched} store inventory rows disagree with the ledger')
+        self.stdout.write(self.style.SUCCESS(
+            f'{mismatched} rows repaired.' if options['repair']
+            else 'Store inventory matches the ledger.'))
+
+    def check_store(self, store_id, options):
+        # Hold the store's rows so no movement commits mid-replay
+        with transaction.atomic():
+            rows = {
+                row.product_id: row for row in
+                StoreInventory.objects.select_for_update()
+                .filter(store_id=store_id).only('id', 'product_id', 'quantity')
+                .order_by('product_id')
+            }
+            expected = replay(store_id, not options['full'],
+                              options['chunk_size'])
+
+            to_update, to_create, repaired = [], [], set()
+            now = timezone.now()
+            for product_id in sorted(set(rows) | set(expected)):
+                quantity = expected.get(product_id, 0)
+                row = rows.get(product_id)
+                if row is None:
+                    if quantity:
+                        self.stdout.write(
+                            f'Store {store_id} product {product_id}: '
+                            f'missing row, ledger {quantity}')
+                        to_create.append(StoreInventory(
+                            store_id=store_id, product_id=product_id,
+                            quantity=quantity))
+                        repaired.add(product_id)
+                elif row.quantity != quantity:
+                    self.stdout.write(
+                        f'Store {store_id} product {product_id}: '
+                        f'row {row.quantity}, ledger {quantity}')
+                    repaired.add(product_id)
+                    row.quantity = quantity
+                    row.last_updated = now
+                    to_update.append(row)
+
+            if options['repair']:
+                StoreInventory.objects.bulk_update(
+                    to_update, ['quantity', 'last_updated'], batch_size=1000)
+                StoreInventory.objects.bulk_create(to_create, batch_size=1000)
+                recompute_product_totals(repaired)
+        return len(to_update) + len(to_create)
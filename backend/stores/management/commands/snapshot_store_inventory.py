@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from stores.ledger import take_snapshot
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = 'Snapshot store inventory quantities at the current ledger position'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, action='append',
+                            help='Store ID (repeatable; default all stores)')
+
+    def handle(self, *args, **options):
+        stores = Store.objects.order_by('id')
+        if options['store']:
+            stores = stores.filter(id__in=options['store'])
+        for store_id in stores.values_list('id', flat=True):
+            snapshot = take_snapshot(store_id)
+            self.stdout.write(
+                f'Store {store_id}: snapshot {snapshot.id} at movement '
+                f'{snapshot.last_movement_id}')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storeinventory',
+            index=models.Index(condition=models.Q(('quantity__lte', models.F('reorder_level'))), fields=['store', 'product'], name='storeinventory_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:24
+
+from django.db import migrations
+
+
+def create_opening_balances(apps, schema_editor):
+    """One adjustment per existing inventory row so the ledger sums match."""
+    StoreInventory = apps.get_model('stores', 'StoreInventory')
+    StockMovement = apps.get_model('stores', 'StockMovement')
+    batch = []
+    for store_id, product_id, quantity in StoreInventory.objects.exclude(
+            quantity=0).values_list('store_id', 'product_id', 'quantity').iterator(
+            chunk_size=2000):
+        batch.append(StockMovement(
+            store_id=store_id, product_id=product_id, quantity=quantity,
+            kind='adjustment', reference='opening-balance'))
+        if len(batch) >= 2000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+def delete_opening_balances(apps, schema_editor):
+    StockMovement = apps.get_model('stores', 'StockMovement')
+    StockMovement.objects.filter(reference='opening-balance').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0004_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_balances, delete_opening_balances),
+    ]
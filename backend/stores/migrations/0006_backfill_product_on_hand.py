@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_on_hand(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    StoreInventory = apps.get_model('stores', 'StoreInventory')
+    totals = StoreInventory.objects.filter(
+        product=OuterRef('pk')).order_by().values('product').annotate(
+        total=Sum('quantity')).values('total')
+    Product.objects.update(on_hand=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_product_on_hand'),
+        ('stores', '0005_stock_ledger_opening_balances'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_on_hand, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0006_backfill_product_on_hand'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storeinventory',
+            index=models.Index(fields=['store', 'last_updated', 'id'], name='storeinventory_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0007_storeinventory_sync_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storeinventory',
+            index=models.Index(fields=['store', 'quantity'], name='storeinventory_quantity_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator
-from inventory.models import Product
+from django.utils import timezone
+from inventory.models import Product, ReorderQuerySet
 
 
 class Store(models.Model):
@@ -29,12 +31,126 @@ class StoreInventory(models.Model):
     reorder_quantity = models.IntegerField(
         default=20, validators=[MinValueValidator(0)])
 
+    objects = ReorderQuerySet.as_manager()
+
     class Meta:
         unique_together = ('store', 'product')
         verbose_name_plural = "Store Inventories"
+        indexes = [
+            # Partial index of rows at or below their reorder level, so
+            # low-stock scans read only those rows
+            models.Index(fields=['store', 'product'],
+                         condition=models.Q(
+                             quantity__lte=models.F('reorder_level')),
+                         name='storeinventory_low_stock_idx'),
+            # Delta sync keyset per store
+            models.Index(fields=['store', 'last_updated', 'id'],
+                         name='storeinventory_sync_idx'),
+            # A store's inventory ordered by quantity
+            models.Index(fields=['store', 'quantity'],
+                         name='storeinventory_quantity_idx'),
+        ]
 
     def __str__(self):
         return f"{self.store.name} - {self.product.name} ({self.quantity})"
 
     def needs_reorder(self):
         return self.quantity <= self.reorder_level
+
+
+class StockTransfer(models.Model):
+    """A completed movement of stock from one store to another."""
+    source_store = models.ForeignKey(
+        Store, on_delete=models.PROTECT, related_name='transfers_out')
+    destination_store = models.ForeignKey(
+        Store, on_delete=models.PROTECT, related_name='transfers_in')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+        related_name='stock_transfers')
+    note = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='stock_transfer_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Transfer {self.id}: {self.source_store_id} -> {self.destination_store_id}"
+
+
+class StockTransferItem(models.Model):
+    transfer = models.ForeignKey(
+        StockTransfer, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity = models.IntegerField(validators=[MinValueValidator(1)])
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity}"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of store inventory changes. The sum of a store and
+    product's movements equals its StoreInventory quantity.
+    """
+    class Kind(models.TextChoices):
+        SALE = 'sale', 'Sale'
+        REFUND = 'refund', 'Refund'
+        TRANSFER = 'transfer', 'Transfer'
+        ADJUSTMENT = 'adjustment', 'Adjustment'
+        RECEIPT = 'receipt', 'Receipt'
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name='movements')
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='movements')
+    quantity = models.IntegerField()  # signed change
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    reference = models.CharField(max_length=50, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+        blank=True, related_name='stock_movements')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Per-product history and replay
+            models.Index(fields=['store', 'product', 'id'],
+                         name='stockmovement_product_idx'),
+            # Ledger tail after a snapshot
+            models.Index(fields=['store', 'id'],
+                         name='stockmovement_store_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} of {self.product_id} at {self.store_id}"
+
+
+class InventorySnapshot(models.Model):
+    """Quantities of one store's inventory as of a ledger position."""
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField(default=timezone.now)
+    # Highest StockMovement id included in the snapshot
+    last_movement_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-taken_at'],
+                         name='inventorysnapshot_store_idx'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.store_id} at {self.taken_at}"
+
+
+class InventorySnapshotItem(models.Model):
+    snapshot = models.ForeignKey(
+        InventorySnapshot, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity}"
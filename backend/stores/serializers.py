@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from inventory.models import Product
+from .adjustments import apply_adjustments, record_changes
+from .models import (
+    Store, StoreInventory, StockMovement, StockTransfer, StockTransferItem
+)
+
+
+class StoreInventorySerializer(serializers.ModelSerializer):
+    store_name = serializers.CharField(source='store.name', read_only=True)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = StoreInventory
+        fields = ['id', 'store', 'store_name', 'product', 'product_name',
+                  'quantity', 'last_updated', 'reorder_level', 'reorder_quantity']
+
+    def user(self):
+        return getattr(self.context.get('request'), 'user', None)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            record_changes(
+                {(instance.store_id, instance.product_id): instance.quantity},
+                StockMovement.Kind.ADJUSTMENT, user=self.user())
+        return instance
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            # Update the row as re-read under lock so the recorded change
+            # matches what was actually applied
+            current = StoreInventory.objects.select_for_update().get(
+                pk=instance.pk)
+            before = (current.store_id, current.product_id, current.quantity)
+            instance = super().update(current, validated_data)
+            deltas = {before[:2]: -before[2]}
+            key = (instance.store_id, instance.product_id)
+            deltas[key] = deltas.get(key, 0) + instance.quantity
+            record_changes(deltas, StockMovement.Kind.ADJUSTMENT,
+                           user=self.user())
+        return instance
+
+
+class LowStockSerializer(StoreInventorySerializer):
+    sku = serializers.CharField(source='product.sku', read_only=True)
+    shortfall = serializers.IntegerField(read_only=True)
+    suggested_order_quantity = serializers.IntegerField(read_only=True)
+
+    class Meta(StoreInventorySerializer.Meta):
+        fields = StoreInventorySerializer.Meta.fields + [
+            'sku', 'shortfall', 'suggested_order_quantity']
+
+
+class StoreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Store
+        fields = ['id', 'name', 'address', 'phone', 'email', 'is_active',
+                  'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+
+class InventoryAdjustmentSerializer(serializers.Serializer):
+    store = serializers.IntegerField(min_value=1)
+    product = serializers.IntegerField(min_value=1)
+    delta = serializers.IntegerField()
+
+
+class InventoryAdjustmentRequestSerializer(serializers.Serializer):
+    adjustments = InventoryAdjustmentSerializer(
+        many=True, allow_empty=False,
+        max_length=settings.STORE_INVENTORY_ADJUST_MAX_ROWS)
+    kind = serializers.ChoiceField(
+        choices=[StockMovement.Kind.ADJUSTMENT, StockMovement.Kind.RECEIPT],
+        default=StockMovement.Kind.ADJUSTMENT)
+    reference = serializers.CharField(
+        max_length=50, required=False, default='', allow_blank=True)
+
+    def validate_adjustments(self, value):
+        """Sum deltas per (store, product) and check both sides exist."""
+        deltas = {}
+        for entry in value:
+            key = (entry['store'], entry['product'])
+            deltas[key] = deltas.get(key, 0) + entry['delta']
+
+        store_ids = {store_id for store_id, _ in deltas}
+        product_ids = {product_id for _, product_id in deltas}
+        known_stores = set(Store.objects.filter(
+            id__in=store_ids).values_list('id', flat=True))
+        known_products = set(Product.objects.filter(
+            id__in=product_ids).values_list('id', flat=True))
+        errors = []
+        if store_ids - known_stores:
+            errors.append(
+                f'Unknown stores: {sorted(store_ids - known_stores)}')
+        if product_ids - known_products:
+            errors.append(
+                f'Unknown products: {sorted(product_ids - known_products)}')
+        if errors:
+            raise serializers.ValidationError(errors)
+        return deltas
+
+
+class StockTransferItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockTransferItem
+        fields = ['product', 'quantity']
+
+
+class StockTransferSerializer(serializers.ModelSerializer):
+    items = StockTransferItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = StockTransfer
+        fields = ['id', 'source_store', 'destination_store', 'created_by',
+                  'note', 'created_at', 'items']
+
+
+class StockTransferLineSerializer(serializers.Serializer):
+    # Plain integer: products are checked with one IN query for the batch
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockTransferCreateSerializer(serializers.ModelSerializer):
+    """
+    Moves stock between two stores and records the transfer document in one
+    transaction, using a constant number of queries regardless of the
+    number of lines.
+    """
+    items = StockTransferLineSerializer(
+        many=True, allow_empty=False,
+        max_length=settings.STORE_INVENTORY_ADJUST_MAX_ROWS)
+
+    class Meta:
+        model = StockTransfer
+        fields = ['source_store', 'destination_store', 'note', 'items']
+
+    def validate_items(self, value):
+        quantities = {}
+        for line in value:
+            quantities[line['product']] = quantities.get(
+                line['product'], 0) + line['quantity']
+        known = set(Product.objects.filter(
+            id__in=quantities).values_list('id', flat=True))
+        unknown = sorted(set(quantities) - known)
+        if unknown:
+            raise serializers.ValidationError(f'Unknown products: {unknown}')
+        return quantities
+
+    def validate(self, attrs):
+        if attrs['source_store'] == attrs['destination_store']:
+            raise serializers.ValidationError(
+                "Source and destination stores must differ")
+        if not attrs['destination_store'].is_active:
+            raise serializers.ValidationError(
+                {'destination_store': ["Store is not active"]})
+        return attrs
+
+    def create(self, validated_data):
+        quantities = validated_data.pop('items')
+        source = validated_data['source_store'].id
+        destination = validated_data['destination_store'].id
+        deltas = {}
+        for product_id, quantity in quantities.items():
+            deltas[(source, product_id)] = -quantity
+            deltas[(destination, product_id)] = quantity
+
+        with transaction.atomic():
+            transfer = StockTransfer.objects.create(**validated_data)
+            # Locks both stores' rows in (store, product) order and rejects
+            # the whole transfer if any source row would go negative
+            apply_adjustments(
+                deltas, StockMovement.Kind.TRANSFER, f'transfer:{transfer.id}',
+                validated_data.get('created_by'))
+            StockTransferItem.objects.bulk_create([
+                StockTransferItem(
+                    transfer=transfer, product_id=product_id, quantity=quantity)
+                for product_id, quantity in quantities.items()
+            ])
+        return transfer
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'store', 'product', 'quantity', 'kind', 'reference',
+                  'user', 'created_at']
+
+
+class StockAsOfQuerySerializer(serializers.Serializer):
+    store = serializers.IntegerField(min_value=1)
+    at = serializers.DateTimeField()
+    product = serializers.IntegerField(min_value=1, required=False)
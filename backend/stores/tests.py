@@ -1,3 +1,412 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from core.testing import QueryCountAssertionsMixin
+from inventory.models import Category, Product
+from users.models import User
+from .models import Store, StoreInventory, StockMovement, StockTransfer
 
-# Create your tests here.
+
+class LowStockTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='manager', email='manager@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.products = [
+            Product.objects.create(
+                name=f'Product {i}', category=category, sku=f'SKU-{i}', price=1)
+            for i in range(3)
+        ]
+        self.stores = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+        for store in self.stores:
+            for quantity, product in zip([2, 10, 50], self.products):
+                StoreInventory.objects.create(
+                    store=store, product=product, quantity=quantity,
+                    reorder_level=10, reorder_quantity=25)
+
+    def test_low_stock_per_store_and_global(self):
+        url = '/api/store-inventory/low_stock/'
+        response = self.client.get(url, {'store': self.stores[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        first = response.data['results'][0]
+        self.assertEqual(first['shortfall'], 8)
+        self.assertEqual(first['suggested_order_quantity'], 25)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_low_stock_page_is_cached(self):
+        url = '/api/store-inventory/low_stock/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 4)
+
+
+class StoreInventoryAdjustmentTests(APITestCase):
+    url = '/api/store-inventory/adjust/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', category=category, sku=f'SKU-{i}',
+                    price=1)
+            for i in range(50)
+        ])
+        self.store = Store.objects.create(
+            name='Main', address='-', phone='-', email='main@example.com')
+        StoreInventory.objects.create(
+            store=self.store, product=self.products[0], quantity=5)
+
+    def adjust(self, entries):
+        return self.client.post(self.url, {'adjustments': [
+            {'store': self.store.id, 'product': product.id, 'delta': delta}
+            for product, delta in entries
+        ]}, format='json')
+
+    def quantities(self):
+        return dict(StoreInventory.objects.filter(
+            store=self.store).values_list('product_id', 'quantity'))
+
+    def test_adjust_updates_and_creates_rows(self):
+        response = self.adjust([
+            (self.products[0], -2), (self.products[1], 7),
+            (self.products[0], 10)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'updated': 1, 'created': 1})
+        self.assertEqual(self.quantities(), {
+            self.products[0].id: 13, self.products[1].id: 7})
+
+    def test_adjust_rejects_negative_result_atomically(self):
+        response = self.adjust([(self.products[1], 3), (self.products[0], -6)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(), {self.products[0].id: 5})
+
+    def test_adjust_rejects_unknown_products(self):
+        response = self.client.post(self.url, {'adjustments': [
+            {'store': self.store.id, 'product': 999999, 'delta': 1}
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_adjust_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.adjust([(self.products[0], 1)])
+        self.assertEqual(response.status_code, 401)
+
+    def test_adjust_query_count_is_independent_of_size(self):
+        counts = []
+        for size in (2, 50):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.adjust(
+                    [(product, 1) for product in self.products[:size]])
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class StoreQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='manager', email='manager@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+
+    def create_inventory(self, count):
+        store = Store.objects.create(
+            name=f'Store {count}', address='-', phone='-',
+            email=f'store{count}@example.com')
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'P{count}-{i}', category=self.category,
+                sku=f'P{count}-{i}', price=1)
+            StoreInventory.objects.create(store=store, product=product)
+
+    def test_store_inventory_list(self):
+        self.assertListQueriesConstant(
+            '/api/store-inventory/', self.create_inventory)
+
+    def test_store_list(self):
+        def create_stores(count):
+            for i in range(count):
+                Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                     email=f'store{i}@example.com')
+        self.assertListQueriesConstant('/api/stores/', create_stores)
+
+
+class StockTransferTests(APITestCase):
+    url = '/api/stock-transfers/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', category=category, sku=f'SKU-{i}',
+                    price=1)
+            for i in range(50)
+        ])
+        self.source, self.destination = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+        StoreInventory.objects.bulk_create([
+            StoreInventory(store=self.source, product=product, quantity=10)
+            for product in self.products
+        ])
+        StoreInventory.objects.create(
+            store=self.destination, product=self.products[0], quantity=1)
+
+    def transfer(self, lines):
+        return self.client.post(self.url, {
+            'source_store': self.source.id,
+            'destination_store': self.destination.id,
+            'items': [{'product': product.id, 'quantity': quantity}
+                      for product, quantity in lines],
+        }, format='json')
+
+    def quantity(self, store, product):
+        return StoreInventory.objects.get(store=store, product=product).quantity
+
+    def test_transfer_moves_stock_and_records_document(self):
+        response = self.transfer([(self.products[0], 4), (self.products[1], 10)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(response.data['created_by'], self.user.id)
+        self.assertEqual(self.quantity(self.source, self.products[0]), 6)
+        self.assertEqual(self.quantity(self.destination, self.products[0]), 5)
+        self.assertEqual(self.quantity(self.source, self.products[1]), 0)
+        self.assertEqual(self.quantity(self.destination, self.products[1]), 10)
+
+    def test_transfer_rejects_insufficient_stock_atomically(self):
+        response = self.transfer([(self.products[0], 4), (self.products[1], 11)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(StockTransfer.objects.count(), 0)
+        self.assertEqual(self.quantity(self.source, self.products[0]), 10)
+        self.assertFalse(StoreInventory.objects.filter(
+            store=self.destination, product=self.products[1]).exists())
+
+    def test_transfer_rejects_same_store(self):
+        response = self.client.post(self.url, {
+            'source_store': self.source.id,
+            'destination_store': self.source.id,
+            'items': [{'product': self.products[0].id, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_transfer_query_count_is_independent_of_size(self):
+        counts = []
+        for size in (2, 50):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.transfer(
+                    [(product, 1) for product in self.products[:size]])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class StockLedgerTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Product {i}', category=category, sku=f'SKU-{i}',
+                    price=1)
+            for i in range(3)
+        ])
+        self.store, self.other = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+
+    def adjust(self, entries, kind='adjustment'):
+        response = self.client.post('/api/store-inventory/adjust/', {
+            'kind': kind,
+            'adjustments': [
+                {'store': self.store.id, 'product': product.id, 'delta': delta}
+                for product, delta in entries
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def ledger_totals(self):
+        totals = {}
+        for movement in StockMovement.objects.all():
+            key = (movement.store_id, movement.product_id)
+            totals[key] = totals.get(key, 0) + movement.quantity
+        return {key: total for key, total in totals.items() if total}
+
+    def row_totals(self):
+        return {(row.store_id, row.product_id): row.quantity
+                for row in StoreInventory.objects.exclude(quantity=0)}
+
+    def test_every_write_path_appends_movements(self):
+        self.adjust([(self.products[0], 10), (self.products[1], 5)], 'receipt')
+        row = StoreInventory.objects.get(
+            store=self.store, product=self.products[1])
+        self.client.patch(f'/api/store-inventory/{row.id}/',
+                          {'quantity': 2}, format='json')
+        self.client.post('/api/stock-transfers/', {
+            'source_store': self.store.id,
+            'destination_store': self.other.id,
+            'items': [{'product': self.products[0].id, 'quantity': 4}],
+        }, format='json')
+        self.client.post('/api/sales/', {
+            'store': self.store.id, 'payment_method': 'cash',
+            'items': [{'product': self.products[0].id, 'quantity': 1}],
+        }, format='json')
+        self.client.delete(f'/api/store-inventory/{row.id}/')
+
+        self.assertEqual(self.ledger_totals(), self.row_totals())
+        kinds = set(StockMovement.objects.values_list('kind', flat=True))
+        self.assertEqual(kinds, {'receipt', 'adjustment', 'transfer', 'sale'})
+        response = self.client.get(
+            '/api/stock-movements/', {'store': self.store.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['quantity'], -2)
+
+    def test_as_of_uses_snapshot_and_ledger_tail(self):
+        self.adjust([(self.products[0], 10)])
+        call_command('snapshot_store_inventory', stdout=StringIO())
+        self.adjust([(self.products[0], -3), (self.products[1], 4)])
+        before = timezone.now()
+        self.adjust([(self.products[0], -7)])
+
+        response = self.client.get('/api/store-inventory/as_of/', {
+            'store': self.store.id, 'at': before.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'product': self.products[0].id, 'quantity': 7},
+            {'product': self.products[1].id, 'quantity': 4},
+        ])
+        response = self.client.get('/api/store-inventory/as_of/', {
+            'store': self.store.id,
+            'at': (before - timedelta(days=1)).isoformat()})
+        self.assertEqual(response.data['results'], [])
+
+    def test_replay_detects_and_repairs_drift(self):
+        self.adjust([(self.products[0], 10), (self.products[1], 5)])
+        call_command('snapshot_store_inventory', stdout=StringIO())
+        self.adjust([(self.products[0], -2)])
+        # Bypass the write path to simulate a bad write
+        StoreInventory.objects.filter(product=self.products[0]).update(quantity=99)
+        StoreInventory.objects.filter(product=self.products[1]).delete()
+
+        with self.assertRaises(CommandError):
+            call_command('replay_stock_ledger', chunk_size=1, stdout=StringIO())
+        call_command('replay_stock_ledger', repair=True, full=True,
+                     chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.row_totals(), {
+            (self.store.id, self.products[0].id): 8,
+            (self.store.id, self.products[1].id): 5,
+        })
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].on_hand, 8)
+        call_command('replay_stock_ledger', stdout=StringIO())
+
+
+class ProductOnHandTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Snacks')
+        self.chips, self.soda = Product.objects.bulk_create([
+            Product(name='Chips', category=category, sku='CHIPS', price=1),
+            Product(name='Soda', category=category, sku='SODA', price=1),
+        ])
+        self.stores = [
+            Store.objects.create(name=f'Store {i}', address='-', phone='-',
+                                 email=f'store{i}@example.com')
+            for i in range(2)
+        ]
+
+    def on_hand(self, product):
+        product.refresh_from_db(fields=['on_hand'])
+        return product.on_hand
+
+    def test_totals_follow_every_inventory_write(self):
+        self.client.post('/api/store-inventory/adjust/', {'adjustments': [
+            {'store': store.id, 'product': self.chips.id, 'delta': 5}
+            for store in self.stores
+        ]}, format='json')
+        self.assertEqual(self.on_hand(self.chips), 10)
+
+        response = self.client.post('/api/store-inventory/', {
+            'store': self.stores[0].id, 'product': self.soda.id,
+            'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        row_id = response.data['id']
+        self.client.patch(f'/api/store-inventory/{row_id}/',
+                          {'quantity': 7}, format='json')
+        self.assertEqual(self.on_hand(self.soda), 7)
+        self.client.patch(f'/api/store-inventory/{row_id}/',
+                          {'store': self.stores[1].id}, format='json')
+        self.assertEqual(self.on_hand(self.soda), 7)
+
+        self.client.post('/api/sales/', {
+            'store': self.stores[0].id, 'payment_method': 'cash',
+            'items': [{'product': self.chips.id, 'quantity': 2}],
+        }, format='json')
+        self.client.delete(f'/api/store-inventory/{row_id}/')
+        self.assertEqual(self.on_hand(self.chips), 8)
+        self.assertEqual(self.on_hand(self.soda), 0)
+
+        response = self.client.get('/api/inventory/products/', {'in_stock': 'true'})
+        self.assertEqual([p['sku'] for p in response.data['results']], ['CHIPS'])
+        self.assertEqual(response.data['results'][0]['on_hand'], 8)
+        call_command('check_product_totals', stdout=StringIO())
+
+    def test_check_product_totals_repairs_drift(self):
+        StoreInventory.objects.create(
+            store=self.stores[0], product=self.chips, quantity=4)
+        with self.assertRaises(CommandError):
+            call_command('check_product_totals', chunk_size=1, stdout=StringIO())
+        call_command('check_product_totals', repair=True, chunk_size=1,
+                     stdout=StringIO())
+        self.assertEqual(self.on_hand(self.chips), 4)
+        call_command('check_product_totals', stdout=StringIO())
+
+
+class AsyncStoreInventoryTests(APITestCase):
+    def test_list_filters_by_store(self):
+        user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        category = Category.objects.create(name='Snacks')
+        product = Product.objects.create(
+            name='Chips', sku='CHIPS', category=category, price='1.00')
+        stores = [Store.objects.create(
+            name=f'Store {i}', address='-', phone='-',
+            email=f'store{i}@example.com') for i in range(2)]
+        for store in stores:
+            StoreInventory.objects.create(store=store, product=product,
+                                          quantity=5)
+
+        params = {'store': stores[1].id}
+        response = self.client.get('/api/async/store-inventory/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'],
+            self.client.get('/api/store-inventory/', params).json()['results'])
+        self.assertEqual(response.json()['results'][0]['store_name'], 'Store 1')
@@ -0,0 +1,15 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import (
+    StoreViewSet, StoreInventoryViewSet, StockTransferViewSet, StockMovementViewSet
+)
+
+router = DefaultRouter()
+router.register(r'stores', StoreViewSet)
+router.register(r'store-inventory', StoreInventoryViewSet)
+router.register(r'stock-transfers', StockTransferViewSet)
+router.register(r'stock-movements', StockMovementViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -1,3 +1,257 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.db import transaction
+from rest_framework import mixins, viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from core.cache import cached_response
+from core.pagination import FeedCursorPagination
+from users.models import UserActivity
+from users.audit import build_activity, record_activities, record_activity
+from users.permissions import IsAdminOrSuperAdmin
+from .adjustments import apply_adjustments, record_changes
+from .ledger import quantities_as_of
+from .models import Store, StoreInventory, StockMovement, StockTransfer
+from .serializers import (
+    StoreSerializer, StoreInventorySerializer, LowStockSerializer,
+    InventoryAdjustmentRequestSerializer, StockTransferSerializer,
+    StockTransferCreateSerializer, StockMovementSerializer,
+    StockAsOfQuerySerializer
+)
+from .docs import (
+    store_list_docs, store_create_docs, store_delete_docs,
+    store_inventory_list_docs, store_inventory_low_stock_docs,
+    store_inventory_update_docs, store_inventory_delete_docs,
+    store_inventory_adjust_docs, stock_transfer_list_docs,
+    stock_transfer_create_docs, store_inventory_as_of_docs,
+    stock_movement_list_docs
+)
 
-# Create your views here.
+
+class StoreViewSet(viewsets.ModelViewSet):
+    queryset = Store.objects.order_by('id')
+    serializer_class = StoreSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend,
+                       filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['is_active']
+    search_fields = ['name', 'address']
+    ordering_fields = ['name', 'created_at']
+
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            return [IsAdminOrSuperAdmin()]
+        return super().get_permissions()
+
+    @store_list_docs
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @store_create_docs
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if response.status_code == 201:
+            record_activity(
+                user=request.user,
+                action_type=UserActivity.ActionType.CREATE,
+                model_name='Store',
+                object_id=response.data['id'],
+                details={'name': response.data['name']}
+            )
+        return response
+
+    @store_delete_docs
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if instance.sales.exists() or instance.inventory.exists():
+            return Response(
+                {'error': 'Cannot delete store with associated sales or inventory'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = super().destroy(request, *args, **kwargs)
+        if response.status_code == 204:
+            record_activity(
+                user=request.user,
+                action_type=UserActivity.ActionType.DELETE,
+                model_name='Store',
+                object_id=kwargs['pk'],
+                details={'name': instance.name}
+            )
+        return response
+
+
+class StoreInventoryViewSet(viewsets.ModelViewSet):
+    queryset = StoreInventory.objects.select_related(
+        'store', 'product').order_by('store_id', 'product_id')
+    serializer_class = StoreInventorySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend,
+                       filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['store', 'product']
+    search_fields = ['product__name']
+    ordering_fields = ['quantity', 'last_updated']
+
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy',
+                           'adjust']:
+            return [IsAdminOrSuperAdmin()]
+        return super().get_permissions()
+
+    @store_inventory_list_docs
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @store_inventory_update_docs
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        if response.status_code == 200:
+            record_activity(
+                user=request.user,
+                action_type=UserActivity.ActionType.UPDATE,
+                model_name='StoreInventory',
+                object_id=response.data['id'],
+                details={'store': response.data['store'],
+                         'product': response.data['product'],
+                         'quantity': response.data['quantity']}
+            )
+        return response
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            current = StoreInventory.objects.select_for_update().get(
+                pk=instance.pk)
+            instance.delete()
+            record_changes(
+                {(current.store_id, current.product_id): -current.quantity},
+                StockMovement.Kind.ADJUSTMENT, user=self.request.user)
+
+    @store_inventory_delete_docs
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response = super().destroy(request, *args, **kwargs)
+        if response.status_code == 204:
+            record_activity(
+                user=request.user,
+                action_type=UserActivity.ActionType.DELETE,
+                model_name='StoreInventory',
+                object_id=kwargs['pk'],
+                details={'store': instance.store_id,
+                         'product': instance.product_id}
+            )
+        return response
+
+    @store_inventory_adjust_docs
+    @action(detail=False, methods=['post'])
+    def adjust(self, request):
+        """Apply quantity deltas to many store/product rows at once"""
+        serializer = InventoryAdjustmentRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deltas = serializer.validated_data['adjustments']
+        updated, created = apply_adjustments(
+            deltas, serializer.validated_data['kind'],
+            serializer.validated_data['reference'], request.user)
+
+        per_store = {}
+        for (store_id, _), delta in deltas.items():
+            rows, units = per_store.get(store_id, (0, 0))
+            per_store[store_id] = (rows + 1, units + delta)
+        record_activities([
+            build_activity(
+                user=request.user,
+                action_type=UserActivity.ActionType.UPDATE,
+                model_name='Store',
+                object_id=store_id,
+                details={'action': 'inventory_adjustment',
+                         'kind': serializer.validated_data['kind'],
+                         'rows': rows, 'net_quantity': units}
+            )
+            for store_id, (rows, units) in per_store.items()
+        ])
+        return Response({'updated': updated, 'created': created})
+
+    @store_inventory_as_of_docs
+    @action(detail=False, methods=['get'])
+    def as_of(self, request):
+        """A store's quantities at a past time, from snapshot plus ledger tail"""
+        query = StockAsOfQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        quantities = quantities_as_of(
+            query.validated_data['store'], query.validated_data['at'],
+            query.validated_data.get('product'))
+        results = [{'product': product, 'quantity': quantity}
+                   for product, quantity in sorted(quantities.items())]
+        page = self.paginate_queryset(results)
+        return self.get_paginated_response(page)
+
+    @store_inventory_low_stock_docs
+    @action(detail=False, methods=['get'])
+    def low_stock(self, request):
+        """Products at or below their reorder level, per store or across all stores"""
+        def build():
+            queryset = self.filter_queryset(
+                self.get_queryset()).below_reorder_level()
+            page = self.paginate_queryset(queryset)
+            serializer = LowStockSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
+
+        return cached_response(
+            request, 'low-stock', settings.LOW_STOCK_CACHE_TIMEOUT, build)
+
+
+class StockTransferViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """Transfers are immutable documents: they can be created and read only."""
+    queryset = StockTransfer.objects.prefetch_related('items')
+    serializer_class = StockTransferSerializer
+    permission_classes = [IsAdminOrSuperAdmin]
+    pagination_class = FeedCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['source_store', 'destination_store']
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return StockTransferCreateSerializer
+        return StockTransferSerializer
+
+    @stock_transfer_list_docs
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @stock_transfer_create_docs
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        transfer = serializer.save(created_by=request.user)
+        record_activity(
+            user=request.user,
+            action_type=UserActivity.ActionType.CREATE,
+            model_name='StockTransfer',
+            object_id=transfer.id,
+            details={'source_store': transfer.source_store_id,
+                     'destination_store': transfer.destination_store_id,
+                     'lines': len(serializer.validated_data['items'])}
+        )
+        data = StockTransferSerializer(
+            transfer, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class StockMovementCursorPagination(FeedCursorPagination):
+    ordering = ('-id',)
+
+
+class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """The append-only store inventory ledger, newest first."""
+    queryset = StockMovement.objects.all()
+    serializer_class = StockMovementSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StockMovementCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['store', 'product', 'kind']
+
+    @stock_movement_list_docs
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
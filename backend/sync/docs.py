@@ -0,0 +1,35 @@
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+
+# Sync documentation
+sync_docs = extend_schema(
+    summary="Delta sync",
+    description="Returns categories and products (and, for a store, its inventory rows and sales) changed since "
+                "the given watermark, plus the IDs of rows deleted since then, and a new watermark. Omit `since` "
+                "for a full sync. Repeat with the returned watermark while `has_more` is true. Changes from the "
+                "last few seconds are delivered on the next call. Returns 410 when the watermark is older than the "
+                "tombstone retention period; the client must then perform a full sync.",
+    parameters=[
+        OpenApiParameter(
+            name="since",
+            type=OpenApiTypes.STR,
+            description="Watermark returned by the previous sync call"
+        ),
+        OpenApiParameter(
+            name="store",
+            type=OpenApiTypes.INT,
+            description="Include this store's inventory and sales"
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=OpenApiTypes.INT,
+            description="Maximum rows per entity in one response"
+        )
+    ],
+    responses={
+        200: "Changes retrieved successfully",
+        400: "Invalid watermark or parameters",
+        410: "Watermark expired; full sync required"
+    },
+    tags=["Sync"]
+)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('categories', 'Category'), ('products', 'Product'), ('store_inventory', 'Store inventory'), ('sales', 'Sale')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('store_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='tombstone_sync_idx')],
+            },
+        ),
+    ]
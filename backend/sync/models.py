@@ -0,0 +1,26 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """Records a deleted row so delta sync clients can remove it too."""
+    class Entity(models.TextChoices):
+        CATEGORY = 'categories', 'Category'
+        PRODUCT = 'products', 'Product'
+        STORE_INVENTORY = 'store_inventory', 'Store inventory'
+        SALE = 'sales', 'Sale'
+
+    entity = models.CharField(max_length=20, choices=Entity.choices)
+    object_id = models.BigIntegerField()
+    # Set for store-scoped rows; not a foreign key so it outlives the store
+    store_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'],
+                         name='tombstone_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} #{self.object_id} deleted at {self.deleted_at}"
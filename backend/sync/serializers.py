@@ -0,0 +1,61 @@
+import base64
+import json
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from inventory.serializers import ProductSerializer
+from stores.models import StoreInventory
+
+
+def encode_watermark(store, cursors):
+    """Opaque token holding a (timestamp, id) keyset position per entity."""
+    payload = {'store': store, 'cursors': {
+        entity: [timestamp.isoformat(), pk]
+        for entity, (timestamp, pk) in cursors.items()}}
+    return base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_watermark(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        cursors = {
+            entity: (parse_datetime(timestamp), int(pk))
+            for entity, (timestamp, pk) in payload['cursors'].items()}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise serializers.ValidationError("Invalid watermark")
+    if any(timestamp is None for timestamp, _ in cursors.values()):
+        raise serializers.ValidationError("Invalid watermark")
+    return payload.get('store'), cursors
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False)
+    store = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.SYNC_MAX_PAGE_SIZE,
+        default=settings.SYNC_PAGE_SIZE)
+
+    def validate(self, attrs):
+        attrs['cursors'] = {}
+        if 'since' in attrs:
+            store, attrs['cursors'] = decode_watermark(attrs['since'])
+            if store != attrs.get('store'):
+                raise serializers.ValidationError(
+                    {'since': ["Watermark was issued for a different store"]})
+        return attrs
+
+
+class SyncProductSerializer(ProductSerializer):
+    # Availability syncs through store inventory rows; the cross-store
+    # total changes on every sale and would make every sold product a change
+    class Meta(ProductSerializer.Meta):
+        fields = [field for field in ProductSerializer.Meta.fields
+                  if field != 'on_hand']
+
+
+class SyncStoreInventorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StoreInventory
+        fields = ['id', 'store', 'product', 'quantity', 'reorder_level',
+                  'reorder_quantity', 'last_updated']
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from inventory.models import Category, Product
+from sales.models import Sale
+from stores.models import StoreInventory
+from .models import Tombstone
+
+ENTITIES = {
+    Category: Tombstone.Entity.CATEGORY,
+    Product: Tombstone.Entity.PRODUCT,
+    StoreInventory: Tombstone.Entity.STORE_INVENTORY,
+    Sale: Tombstone.Entity.SALE,
+}
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=StoreInventory)
+@receiver(post_delete, sender=Sale)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        entity=ENTITIES[sender], object_id=instance.pk,
+        store_id=getattr(instance, 'store_id', None))
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from inventory.models import Category, Product
+from stores.models import Store, StoreInventory
+from users.models import User
+from .models import Tombstone
+from .serializers import decode_watermark, encode_watermark
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class DeltaSyncTests(APITestCase):
+    url = '/api/sync/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Snacks')
+        self.store = Store.objects.create(
+            name='Main', address='-', phone='-', email='main@example.com')
+        self.products = [
+            Product.objects.create(
+                name=f'Product {i}', category=self.category, sku=f'SKU-{i}',
+                price=Decimal('1.00'))
+            for i in range(5)
+        ]
+        for product in self.products:
+            StoreInventory.objects.create(
+                store=self.store, product=product, quantity=3)
+
+    def sync(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def full_sync(self, **params):
+        pages = []
+        data = self.sync(**params)
+        pages.append(data)
+        while data['has_more']:
+            data = self.sync(since=data['watermark'], **params)
+            pages.append(data)
+        return pages
+
+    def test_full_sync_pages_through_every_row(self):
+        pages = self.full_sync(store=self.store.id, limit=2)
+        skus = [row['sku'] for page in pages for row in page['changes']['products']]
+        self.assertEqual(skus, [f'SKU-{i}' for i in range(5)])
+        rows = sum(len(page['changes']['store_inventory']) for page in pages)
+        self.assertEqual(rows, 5)
+        self.assertNotIn('on_hand', pages[0]['changes']['products'][0])
+
+    def test_delta_returns_changes_and_tombstones(self):
+        watermark = self.full_sync(store=self.store.id)[-1]['watermark']
+        self.assertEqual(self.sync(store=self.store.id, since=watermark)['changes']['products'], [])
+
+        self.products[1].price = Decimal('2.00')
+        self.products[1].save()
+        deleted_id = self.products[2].id
+        self.products[2].delete()
+        data = self.sync(store=self.store.id, since=watermark)
+
+        self.assertEqual([row['id'] for row in data['changes']['products']],
+                         [self.products[1].id])
+        self.assertEqual(data['deleted']['products'], [deleted_id])
+        self.assertEqual(len(data['deleted']['store_inventory']), 1)
+
+        data = self.sync(store=self.store.id, since=data['watermark'])
+        self.assertEqual(data['changes']['products'], [])
+        self.assertEqual(data['deleted'], {})
+
+    def test_watermark_is_bound_to_store(self):
+        watermark = self.sync()['watermark']
+        response = self.client.get(
+            self.url, {'since': watermark, 'store': self.store.id})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_watermark_requires_full_sync(self):
+        _, cursors = decode_watermark(self.sync()['watermark'])
+        cursors['tombstones'] = (timezone.now() - timedelta(days=365), 0)
+        response = self.client.get(
+            self.url, {'since': encode_watermark(None, cursors)})
+        self.assertEqual(response.status_code, 410)
+
+    def test_purge_removes_old_tombstones(self):
+        self.products[0].delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        self.products[1].delete()
+        call_command('purge_sync_tombstones', stdout=StringIO())
+        self.assertEqual(Tombstone.objects.filter(entity='products').count(), 1)
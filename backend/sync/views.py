@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from inventory.models import Category, Product
+from inventory.serializers import CategorySerializer
+from sales.models import Sale
+from sales.serializers import SaleSerializer
+from stores.models import StoreInventory
+from .models import Tombstone
+from .serializers import (
+    SyncQuerySerializer, SyncProductSerializer, SyncStoreInventorySerializer,
+    encode_watermark
+)
+from .docs import sync_docs
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+TOMBSTONES = 'tombstones'
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync for POS clients. Each entity is read in keyset order on its
+    indexed (timestamp, id) columns from the position stored in the
+    watermark, so a request costs one index range scan per entity no
+    matter how large the catalog is.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def entities(self, store):
+        """(name, queryset, timestamp field, serializer class) per entity."""
+        entities = [
+            (Tombstone.Entity.CATEGORY, Category.objects.all(),
+             'updated_at', CategorySerializer),
+            (Tombstone.Entity.PRODUCT,
+             Product.objects.select_related('category'),
+             'updated_at', SyncProductSerializer),
+        ]
+        if store is not None:
+            entities += [
+                (Tombstone.Entity.STORE_INVENTORY,
+                 StoreInventory.objects.filter(store_id=store),
+                 'last_updated', SyncStoreInventorySerializer),
+                (Tombstone.Entity.SALE,
+                 Sale.objects.filter(store_id=store).prefetch_related('items'),
+                 'updated_at', SaleSerializer),
+            ]
+        return entities
+
+    def page(self, queryset, field, cursor, upper, limit):
+        timestamp, pk = cursor
+        rows = list(
+            queryset.filter(**{f'{field}__lte': upper})
+            .filter(Q(**{f'{field}__gt': timestamp}) |
+                    Q(**{field: timestamp, 'id__gt': pk}))
+            .order_by(field, 'id')[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    @sync_docs
+    def list(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        store = query.validated_data.get('store')
+        cursors = query.validated_data['cursors']
+        limit = query.validated_data['limit']
+        now = timezone.now()
+        # Rows are stamped before their transaction commits; holding back
+        # the most recent ones lets slow commits land before we pass them
+        upper = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if TOMBSTONES in cursors and cursors[TOMBSTONES][0] < now - retention:
+            return Response(
+                {'error': 'Watermark is older than the tombstone retention '
+                          'period; perform a full sync'},
+                status=status.HTTP_410_GONE)
+
+        changes, has_more, next_cursors = {}, False, {}
+        for name, queryset, field, serializer_class in self.entities(store):
+            cursor = cursors.get(name, (EPOCH, 0))
+            rows, more = self.page(queryset, field, cursor, upper, limit)
+            has_more = has_more or more
+            changes[name] = serializer_class(
+                rows, many=True, context={'request': request}).data
+            next_cursors[name] = (
+                (getattr(rows[-1], field), rows[-1].id) if rows else cursor)
+
+        deleted = {}
+        if TOMBSTONES in cursors:
+            tombstones = Tombstone.objects.all()
+            if store is None:
+                tombstones = tombstones.filter(store_id__isnull=True)
+            else:
+                tombstones = tombstones.filter(
+                    Q(store_id__isnull=True) | Q(store_id=store))
+            rows, more = self.page(tombstones, 'deleted_at',
+                                   cursors[TOMBSTONES], upper, limit)
+            has_more = has_more or more
+            for tombstone in rows:
+                deleted.setdefault(tombstone.entity, []).append(
+                    tombstone.object_id)
+            next_cursors[TOMBSTONES] = (
+                (rows[-1].deleted_at, rows[-1].id) if rows
+                else cursors[TOMBSTONES])
+        else:
+            # A first sync has nothing to delete; start tracking deletes
+            # from this point on
+            next_cursors[TOMBSTONES] = (upper, 0)
+
+        return Response({
+            'changes': changes,
+            'deleted': deleted,
+            'watermark': encode_watermark(store, next_cursors),
+            'has_more': has_more,
+        })
@@ -0,0 +1,216 @@
+"""
+Pluggable sinks for UserActivity audit records.
+
+Views call `record_activity(...)` instead of creating UserActivity rows
+themselves. The configured sink decides when the row is written:
+`SyncAuditSink` inserts immediately in the request thread, while
+`BufferedAuditSink` queues records once the surrounding transaction
+commits and bulk-inserts them from a background thread.
+
+The sink is selected by the AUDIT_SINK setting:
+
+    AUDIT_SINK = {
+        'BACKEND': 'users.audit.BufferedAuditSink',
+        'OPTIONS': {'batch_size': 500, 'flush_interval': 1.0},
+    }
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'users.audit.SyncAuditSink'
+
+
+def build_activity(user=None, **fields):
+    if user is not None:
+        fields['user_id'] = user.pk
+    # Stamp the time of the action, not the time the batch is written
+    fields.setdefault('created_at', timezone.now())
+    return UserActivity(**fields)
+
+
+class SyncAuditSink:
+    """Writes every record immediately. Used by the test runner."""
+
+    def __init__(self, **options):
+        pass
+
+    def record(self, activities):
+        UserActivity.objects.bulk_create(activities)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def metrics(self):
+        return {'backend': type(self).__name__, 'queue_depth': 0}
+
+
+class BufferedAuditSink:
+    """
+    Buffers records in memory and bulk-inserts them from a daemon thread
+    whenever `batch_size` records are queued or `flush_interval` seconds
+    have passed. Pending records are flushed on interpreter shutdown.
+
+    When the queue is full, records are written synchronously by the
+    caller rather than dropped.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=1.0,
+                 max_queue_size=100000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.overflow = 0
+        self.last_flush_at = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Restart after fork: worker processes do not inherit the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._wakeup.clear()
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='audit-flusher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def record(self, activities):
+        transaction.on_commit(lambda: self._enqueue(activities))
+
+    def _enqueue(self, activities):
+        self._ensure_started()
+        for i, activity in enumerate(activities):
+            try:
+                self._queue.put_nowait(activity)
+            except queue.Full:
+                rest = activities[i:]
+                self.overflow += len(rest)
+                self._write(rest)
+                return
+            self.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                self._write(batch)
+
+    def _drain(self, limit=None):
+        batch = []
+        while limit is None or len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            UserActivity.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception('Failed to write %d audit records', len(batch))
+        else:
+            self.written += len(batch)
+            self.last_flush_at = time.time()
+
+    def flush(self):
+        """Write everything queued so far from the calling thread."""
+        if self._pid == os.getpid():
+            self._write(self._drain())
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval * 5)
+        self._write(self._drain())
+        self._pid = None
+
+    def metrics(self):
+        return {
+            'backend': type(self).__name__,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'failed': self.failed,
+            'overflow': self.overflow,
+            'last_flush_at': self.last_flush_at,
+        }
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                config = getattr(settings, 'AUDIT_SINK', {})
+                backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+                _sink = backend(**config.get('OPTIONS', {}))
+    return _sink
+
+
+@receiver(setting_changed)
+def reset_sink(setting, **kwargs):
+    global _sink
+    if setting == 'AUDIT_SINK' and _sink is not None:
+        _sink.close()
+        _sink = None
+
+
+def record_activity(user, action_type, model_name, object_id, details=None,
+                    ip_address=None):
+    get_sink().record([build_activity(
+        user=user, action_type=action_type, model_name=model_name,
+        object_id=object_id, details=details or {}, ip_address=ip_address)])
+
+
+def record_activities(activities):
+    """Record many activities built with `build_activity` at once."""
+    if activities:
+        get_sink().record(activities)
@@ -0,0 +1,137 @@
+"""
+JWT authentication that resolves users from the cache.
+
+simplejwt's JWTAuthentication loads the user row on every request. Here
+the row is cached for AUTH_USER_CACHE['TIMEOUT'] seconds and dropped
+whenever the user is saved or deleted. AUTH_USER_CACHE['CACHE'] must be
+shared by all worker processes (see CACHES) for the drop to reach them;
+then deactivating a user or changing their role takes effect on their
+next request. Writes that skip save(), such as QuerySet.update(), take
+effect within TIMEOUT. The password hash is not cached; it stays a
+deferred field loaded only when something reads it.
+
+With JWT_ROLE_CLAIM on, tokens also carry the user's role as a signed
+claim and the permission classes read it from the token. A token whose
+claim no longer matches the user's current role is rejected.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+ROLE_CLAIM = 'role'
+
+
+def cache_config():
+    return getattr(settings, 'AUTH_USER_CACHE', {})
+
+
+def cached_fields():
+    return [field.attname for field in get_user_model()._meta.concrete_fields
+            if field.name != 'password']
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Return the user with `user_id` (active or not), or None."""
+    config = cache_config()
+    cache = caches[config.get('CACHE', 'default')]
+    User = get_user_model()
+    fields = cached_fields()
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}).values_list(*fields).first()
+        if values is None:
+            return None
+        cache.set(key, values, config.get('TIMEOUT', 60))
+    return User.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+
+async def aget_cached_user(user_id):
+    """Async version of `get_cached_user` for async views."""
+    config = cache_config()
+    cache = caches[config.get('CACHE', 'default')]
+    User = get_user_model()
+    fields = cached_fields()
+    key = user_cache_key(user_id)
+    values = await cache.aget(key)
+    if values is None:
+        values = await User.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}).values_list(*fields).afirst()
+        if values is None:
+            return None
+        await cache.aset(key, values, config.get('TIMEOUT', 60))
+    return User.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+
+def invalidate_cached_user(user_id):
+    cache = caches[cache_config().get('CACHE', 'default')]
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    # Again after commit, in case a request cached the old row meanwhile
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def token_role(request):
+    """The role signed into the request's access token, if there is one."""
+    token = request.auth
+    if token is None or not hasattr(token, 'get'):
+        return None
+    return token.get(ROLE_CLAIM)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        return self.check_user(
+            get_cached_user(self.get_user_id(validated_token)), validated_token)
+
+    async def aauthenticate(self, request):
+        """Async `authenticate` for plain Django async views."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Reads the deferred password hash
+            return await sync_to_async(self.check_user)(
+                user, validated_token), validated_token
+        return self.check_user(user, validated_token), validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        role = validated_token.get(ROLE_CLAIM)
+        if role is not None and role != user.role:
+            raise AuthenticationFailed(
+                _("The user's role has changed."), code='role_changed')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                    api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+
+class Command(BaseCommand):
+    help = ('Delete expired outstanding refresh tokens and their blacklist '
+            'entries in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        # Expired tokens fail verification anyway, blacklisted or not
+        cutoff = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(OutstandingToken.objects.filter(expires_at__lt=cutoff)
+                       .order_by('id')
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # Cascades to BlacklistedToken
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[
+                1].get(OutstandingToken._meta.label, 0)
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tokens that expired before {cutoff:%Y-%m-%d %H:%M}.'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_useractivity_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['model_name', 'object_id', '-created_at', '-id'], name='activity_object_idx'),
+        ),
+    ]
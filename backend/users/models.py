@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -49,11 +50,22 @@ class UserActivity(models.Model):
     # Store additional details about the action
     details = models.JSONField(default=dict)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered audit writes set the time of the action
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'User Activities'
+        indexes = [
+            # Keyset pagination of the activity feed, overall and per user
+            models.Index(fields=['-created_at', '-id'],
+                         name='activity_feed_idx'),
+            models.Index(fields=['user', '-created_at', '-id'],
+                         name='activity_user_feed_idx'),
+            # History of one object
+            models.Index(fields=['model_name', 'object_id', '-created_at', '-id'],
+                         name='activity_object_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.get_action_type_display()} - {self.model_name} #{self.object_id}"
@@ -1,15 +1,22 @@
 from rest_framework import permissions
+from .authentication import token_role
+from .models import User
+
+
+def request_role(request):
+    # A signed role claim saves reading it from the user
+    return token_role(request) or request.user.role
 
 
 class IsSuperAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or request.user.is_anonymous:
             return False
-        return request.user.is_super_admin
+        return request_role(request) == User.Role.SUPER_ADMIN
 
 
 class IsAdminOrSuperAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or request.user.is_anonymous:
             return False
-        return request.user.is_admin or request.user.is_super_admin
+        return request_role(request) in (User.Role.ADMIN, User.Role.SUPER_ADMIN)
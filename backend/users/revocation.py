@@ -0,0 +1,125 @@
+"""
+In-process filter in front of the refresh token blacklist.
+
+With rotation on, every token refresh and blacklist call asks whether a
+refresh token's jti is blacklisted. The filter answers most of those
+without a query. It is a Bloom filter over the jtis of blacklisted,
+unexpired tokens, rebuilt every REBUILD_INTERVAL seconds, plus a set of
+the jtis blacklisted since. "Not revoked" answers are trusted. "Maybe
+revoked" answers are confirmed against the database, since Bloom filters
+give false positives.
+
+Tokens blacklisted by other processes are picked up by an incremental
+query for newer blacklist rows, run at most every SYNC_INTERVAL seconds.
+Another process may therefore accept a just-revoked refresh token for
+that long. A full rebuild also catches rows that committed out of id
+order.
+"""
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Max
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(key))
+
+
+class RevocationFilter:
+    def __init__(self, sync_interval=1, rebuild_interval=300, error_rate=0.01):
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.error_rate = error_rate
+        self.bloom = None
+        self.recent = set()
+        self.high_water = 0
+        self.built_at = self.synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def might_be_revoked(self, jti):
+        """False if `jti` is certainly not blacklisted, True if it may be."""
+        self.refresh()
+        return jti in self.recent or jti in self.bloom
+
+    def add(self, jti):
+        """Record a token this process just blacklisted."""
+        self.recent.add(jti)
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.bloom is not None and now - self.synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self.bloom is None or now - self.built_at >= self.rebuild_interval:
+                self.rebuild()
+            elif now - self.synced_at >= self.sync_interval:
+                self.sync()
+
+    def rebuild(self):
+        high_water = BlacklistedToken.objects.aggregate(
+            high_water=Max('id'))['high_water'] or 0
+        jtis = list(BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()).values_list(
+            'token__jti', flat=True))
+        # Room to grow until the next rebuild
+        bloom = BloomFilter(2 * len(jtis) + 1000, self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom = bloom
+        self.recent = set()
+        self.high_water = high_water
+        self.built_at = self.synced_at = time.monotonic()
+
+    def sync(self):
+        rows = BlacklistedToken.objects.filter(
+            id__gt=self.high_water).values_list('id', 'token__jti')
+        for row_id, jti in rows:
+            self.recent.add(jti)
+            self.high_water = max(self.high_water, row_id)
+        self.synced_at = time.monotonic()
+
+
+_filter = None
+
+
+def get_revocation_filter():
+    global _filter
+    if _filter is None:
+        config = getattr(settings, 'TOKEN_REVOCATION_FILTER', {})
+        _filter = RevocationFilter(
+            sync_interval=config.get('SYNC_INTERVAL', 1),
+            rebuild_interval=config.get('REBUILD_INTERVAL', 300),
+            error_rate=config.get('ERROR_RATE', 0.01))
+    return _filter
+
+
+@receiver(setting_changed)
+def reset_revocation_filter(setting, **kwargs):
+    global _filter
+    if setting == 'TOKEN_REVOCATION_FILTER':
+        _filter = None
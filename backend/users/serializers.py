@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer, TokenObtainPairSerializer, TokenRefreshSerializer)
+from .authentication import ROLE_CLAIM
+from .tokens import FilteredRefreshToken
 from .models import User, UserActivity
 
 User = get_user_model()
@@ -53,3 +58,23 @@ class UserActivitySerializer(serializers.ModelSerializer):
                   'model_name', 'object_id', 'details', 'ip_address', 'created_at']
         read_only_fields = ['user', 'action_type', 'model_name',
                             'object_id', 'details', 'ip_address', 'created_at']
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Signs the user's role into the tokens when JWT_ROLE_CLAIM is on."""
+    token_class = FilteredRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        if settings.JWT_ROLE_CLAIM:
+            token[ROLE_CLAIM] = user.role
+        return token
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
+
+
+class FilteredTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = FilteredRefreshToken
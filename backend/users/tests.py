@@ -0,0 +1,257 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken, OutstandingToken)
+from core.testing import QueryCountAssertionsMixin
+from .audit import BufferedAuditSink, build_activity
+from .authentication import user_cache_key
+from .models import User, UserActivity
+from .revocation import BloomFilter, get_revocation_filter
+from .tokens import FilteredRefreshToken
+
+
+class UserQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='root', email='root@example.com', password='pass',
+            role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.admin)
+        self.sequence = 0
+
+    def create_activities(self, count):
+        for _ in range(count):
+            self.sequence += 1
+            user = User.objects.create_user(
+                username=f'user{self.sequence}',
+                email=f'user{self.sequence}@example.com', password='pass')
+            UserActivity.objects.create(
+                user=user, action_type=UserActivity.ActionType.CREATE,
+                model_name='Product', object_id=self.sequence)
+
+    def test_user_list(self):
+        self.assertListQueriesConstant('/api/users/', self.create_activities)
+
+    def test_activity_list(self):
+        self.assertListQueriesConstant(
+            '/api/activities/', self.create_activities)
+
+    def test_user_activities_action(self):
+        self.assertListQueriesConstant(
+            '/api/users/activities/', self.create_activities)
+
+
+class BufferedAuditSinkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='clerk', email='clerk@example.com', password='pass')
+        self.sink = BufferedAuditSink(batch_size=100, flush_interval=60)
+        self.addCleanup(self.sink.close)
+
+    def record(self, count):
+        self.sink.record([
+            build_activity(user=self.user,
+                           action_type=UserActivity.ActionType.CREATE,
+                           model_name='Product', object_id=i)
+            for i in range(count)
+        ])
+
+    def test_records_are_queued_until_commit_and_flushed_in_bulk(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.record(3)
+        self.assertEqual(self.sink.metrics()['enqueued'], 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(UserActivity.objects.count(), 0)
+
+        self.sink.flush()
+        self.assertEqual(UserActivity.objects.count(), 3)
+        metrics = self.sink.metrics()
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['written'], 3)
+
+    def test_full_queue_falls_back_to_synchronous_writes(self):
+        self.sink.max_queue_size = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record(5)
+        self.assertEqual(self.sink.metrics()['overflow'], 3)
+        self.assertEqual(UserActivity.objects.count(), 3)
+
+
+class ActivityFeedPaginationTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='root', email='root@example.com', password='pass',
+            role=User.Role.SUPER_ADMIN)
+        self.client.force_authenticate(self.admin)
+        self.create_activities(15)
+
+    def create_activities(self, count):
+        UserActivity.objects.bulk_create([
+            UserActivity(user=self.admin,
+                         action_type=UserActivity.ActionType.CREATE,
+                         model_name='Product', object_id=i)
+            for i in range(count)
+        ])
+
+    def test_cursor_pages_are_stable_under_concurrent_inserts(self):
+        first = self.client.get('/api/activities/')
+        self.assertNotIn('count', first.data)
+        self.assertEqual(len(first.data['results']), 10)
+
+        self.create_activities(5)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 5)
+        seen = [row['id'] for row in first.data['results'] + second.data['results']]
+        self.assertEqual(len(set(seen)), 15)
+
+    def test_user_activities_is_paginated(self):
+        response = self.client.get(
+            f'/api/users/{self.admin.id}/user_activities/', {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+
+    def login(self):
+        response = self.client.post(
+            '/api/token/', {'username': 'till', 'password': 'pass'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        return response.data['access']
+
+    def get_me(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/users/me/')
+        return response, len(ctx.captured_queries)
+
+    def test_user_resolved_from_cache(self):
+        self.login()
+        response, queries = self.get_me()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+        response, queries = self.get_me()
+        self.assertEqual(response.data['username'], 'till')
+        self.assertEqual(queries, 0)
+
+    def test_save_invalidates_cached_user(self):
+        self.login()
+        self.get_me()
+        self.user.role = User.Role.SUPER_ADMIN
+        self.user.save()
+        response, _ = self.get_me()
+        self.assertEqual(response.data['role'], User.Role.SUPER_ADMIN)
+
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalidation_uses_configured_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(
+                CACHES={**settings.CACHES, 'auth': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location}},
+                AUTH_USER_CACHE={'CACHE': 'auth', 'TIMEOUT': 60}):
+            self.login()
+            self.get_me()
+            self.assertIsNotNone(caches['auth'].get(user_cache_key(self.user.pk)))
+            self.user.is_active = False
+            self.user.save()
+            self.assertIsNone(caches['auth'].get(user_cache_key(self.user.pk)))
+            response, _ = self.get_me()
+            self.assertEqual(response.status_code, 401)
+
+    @override_settings(JWT_ROLE_CLAIM=True)
+    def test_role_claim(self):
+        self.user.role = User.Role.SUPER_ADMIN
+        self.user.save()
+        self.login()
+        response = self.client.get('/api/activities/')
+        self.assertEqual(response.status_code, 200)
+
+        # Tokens signed with the old role stop working once it changes
+        self.user.role = User.Role.ADMIN
+        self.user.save()
+        response = self.client.get('/api/activities/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'role_changed')
+
+
+@override_settings(TOKEN_REVOCATION_FILTER={'SYNC_INTERVAL': 60})
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='till', email='till@example.com', password='pass')
+        self.filter = get_revocation_filter()
+        self.filter.rebuild()
+
+    def obtain(self):
+        response = self.client.post(
+            '/api/token/', {'username': 'till', 'password': 'pass'})
+        return response.data['refresh']
+
+    def test_rotated_token_is_rejected(self):
+        old = self.obtain()
+        response = self.client.post('/api/token/refresh/', {'refresh': old})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/token/refresh/', {'refresh': old})
+        self.assertEqual(response.status_code, 401)
+
+    def test_unrevoked_token_skips_blacklist_query(self):
+        token = FilteredRefreshToken(self.obtain())
+        with CaptureQueriesContext(connection) as ctx:
+            token.check_blacklist()
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_revocations_from_other_processes_synced(self):
+        token = FilteredRefreshToken(self.obtain())
+        outstanding = OutstandingToken.objects.get(jti=token['jti'])
+        BlacklistedToken.objects.create(token=outstanding)
+        # Not seen until the next sync
+        token.check_blacklist()
+        self.filter.synced_at = 0
+        with self.assertRaises(TokenError):
+            token.check_blacklist()
+
+    def test_bloom_filter_error_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'revoked-{i}')
+        self.assertTrue(all(f'revoked-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'live-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_purge_expired_tokens(self):
+        now = timezone.now()
+        expired = OutstandingToken.objects.create(
+            user=self.user, jti='expired', token='-',
+            expires_at=now - timedelta(minutes=1))
+        BlacklistedToken.objects.create(token=expired)
+        OutstandingToken.objects.create(
+            user=self.user, jti='live', token='-',
+            expires_at=now + timedelta(days=1))
+        call_command('purge_expired_tokens', '--batch-size', '1',
+                     stdout=StringIO())
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list('jti', flat=True)),
+            ['live'])
+        self.assertFalse(BlacklistedToken.objects.exists())
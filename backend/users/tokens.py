@@ -0,0 +1,17 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revocation import get_revocation_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """Refresh token that consults the revocation filter before the blacklist table."""
+
+    def check_blacklist(self):
+        if get_revocation_filter().might_be_revoked(
+                self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        get_revocation_filter().add(self.payload[api_settings.JTI_CLAIM])
+        return result
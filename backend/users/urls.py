@@ -5,10 +5,11 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenBlacklistView,
 )
-from .views import UserViewSet
+from .views import UserViewSet, UserActivityViewSet
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
+router.register(r'activities', UserActivityViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -5,15 +5,18 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from core.exports import export_response
+from core.pagination import FeedCursorPagination
 from .models import User, UserActivity
 from .serializers import UserSerializer, UserCreateSerializer, UserUpdateSerializer, UserActivitySerializer
 from .permissions import IsSuperAdmin, IsAdminOrSuperAdmin
+from .audit import get_sink
 
 User = get_user_model()
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsSuperAdmin]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -59,33 +62,53 @@ class UserViewSet(viewsets.ModelViewSet):
     def activities(self, request):
         """Get activities for all users or filter by specific user"""
         user_id = request.query_params.get('user_id')
-        queryset = UserActivity.objects.all()
+        queryset = UserActivity.objects.select_related('user')
 
         if user_id:
             queryset = queryset.filter(user_id=user_id)
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = UserActivitySerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = UserActivitySerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.paginate_activities(queryset)
 
     @action(detail=True, methods=['get'])
     def user_activities(self, request, pk=None):
         """Get activities for a specific user"""
         user = self.get_object()
-        activities = UserActivity.objects.filter(user=user)
-        serializer = UserActivitySerializer(activities, many=True)
-        return Response(serializer.data)
+        activities = UserActivity.objects.filter(
+            user=user).select_related('user')
+        return self.paginate_activities(activities)
+
+    def paginate_activities(self, queryset):
+        # Activity feeds use keyset pagination while the user list keeps
+        # page numbers. No view is passed so the user list's ordering
+        # parameter does not leak into the activity cursor.
+        paginator = FeedCursorPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=None)
+        serializer = UserActivitySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UserActivity.objects.all()
+    queryset = UserActivity.objects.select_related('user')
     serializer_class = UserActivitySerializer
     permission_classes = [IsAuthenticated, IsSuperAdmin]
+    pagination_class = FeedCursorPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['user', 'action_type', 'model_name']
+    filterset_fields = ['user', 'action_type', 'model_name', 'object_id']
     search_fields = ['user__username', 'details']
     ordering_fields = ['created_at']
+    ordering = ['-created_at', '-id']
+    export_fields = ['id', 'user_id', 'user__username', 'action_type',
+                     'model_name', 'object_id', 'details', 'ip_address',
+                     'created_at']
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all activities matching the feed filters as CSV or NDJSON"""
+        return export_response(
+            request, self.filter_queryset(self.get_queryset()),
+            self.export_fields, 'activity')
+
+    @action(detail=False, methods=['get'])
+    def audit_metrics(self, request):
+        """Queue depth and write counters of the audit sink in this process"""
+        return Response(get_sink().metrics())
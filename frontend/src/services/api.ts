@@ -176,11 +176,6 @@ export const salesAPI = {
     return response.data;
   },
 
-  updateSale: async (id: number, data: any) => {
-    const response = await api.patch(`/sales/${id}/`, data);
-    return response.data;
-  },
-
   deleteSale: async (id: number) => {
     await api.delete(`/sales/${id}/`);
   },